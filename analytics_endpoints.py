@@ -1,9 +1,23 @@
-from fastapi import APIRouter, HTTPException, Query
+import asyncio
+import logging
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from typing import Optional
 from pydantic import BaseModel
-from supabase import Client
+from supabase import AsyncClient
+
+from analytics_engine import MARK_COLUMNS, PASS_MARK, PERCENTILES, summarize_by
+from analytics_snapshot import get_snapshot, rebuild_snapshot
+from auth_utils import TokenClaims, check_org, get_current_user, require_role
+from database import get_supabase
+from leaderboard import MAX_LEADERBOARD_SIZE, fetch_leaderboard
+from marks_history import get_rollups, get_trends
+from pagination import MAX_PAGE_SIZE, fetch_all, select_columns
+from response_cache import cache_response, invalidates
 
-router = APIRouter(prefix="/analytics", tags=["analytics"])
+router = APIRouter(prefix="/analytics", tags=["analytics"], dependencies=[Depends(get_current_user)])
+logger = logging.getLogger(__name__)
 
 # Models for response data
 class StudentAnalytics(BaseModel):
@@ -35,53 +49,189 @@ class LanguageDetail(BaseModel):
     tests_conducted: int
     pass_rate: int
 
+# Columns clients may request through `fields=` on /analytics/students
+STUDENT_ANALYTICS_COLUMNS = ("id", "name", "org_id", "email", "language") + MARK_COLUMNS
+SORT_COLUMNS = ("name",) + MARK_COLUMNS
+
+
+# Rows per request when /analytics/distribution reads a whole org
+DISTRIBUTION_PAGE_SIZE = int(os.getenv("DISTRIBUTION_PAGE_SIZE", "1000"))
+
+
+def _check_column(value: str, allowed, parameter: str):
+    if value not in allowed:
+        raise HTTPException(status_code=400, detail=f"{parameter} must be one of: {', '.join(allowed)}")
+
+
+def _parse_list(value: Optional[str], parameter: str, cast=str) -> Optional[list]:
+    if not value:
+        return None
+    try:
+        return [cast(item.strip()) for item in value.split(",") if item.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {parameter}")
+
 @router.get("/students")
+@cache_response(ttl=60, tags=["students"])
 async def get_students_analytics(
     org_id: str = Query(..., description="Organization ID"),
-    language: str = Query(..., description="Language filter")
+    language: str = Query(..., description="Language filter"),
+    mark: str = Query("overall_mark", description="Mark column min_mark/max_mark apply to"),
+    min_mark: Optional[float] = Query(None, description="Only students with mark >= min_mark"),
+    max_mark: Optional[float] = Query(None, description="Only students with mark < max_mark"),
+    sort: Optional[str] = Query(None, description="Mark column or name to sort by"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    top_n: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Return only the first N rows"),
+    fields: Optional[str] = Query(None, description="Comma separated columns to return"),
+    claims: TokenClaims = Depends(get_current_user),
+    supabase: AsyncClient = Depends(get_supabase)
 ):
     """
-    Get analytics data for students in an organization filtered by language
+    Get analytics data for students in an organization filtered by language.
+    Mark ranges, sorting and top_n are applied in the database, e.g.
+    ?max_mark=70 for students below the pass mark.
     """
+    check_org(claims, org_id)
+    _check_column(mark, MARK_COLUMNS, "mark")
+    if sort is not None:
+        _check_column(sort, SORT_COLUMNS, "sort")
+
     try:
-        # Get Supabase client from app state
-        from main import supabase
-        
         # Query students table with filters
-        response = supabase.table("students") \
-            .select("*") \
+        query = supabase.table("students") \
+            .select(select_columns(fields, STUDENT_ANALYTICS_COLUMNS)) \
             .eq("org_id", org_id) \
-            .eq("language", language) \
-            .execute()
+            .eq("language", language)
+
+        if min_mark is not None:
+            query = query.gte(mark, min_mark)
+        if max_mark is not None:
+            query = query.lt(mark, max_mark)
+        if sort:
+            # Missing marks sort last either way; id keeps ties stable across top_n cuts
+            query = query.order(sort, desc=order == "desc", nullsfirst=False).order("id")
+        if top_n:
+            query = query.limit(top_n)
+
+        response = await query.execute()
         
         if not response.data:
             return {"students": []}
         
         return {"students": response.data}
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error fetching student analytics: {str(e)}")
+        logger.exception("Error fetching student analytics")
         raise HTTPException(status_code=500, detail="Failed to fetch student analytics")
 
+@router.get("/leaderboard")
+async def get_leaderboard(
+    org_id: str = Query(..., description="Organization ID"),
+    language: str = Query(..., description="Language name"),
+    mark: str = Query("overall_mark", description="Mark column to rank by"),
+    limit: int = Query(10, ge=1, le=MAX_LEADERBOARD_SIZE),
+    claims: TokenClaims = Depends(get_current_user),
+    supabase: AsyncClient = Depends(get_supabase)
+):
+    """
+    Top students of a cohort by one mark, with competition ranks. Served from
+    a per-cohort cached ranking that is only rebuilt when marks change.
+    """
+    check_org(claims, org_id)
+    _check_column(mark, MARK_COLUMNS, "mark")
+    try:
+        body = await fetch_leaderboard(supabase, org_id, language, mark, limit)
+        return Response(content=b'{"leaderboard":' + body + b"}", media_type="application/json")
+    except Exception as e:
+        logger.exception("Error fetching leaderboard")
+        raise HTTPException(status_code=500, detail="Failed to fetch leaderboard")
+
+@router.get("/distribution")
+@cache_response(ttl=300, tags=["students"])
+async def get_distribution(
+    org_id: str = Query(..., description="Organization ID"),
+    language: Optional[str] = Query(None, description="One language; all of the org's languages when omitted"),
+    columns: Optional[str] = Query(None, description="Comma separated mark columns (default: all)"),
+    pass_mark: float = Query(PASS_MARK, ge=0, le=100),
+    pass_column: str = Query("overall_mark", description="Mark column the pass rate is based on"),
+    percentiles: Optional[str] = Query(None, description="Comma separated percentiles (default: 25,50,75,90)"),
+    bins: int = Query(10, ge=1, le=100, description="Equal-width histogram bins over 0-100"),
+    claims: TokenClaims = Depends(get_current_user),
+    supabase: AsyncClient = Depends(get_supabase)
+):
+    """
+    Per-skill histograms, percentiles and pass rates for an org, overall and
+    per language, with a side-by-side language comparison. One fetch of the
+    org's mark columns and one vectorised pass over them per request.
+    """
+    check_org(claims, org_id)
+    mark_columns = _parse_list(columns, "columns") or list(MARK_COLUMNS)
+    for column in mark_columns:
+        _check_column(column, MARK_COLUMNS, "columns")
+    _check_column(pass_column, MARK_COLUMNS, "pass_column")
+    if pass_column not in mark_columns:
+        mark_columns.append(pass_column)
+    requested_percentiles = _parse_list(percentiles, "percentiles", float) or list(PERCENTILES)
+    if not all(0 <= p <= 100 for p in requested_percentiles):
+        raise HTTPException(status_code=400, detail="percentiles must be between 0 and 100")
+
+    def build_query(count=None):
+        query = supabase.table("students").select(",".join(["id", "language", *mark_columns]), count=count).eq("org_id", org_id)
+        if language:
+            query = query.eq("language", language)
+        return query
+
+    try:
+        rows = await fetch_all(build_query, DISTRIBUTION_PAGE_SIZE)
+        overall, languages = summarize_by(
+            rows,
+            "language",
+            mark_columns,
+            pass_mark=pass_mark,
+            pass_column=pass_column,
+            percentiles=requested_percentiles,
+            edges=[100 * i / bins for i in range(bins + 1)],
+        )
+        return {
+            "org_id": org_id,
+            "overall": overall,
+            "languages": languages,
+            "comparison": {
+                "total_students": {lang: s["total_students"] for lang, s in languages.items()},
+                "pass_rate": {lang: s["pass_rate"] for lang, s in languages.items()},
+                "mean_present": {
+                    column: {lang: s["columns"][column]["mean_present"] for lang, s in languages.items()}
+                    for column in mark_columns
+                },
+            },
+        }
+    except Exception as e:
+        logger.exception("Error computing mark distribution")
+        raise HTTPException(status_code=500, detail="Failed to compute mark distribution")
+
 @router.get("/summary")
+@cache_response(ttl=60, tags=["students", "tests"])
 async def get_analytics_summary(
     org_id: str = Query(..., description="Organization ID"),
-    language: str = Query(..., description="Language filter")
+    language: str = Query(..., description="Language filter"),
+    claims: TokenClaims = Depends(get_current_user),
+    supabase: AsyncClient = Depends(get_supabase)
 ):
     """
     Get summary analytics for a specific language in an organization
     """
+    check_org(claims, org_id)
     try:
-        # Get Supabase client from app state
-        from main import supabase
-        
-        # Query students table to calculate averages
-        response = supabase.table("students") \
-            .select("*") \
-            .eq("org_id", org_id) \
-            .eq("language", language) \
-            .execute()
+        # Averages come from the maintained per-cohort snapshot, trends from the
+        # precomputed marks rollups; both are single-row lookups run concurrently
+        stats, trends = await asyncio.gather(
+            get_snapshot(supabase, org_id, language),
+            get_trends(supabase, org_id, language)
+        )
+        total_students = stats["student_count"]
         
-        if not response.data or len(response.data) == 0:
+        if not total_students:
             # Return default values if no data
             return {
                 "summary": {
@@ -94,64 +244,43 @@ async def get_analytics_summary(
                 }
             }
         
-        # Calculate averages - handle None values
-        students = response.data
-        
-        def safe_float(value):
-            """Convert value to float, return 0.0 if None or invalid"""
-            if value is None:
-                return 0.0
-            try:
-                return float(value)
-            except (ValueError, TypeError):
-                return 0.0
-        
-        # Calculate averages with None handling
-        valid_students = len(students)
-        avg_overall = sum(safe_float(s.get("overall_mark")) for s in students) / valid_students if valid_students > 0 else 0.0
-        avg_fluency = sum(safe_float(s.get("fluency_mark")) for s in students) / valid_students if valid_students > 0 else 0.0
-        avg_vocab = sum(safe_float(s.get("vocab_mark")) for s in students) / valid_students if valid_students > 0 else 0.0
-        avg_sentence_mastery = sum(safe_float(s.get("sentence_mastery")) for s in students) / valid_students if valid_students > 0 else 0.0
-        avg_pronunciation = sum(safe_float(s.get("pronunciation")) for s in students) / valid_students if valid_students > 0 else 0.0
-        
-        # For weekly improvement, we would need historical data
-        # Using a placeholder value for now
-        weekly_improvement = 1.2
+        # Average change in overall mark across this week's mark updates
+        weekly_improvement = round(trends["weekly_improvement"], 1)
         
         return {
             "summary": {
-                "avg_overall": round(avg_overall, 1),
-                "avg_fluency": round(avg_fluency, 1),
-                "avg_vocab": round(avg_vocab, 1),
-                "avg_sentence_mastery": round(avg_sentence_mastery, 1),
-                "avg_pronunciation": round(avg_pronunciation, 1),
+                "avg_overall": round(stats["sum_overall"] / total_students, 1),
+                "avg_fluency": round(stats["sum_fluency"] / total_students, 1),
+                "avg_vocab": round(stats["sum_vocab"] / total_students, 1),
+                "avg_sentence_mastery": round(stats["sum_sentence_mastery"] / total_students, 1),
+                "avg_pronunciation": round(stats["sum_pronunciation"] / total_students, 1),
                 "weekly_improvement": weekly_improvement
             }
         }
     except Exception as e:
-        print(f"Error fetching analytics summary: {str(e)}")
+        logger.exception("Error fetching analytics summary")
         raise HTTPException(status_code=500, detail="Failed to fetch analytics summary")
 
 @router.get("/language-detail")
+@cache_response(ttl=60, tags=["students", "tests"])
 async def get_language_detail(
     org_id: str = Query(..., description="Organization ID"),
-    language: str = Query(..., description="Language name")
+    language: str = Query(..., description="Language name"),
+    claims: TokenClaims = Depends(get_current_user),
+    supabase: AsyncClient = Depends(get_supabase)
 ):
     """
     Get detailed statistics for a specific language in an organization
     """
+    check_org(claims, org_id)
     try:
-        # Get Supabase client from app state
-        from main import supabase
-        
-        # Count students for this language
-        students_response = supabase.table("students") \
-            .select("*", count="exact") \
-            .eq("org_id", org_id) \
-            .eq("language", language) \
-            .execute()
-        
-        total_students = students_response.count if hasattr(students_response, 'count') else len(students_response.data or [])
+        # Student count and pass count come from the maintained snapshot,
+        # activity and completed tests from the trends rollup
+        stats, trends = await asyncio.gather(
+            get_snapshot(supabase, org_id, language),
+            get_trends(supabase, org_id, language)
+        )
+        total_students = stats["student_count"]
         
         if total_students == 0:
             return {
@@ -162,24 +291,12 @@ async def get_language_detail(
                 "pass_rate": 0
             }
         
-        # For other metrics, we would need additional tables/data
-        # Using placeholder values for now
-        active_students = int(total_students * 0.85)  # Assuming 85% are active
-        tests_conducted = max(1, total_students * 4 // 10)  # Rough estimate, minimum 1
+        # Students with a mark update this week, and completed tests
+        active_students = trends["active_students"]
+        tests_conducted = trends["tests_conducted"]
         
-        def safe_float(value):
-            """Convert value to float, return 0.0 if None or invalid"""
-            if value is None:
-                return 0.0
-            try:
-                return float(value)
-            except (ValueError, TypeError):
-                return 0.0
-        
-        # Calculate pass rate (students with overall_mark >= 70) - handle None values
-        students_data = students_response.data or []
-        passing_students = sum(1 for s in students_data if safe_float(s.get("overall_mark")) >= 70)
-        pass_rate = int((passing_students / total_students) * 100) if total_students > 0 else 0
+        # Pass rate (students with overall_mark >= 70); missing marks fail
+        pass_rate = int((stats["pass_count"] / total_students) * 100)
         
         return {
             "language_name": language,
@@ -189,5 +306,57 @@ async def get_language_detail(
             "pass_rate": pass_rate
         }
     except Exception as e:
-        print(f"Error fetching language details: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to fetch language details")
\ No newline at end of file
+        logger.exception("Error fetching language details")
+        raise HTTPException(status_code=500, detail="Failed to fetch language details")
+
+@router.post("/snapshot/rebuild")
+@invalidates("students")
+async def rebuild_analytics_snapshot(
+    org_id: str = Query(..., description="Organization ID"),
+    language: str = Query(..., description="Language name"),
+    claims: TokenClaims = Depends(require_role("admin", "org")),
+    supabase: AsyncClient = Depends(get_supabase)
+):
+    """
+    Recompute the analytics snapshot for one language in an organization from the students table
+    """
+    check_org(claims, org_id)
+    try:
+        snapshot = await rebuild_snapshot(supabase, org_id, language)
+        return {"snapshot": snapshot}
+    except Exception as e:
+        logger.exception("Error rebuilding analytics snapshot")
+        raise HTTPException(status_code=500, detail="Failed to rebuild analytics snapshot")
+
+@router.get("/trends")
+@cache_response(ttl=60, tags=["students"])
+async def get_analytics_trends(
+    org_id: str = Query(..., description="Organization ID"),
+    language: str = Query(..., description="Language name"),
+    period: str = Query("week", pattern="^(day|week)$", description="Rollup bucket size"),
+    buckets: int = Query(8, ge=1, le=52, description="Number of most recent buckets"),
+    claims: TokenClaims = Depends(get_current_user),
+    supabase: AsyncClient = Depends(get_supabase)
+):
+    """
+    Get precomputed mark-change rollups (daily or weekly) for a language in an organization
+    """
+    check_org(claims, org_id)
+    try:
+        rollups = await get_rollups(supabase, org_id, language, period, buckets)
+        
+        return {
+            "period": period,
+            "trends": [
+                {
+                    "bucket_start": r["bucket_start"],
+                    "mark_updates": r["update_count"],
+                    "active_students": r["active_students"],
+                    "avg_improvement": round(r["overall_delta_sum"] / r["overall_delta_count"], 1) if r["overall_delta_count"] else 0.0
+                }
+                for r in rollups
+            ]
+        }
+    except Exception as e:
+        logger.exception("Error fetching analytics trends")
+        raise HTTPException(status_code=500, detail="Failed to fetch analytics trends")
@@ -0,0 +1,149 @@
+# analytics_engine.py
+import warnings
+from operator import itemgetter
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Mark columns on the students table, in matrix column order
+MARK_COLUMNS = (
+    "overall_mark",
+    "average_mark",
+    "recent_test_mark",
+    "fluency_mark",
+    "vocab_mark",
+    "sentence_mastery",
+    "pronunciation",
+)
+
+PASS_MARK = 70.0
+PERCENTILES = (25, 50, 75, 90)
+HISTOGRAM_EDGES = np.linspace(0.0, 100.0, 11)
+
+
+def to_matrix(rows: Sequence[dict], columns: Sequence[str] = MARK_COLUMNS) -> np.ndarray:
+    """
+    Convert fetched student rows into an (n_students, n_columns) float array.
+    Missing marks become NaN.
+    """
+    if not rows:
+        return np.empty((0, len(columns)), dtype=np.float64)
+
+    if len(columns) > 1 and all(c in rows[0] for c in columns):
+        # Rows from one select share their keys, so itemgetter is safe and fastest
+        try:
+            return np.array(list(map(itemgetter(*columns), rows)), dtype=np.float64)
+        except KeyError:
+            pass
+    return np.array([[row.get(c) for c in columns] for row in rows], dtype=np.float64)
+
+
+def _clean(value) -> Optional[float]:
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+def histogram(matrix: np.ndarray, edges: np.ndarray = HISTOGRAM_EDGES) -> np.ndarray:
+    """
+    Per-column histogram counts, shape (n_columns, len(edges) - 1).
+    Values outside the edges fall into the first/last bin; NaN is skipped.
+    """
+    n_bins = len(edges) - 1
+    n_cols = matrix.shape[1]
+    present = ~np.isnan(matrix)
+    widths = np.diff(edges)
+
+    if np.allclose(widths, widths[0]):
+        # Equal-width bins: index arithmetically instead of a binary search
+        bins = np.floor((np.where(present, matrix, edges[0]) - edges[0]) / widths[0])
+    else:
+        bins = np.searchsorted(edges, matrix, side="right") - 1
+    bins = np.clip(bins, 0, n_bins - 1).astype(np.int64)
+
+    flat = (bins + np.arange(n_cols) * n_bins)[present]
+    return np.bincount(flat, minlength=n_cols * n_bins).reshape(n_cols, n_bins)
+
+
+def summarize(
+    rows: Sequence[dict],
+    columns: Sequence[str] = MARK_COLUMNS,
+    pass_mark: float = PASS_MARK,
+    pass_column: str = "overall_mark",
+    percentiles: Iterable[float] = PERCENTILES,
+    edges: np.ndarray = HISTOGRAM_EDGES,
+) -> Dict:
+    """
+    Compute means, pass rate, percentiles and histograms for every mark
+    column from one columnar conversion of `rows`.
+
+    `mean` counts missing marks as 0 (the dashboard convention); `mean_present`
+    averages only the students that have a mark.
+    """
+    return summarize_matrix(to_matrix(rows, columns), columns, pass_mark, pass_column, percentiles, edges)
+
+
+def summarize_matrix(
+    matrix: np.ndarray,
+    columns: Sequence[str] = MARK_COLUMNS,
+    pass_mark: float = PASS_MARK,
+    pass_column: str = "overall_mark",
+    percentiles: Iterable[float] = PERCENTILES,
+    edges: np.ndarray = HISTOGRAM_EDGES,
+) -> Dict:
+    """summarize() for an array already built by to_matrix, e.g. one cohort's slice of an org."""
+    total = matrix.shape[0]
+    percentiles = list(percentiles)
+
+    present = ~np.isnan(matrix)
+    counts = present.sum(axis=0)
+    sums = np.nansum(matrix, axis=0)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        means = sums / total if total else np.zeros(len(columns))
+        means_present = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+        if total:
+            pcts = np.nanpercentile(np.ascontiguousarray(matrix.T), percentiles, axis=1)
+        else:
+            pcts = np.full((len(percentiles), len(columns)), np.nan)
+
+    hist = histogram(matrix, edges)
+
+    passing = 0
+    if pass_column in columns and total:
+        passing = int((matrix[:, list(columns).index(pass_column)] >= pass_mark).sum())
+
+    return {
+        "total_students": total,
+        "pass_mark": pass_mark,
+        "passing_students": passing,
+        "pass_rate": (passing / total * 100) if total else 0.0,
+        "histogram_edges": [float(e) for e in edges],
+        "columns": {
+            column: {
+                "count": int(counts[i]),
+                "mean": float(means[i]),
+                "mean_present": _clean(means_present[i]),
+                "percentiles": {f"p{p:g}": _clean(pcts[j, i]) for j, p in enumerate(percentiles)},
+                "histogram": [int(c) for c in hist[i]],
+            }
+            for i, column in enumerate(columns)
+        },
+    }
+
+
+def summarize_by(rows: Sequence[dict], key: str, columns: Sequence[str] = MARK_COLUMNS, **options) -> Tuple[Dict, Dict[str, Dict]]:
+    """
+    summarize() over all rows and separately for each value of `key` (e.g.
+    language), from a single conversion of `rows`. `options` are passed
+    through to summarize_matrix.
+    """
+    matrix = to_matrix(rows, columns)
+    labels = np.array([row.get(key) for row in rows], dtype=object)
+    overall = summarize_matrix(matrix, columns, **options)
+    groups = {
+        str(value): summarize_matrix(matrix[labels == value], columns, **options)
+        for value in sorted(set(labels.tolist()), key=str)
+    }
+    return overall, groups
+
@@ -0,0 +1,99 @@
+# analytics_snapshot.py
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from supabase import AsyncClient
+
+from analytics_engine import PASS_MARK
+
+logger = logging.getLogger(__name__)
+
+# Snapshot sum column -> students mark column
+SUM_COLUMNS = {
+    "sum_overall": "overall_mark",
+    "sum_fluency": "fluency_mark",
+    "sum_vocab": "vocab_mark",
+    "sum_sentence_mastery": "sentence_mastery",
+    "sum_pronunciation": "pronunciation",
+}
+
+
+def _mark(row: dict, column: str) -> float:
+    value = row.get(column)
+    return 0.0 if value is None else float(value)
+
+
+def contribution(row: dict, sign: int = 1) -> Dict[str, float]:
+    """How much one student row adds to (sign=1) or removes from (sign=-1) its snapshot."""
+    delta = {"student_count": sign}
+    for sum_column, mark_column in SUM_COLUMNS.items():
+        delta[sum_column] = sign * _mark(row, mark_column)
+    delta["pass_count"] = sign * int(row.get("overall_mark") is not None and _mark(row, "overall_mark") >= PASS_MARK)
+    return delta
+
+
+def compute_snapshot(rows: List[dict]) -> Dict[str, float]:
+    """Full recompute of one cohort's snapshot from its student rows."""
+    snapshot = {"student_count": 0, "pass_count": 0, **{c: 0.0 for c in SUM_COLUMNS}}
+    for row in rows:
+        for key, value in contribution(row).items():
+            snapshot[key] += value
+    return snapshot
+
+
+async def _apply_delta(supabase: AsyncClient, org_id: str, language: str, delta: Dict[str, float]):
+    await supabase.rpc("apply_analytics_delta", {
+        "p_org_id": org_id,
+        "p_language": language,
+        **{f"p_{key}": value for key, value in delta.items()}
+    }).execute()
+
+
+async def apply_student_changes(supabase: AsyncClient, changes: Iterable[Tuple[Optional[dict], Optional[dict]]]):
+    """
+    Fold student inserts (old_row=None), updates and deletes (new_row=None)
+    into the affected snapshots: one RPC per cohort. Single-row writes do
+    this inside their SQL function instead.
+    """
+    deltas: Dict[tuple, Dict[str, float]] = {}
+    for old_row, new_row in changes:
+        for row, sign in ((old_row, -1), (new_row, 1)):
+            if not row or not row.get("org_id") or not row.get("language"):
+                continue
+            key = (row["org_id"], row["language"])
+            delta = deltas.setdefault(key, {})
+            for column, value in contribution(row, sign).items():
+                delta[column] = delta.get(column, 0) + value
+
+    try:
+        for (org_id, language), delta in deltas.items():
+            if any(delta.values()):
+                await _apply_delta(supabase, org_id, language, delta)
+    except Exception as e:
+        # The student write already happened; a rebuild will repair the snapshot
+        logger.exception("Error updating analytics snapshot")
+
+
+async def rebuild_snapshot(supabase: AsyncClient, org_id: str, language: str) -> dict:
+    response = await supabase.rpc("rebuild_analytics_snapshot", {
+        "p_org_id": org_id,
+        "p_language": language,
+        "p_pass_mark": PASS_MARK
+    }).execute()
+    return response.data[0]
+
+
+async def get_snapshot(supabase: AsyncClient, org_id: str, language: str) -> dict:
+    """
+    Read the running totals for one cohort, building them on first access.
+    """
+    response = await supabase.table("analytics_snapshots") \
+        .select("*") \
+        .eq("org_id", org_id) \
+        .eq("language", language) \
+        .execute()
+
+    if response.data:
+        return response.data[0]
+    return await rebuild_snapshot(supabase, org_id, language)
+
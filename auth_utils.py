@@ -1,15 +1,38 @@
-from jose import JWTError, jwt
+import jwt
 from datetime import datetime, timedelta
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from pydantic import BaseModel
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+import asyncio
+import hashlib
+import hmac
 import os
+import time
 
-SECRET_KEY = os.getenv("JWT_SECRET", "your-secret-key")
+from cache import TTLCache
+
+SECRET_KEY = os.getenv("JWT_SECRET", "supersecretkey")  # Change in production
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", str(24 * 60)))
+# Decoded claims are kept until the token expires, keyed by a hash of the token
+JWT_CLAIMS_CACHE_SIZE = int(os.getenv("JWT_CLAIMS_CACHE_SIZE", "10000"))
+
+# bcrypt cost factor; hashes with a different cost are upgraded on the next login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# bcrypt releases the GIL, so a small thread pool runs hashes in parallel
+# while the event loop keeps serving other requests
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 def verify_password(plain, hashed):
@@ -18,26 +41,92 @@ def verify_password(plain, hashed):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+# Created on first use and dropped at shutdown, so a later lifespan (e.g. a
+# second TestClient in the same process) gets a fresh pool
+_hash_executor: Optional[ThreadPoolExecutor] = None
+
+def _executor() -> ThreadPoolExecutor:
+    global _hash_executor
+    if _hash_executor is None:
+        _hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+    return _hash_executor
+
+async def _run(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(_executor(), fn, *args)
+
+async def hash_password(password: str) -> str:
+    return await _run(pwd_context.hash, password)
+
+async def check_password(plain: str, stored: Optional[str]) -> Tuple[bool, Optional[str]]:
+    """
+    Verify `plain` against a stored bcrypt hash or a legacy plain-text
+    password. Returns (matched, new_hash); new_hash is set when the stored
+    value should be replaced (plain text, or a hash with outdated cost).
+    """
+    if not stored:
+        return False, None
+    if pwd_context.identify(stored) is None:
+        if not hmac.compare_digest(plain.encode(), stored.encode()):
+            return False, None
+        return True, await hash_password(plain)
+    return await _run(pwd_context.verify_and_update, plain, stored)
+
+def shutdown_password_hashing():
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=False)
+        _hash_executor = None
+
+class TokenClaims(BaseModel):
+    user_id: str  # auth.id
+    email: str
+    role: str
+    org_id: Optional[str] = None
+    language: Optional[str] = None
+    profile_id: Optional[str] = None  # admins.id / students.id / organizations.id
+    exp: int
+
+claims_cache = TTLCache(maxsize=JWT_CLAIMS_CACHE_SIZE)
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "sub": data.get("email")})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def decode_access_token(token: str):
-    return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+def decode_access_token(token: str) -> TokenClaims:
+    """Verify a token minted by create_access_token; raises jwt.InvalidTokenError."""
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    claims = claims_cache.get(key)
+    if claims is not None:
+        return claims
 
-def get_current_user(token: str = Depends(oauth2_scheme)):
+    claims = TokenClaims(**jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], options={"require": ["exp"]}))
+    ttl = claims.exp - time.time()
+    if ttl > 0:
+        claims_cache.set(key, claims, ttl)
+    return claims
+
+def get_current_user(token: str = Depends(oauth2_scheme)) -> TokenClaims:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = decode_access_token(token)
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        return email
-    except JWTError:
-        raise credentials_exception
\ No newline at end of file
+        return decode_access_token(token)
+    except (jwt.InvalidTokenError, ValueError):
+        raise credentials_exception
+
+def require_role(*roles: str):
+    """Dependency returning the caller's claims, or 403 unless their role is one of `roles`."""
+    def dependency(claims: TokenClaims = Depends(get_current_user)) -> TokenClaims:
+        if claims.role not in roles:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
+        return claims
+    return dependency
+
+def check_org(claims: TokenClaims, org_id: Optional[str]):
+    """403 unless the caller belongs to organization `org_id`."""
+    if org_id is None or claims.org_id != org_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized for this organization")
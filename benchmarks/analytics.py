@@ -0,0 +1,102 @@
+# benchmarks/analytics.py
+#
+# Compares the pure-Python analytics loops (averages with safe_float plus a
+# separate pass-rate scan, and the same loops extended with percentiles and
+# histograms) against analytics_engine.summarize, which produces all of them
+# from one columnar conversion.
+#
+# Usage: python -m benchmarks.analytics [--sizes 1000 10000 100000] [--repeat 5]
+
+import argparse
+import random
+import time
+
+import analytics_engine
+
+COLUMNS = ("overall_mark", "fluency_mark", "vocab_mark", "sentence_mastery", "pronunciation")
+
+
+def make_rows(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        row = {"id": str(i), "org_id": "org-1", "language": "english"}
+        for column in analytics_engine.MARK_COLUMNS:
+            row[column] = None if rng.random() < 0.05 else round(rng.uniform(0, 100), 1)
+        rows.append(row)
+    return rows
+
+
+def python_loops(students):
+    """The loops the endpoints used: one pass per average plus a pass-rate scan."""
+    def safe_float(value):
+        if value is None:
+            return 0.0
+        try:
+            return float(value)
+        except (ValueError, TypeError):
+            return 0.0
+
+    n = len(students)
+    averages = {c: sum(safe_float(s.get(c)) for s in students) / n for c in COLUMNS}
+    passing = sum(1 for s in students if safe_float(s.get("overall_mark")) >= 70)
+    return averages, int(passing / n * 100)
+
+
+def python_distribution(students):
+    """Loops producing the same outputs as summarize: adds percentiles and histograms."""
+    averages, pass_rate = python_loops(students)
+    distribution = {}
+    for column in analytics_engine.MARK_COLUMNS:
+        marks = sorted(float(s[column]) for s in students if s.get(column) is not None)
+        percentiles = {}
+        for p in analytics_engine.PERCENTILES:
+            k = (len(marks) - 1) * p / 100
+            lo = int(k)
+            hi = min(lo + 1, len(marks) - 1)
+            percentiles[p] = marks[lo] + (marks[hi] - marks[lo]) * (k - lo)
+        counts = [0] * 10
+        for mark in marks:
+            counts[min(max(int(mark // 10), 0), 9)] += 1
+        distribution[column] = (percentiles, counts)
+    return averages, pass_rate, distribution
+
+
+def best_of(fn, rows, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(rows)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'students':>10} {'loops ms':>10} {'loops+dist ms':>14} {'numpy ms':>10} {'vs loops+dist':>14}")
+    for size in args.sizes:
+        rows = make_rows(size)
+
+        # Both paths must agree on the numbers the endpoints return
+        averages, pass_rate, distribution = python_distribution(rows)
+        summary = analytics_engine.summarize(rows)
+        for column in COLUMNS:
+            assert abs(summary["columns"][column]["mean"] - averages[column]) < 1e-6
+        for column, (percentiles, counts) in distribution.items():
+            assert summary["columns"][column]["histogram"] == counts
+            for p, value in percentiles.items():
+                assert abs(summary["columns"][column]["percentiles"][f"p{p}"] - value) < 1e-6
+        assert int(summary["pass_rate"]) == pass_rate
+
+        loops = best_of(python_loops, rows, args.repeat)
+        loops_dist = best_of(python_distribution, rows, args.repeat)
+        engine = best_of(analytics_engine.summarize, rows, args.repeat)
+        print(f"{size:>10} {loops:>10.2f} {loops_dist:>14.2f} {engine:>10.2f} {loops_dist / engine:>13.1f}x")
+
+
+if __name__ == "__main__":
+    main()
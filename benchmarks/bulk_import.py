@@ -0,0 +1,112 @@
+# benchmarks/bulk_import.py
+#
+# Rows per second when onboarding students one /student/add call at a time
+# (as the UI does) versus a single /student/bulk upload. PostgREST is
+# simulated with a mock transport that adds a fixed latency per round-trip.
+#
+# Usage: python -m benchmarks.bulk_import [--rows 2000] [--latency-ms 20] [--chunk-size 500]
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import time
+
+import httpx
+from fastapi import FastAPI
+from postgrest import AsyncPostgrestClient
+
+BASE_URL = "http://postgrest.local/rest/v1"
+
+# Password hashing is not what this benchmark measures; keep bcrypt cheap
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+
+def make_client(latency: float) -> AsyncPostgrestClient:
+    ids = itertools.count(1)
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency)
+        if request.url.path.endswith("/rpc/create_student"):
+            row = json.loads(request.content)["p_student"]
+            return httpx.Response(200, content=json.dumps({"id": str(next(ids)), **row}))
+        if request.method == "POST" and "/rpc/" not in request.url.path:
+            rows = json.loads(request.content)
+            rows = rows if isinstance(rows, list) else [rows]
+            return httpx.Response(201, content=json.dumps([{"id": str(next(ids)), **row} for row in rows]))
+        return httpx.Response(200, content="[]")
+
+    client = AsyncPostgrestClient(BASE_URL)
+    client.session = httpx.AsyncClient(base_url=BASE_URL, transport=httpx.MockTransport(handler))
+    return client
+
+
+def make_app(latency: float) -> FastAPI:
+    from auth_utils import TokenClaims, get_current_user
+    from database import get_supabase
+    from routers.students import router as students_router
+
+    app = FastAPI()
+    app.include_router(students_router)
+    client = make_client(latency)
+    app.dependency_overrides[get_supabase] = lambda: client
+    app.dependency_overrides[get_current_user] = lambda: TokenClaims(user_id="1", email="admin@example.com", role="admin", org_id="org-1", exp=0)
+    return app
+
+
+def make_students(n: int):
+    return [
+        {
+            "name": f"Student {i}",
+            "org_id": "org-1",
+            "language": "english",
+            "email": f"student{i}@example.com",
+            "password": "changeme",
+            "overall_mark": 70.0,
+        }
+        for i in range(n)
+    ]
+
+
+async def one_by_one(app: FastAPI, students) -> float:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        start = time.perf_counter()
+        for student in students:
+            response = await client.post("/student/add", json=student)
+            response.raise_for_status()
+        return len(students) / (time.perf_counter() - start)
+
+
+async def bulk(app: FastAPI, students, chunk_size: int) -> float:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+        start = time.perf_counter()
+        response = await client.post("/student/bulk", params={"chunk_size": chunk_size}, json=students)
+        response.raise_for_status()
+        assert response.json()["created"] == len(students)
+        return len(students) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    args = parser.parse_args()
+
+    latency = args.latency_ms / 1000
+    students = make_students(args.rows)
+
+    # The per-row path is slow by design; time a sample and extrapolate
+    sample = students[:min(len(students), 100)]
+    single = asyncio.run(one_by_one(make_app(latency), sample))
+    batched = asyncio.run(bulk(make_app(latency), students, args.chunk_size))
+
+    print(f"rows={args.rows} latency={args.latency_ms}ms chunk_size={args.chunk_size}")
+    print(f"/student/add per row: {single:10.1f} rows/s (sampled {len(sample)} rows)")
+    print(f"/student/bulk:        {batched:10.1f} rows/s")
+    print(f"speedup:              {batched / single:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
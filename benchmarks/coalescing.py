@@ -0,0 +1,90 @@
+# benchmarks/coalescing.py
+#
+# A "test window opens" burst: many students and admins of one cohort hit
+# /student-tests/upcoming and /analytics/summary at the same moment, with the
+# response and cohort caches bypassed. Runs the burst with and without
+# single-flight read coalescing against the in-memory Supabase stand-in and
+# reports database calls, database QPS over the burst and the collapse ratio.
+#
+# Usage: python -m benchmarks.coalescing [--requests 500] [--latency-ms 20]
+
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+
+def total(counter) -> float:
+    return sum(counter._values.values())
+
+
+async def burst(app, db, coalesce: bool, requests: int, org_id: str) -> dict:
+    import database
+    from auth_utils import create_access_token
+    from metrics import db_queries
+    from response_cache import set_cache_backend
+    from single_flight import db_reads, db_reads_coalesced
+    from benchmarks.endpoints import NullCacheBackend
+
+    database.DB_COALESCE_READS = coalesce
+    database.set_supabase(db.client())
+    # Every request misses both the response cache and the cohort cache
+    set_cache_backend(NullCacheBackend())
+
+    def token(i: int, role: str) -> dict:
+        claims = {"user_id": f"{role}-{i}", "email": f"{role}{i}@example.com", "role": role,
+                  "org_id": org_id, "language": "english", "profile_id": f"{role}-{i}"}
+        return {"Authorization": "Bearer " + create_access_token(claims)}
+
+    calls = [
+        ("/student-tests/upcoming", {}, token(i, "student")) if i % 2 else
+        ("/analytics/summary", {"org_id": org_id, "language": "english"}, token(i, "admin"))
+        for i in range(requests)
+    ]
+
+    before = (total(db_queries), total(db_reads), total(db_reads_coalesced))
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(client.get(path, params=params, headers=headers) for path, params, headers in calls))
+        elapsed = time.perf_counter() - start
+    assert all(r.status_code == 200 for r in responses), {r.status_code for r in responses}
+
+    queries = total(db_queries) - before[0]
+    reads = total(db_reads) - before[1]
+    coalesced = total(db_reads_coalesced) - before[2]
+    return {
+        "db_calls": int(queries),
+        "db_qps": queries / elapsed,
+        "collapse": reads / max(reads - coalesced, 1) if coalesce else 1.0,
+        "elapsed_ms": elapsed * 1000,
+    }
+
+
+async def run(args):
+    from fake_supabase import FakeDatabase, seed
+    from main import app
+
+    db = FakeDatabase(latency=args.latency_ms / 1000)
+    org_id = seed(db, students_per_cohort=50)["organizations"][0]
+
+    print(f"requests={args.requests} latency={args.latency_ms}ms")
+    for coalesce in (False, True):
+        r = await burst(app, db, coalesce, args.requests, org_id)
+        label = "coalesced" if coalesce else "direct"
+        print(f"{label:<10} db_calls={r['db_calls']:<5} db_qps={r['db_qps']:8.1f}  "
+              f"collapse={r['collapse']:6.1f}x  burst={r['elapsed_ms']:.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
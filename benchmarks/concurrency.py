@@ -0,0 +1,107 @@
+# benchmarks/concurrency.py
+#
+# Compares requests-per-second for a route that calls the blocking Supabase
+# client (the old pattern) against the same route going through the shared
+# async client in database.py. PostgREST is simulated with a mock transport
+# that adds a fixed latency, so this runs offline.
+#
+# Usage: python -m benchmarks.concurrency [--requests 200] [--concurrency 50] [--latency-ms 20]
+
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+from fastapi import FastAPI
+from postgrest import AsyncPostgrestClient, SyncPostgrestClient
+
+BASE_URL = "http://postgrest.local/rest/v1"
+
+ROWS = [
+    {"id": str(i), "name": f"Student {i}", "org_id": "org-1", "language": "english", "overall_mark": 70.0}
+    for i in range(50)
+]
+
+
+def make_sync_client(latency: float) -> SyncPostgrestClient:
+    def handler(request: httpx.Request) -> httpx.Response:
+        time.sleep(latency)
+        return httpx.Response(200, content=json.dumps(ROWS))
+
+    client = SyncPostgrestClient(BASE_URL)
+    client.session = httpx.Client(base_url=BASE_URL, transport=httpx.MockTransport(handler))
+    return client
+
+
+def make_async_client(latency: float) -> AsyncPostgrestClient:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency)
+        return httpx.Response(200, content=json.dumps(ROWS))
+
+    client = AsyncPostgrestClient(BASE_URL)
+    client.session = httpx.AsyncClient(base_url=BASE_URL, transport=httpx.MockTransport(handler))
+    return client
+
+
+def blocking_app(latency: float) -> FastAPI:
+    app = FastAPI()
+    supabase = make_sync_client(latency)
+
+    @app.get("/analytics/students")
+    async def get_students_analytics(org_id: str, language: str):
+        response = supabase.table("students").select("*").eq("org_id", org_id).eq("language", language).execute()
+        return {"students": response.data}
+
+    return app
+
+
+def async_app(latency: float) -> FastAPI:
+    from analytics_endpoints import router as analytics_router
+    from auth_utils import TokenClaims, get_current_user
+    from database import get_supabase
+
+    app = FastAPI()
+    app.include_router(analytics_router)
+    client = make_async_client(latency)
+    app.dependency_overrides[get_supabase] = lambda: client
+    app.dependency_overrides[get_current_user] = lambda: TokenClaims(user_id="1", email="admin@example.com", role="admin", exp=0)
+    return app
+
+
+async def drive(app: FastAPI, total: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one():
+            async with semaphore:
+                response = await client.get("/analytics/students", params={"org_id": "org-1", "language": "english"})
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - start
+
+    return total / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    latency = args.latency_ms / 1000
+    before = asyncio.run(drive(blocking_app(latency), args.requests, args.concurrency))
+    after = asyncio.run(drive(async_app(latency), args.requests, args.concurrency))
+
+    print(f"requests={args.requests} concurrency={args.concurrency} latency={args.latency_ms}ms")
+    print(f"blocking client: {before:8.1f} req/s")
+    print(f"async client:    {after:8.1f} req/s")
+    print(f"speedup:         {after / before:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# benchmarks/distribution.py
+#
+# /analytics/distribution for one large org (default 100k students across
+# four languages) served from the in-memory Supabase stand-in with a fixed
+# per-call latency. Reports end-to-end latency split into fetch and compute,
+# and checks the percentiles, histograms and pass rates against a direct
+# NumPy computation over the seeded rows. The stand-in filters and sorts the
+# whole table in Python on every call, so at 100k rows its fetch time is
+# mostly its own CPU; compute+encode is the part the endpoint owns.
+#
+# Usage: python -m benchmarks.distribution [--students 100000] [--latency-ms 5]
+#                                          [--page-size 1000] [--repeat 3]
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+import uuid
+
+import httpx
+import numpy as np
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+LANGUAGES = ("english", "spanish", "french", "german")
+
+
+def check(result: dict, students: list, pass_mark: float = 70.0):
+    """Compare the endpoint's figures with an independent computation; raises on mismatch."""
+    from analytics_engine import MARK_COLUMNS, PERCENTILES
+
+    cohorts = {"overall": students}
+    cohorts.update({lang: [s for s in students if s["language"] == lang] for lang in LANGUAGES})
+    for name, rows in cohorts.items():
+        summary = result["overall"] if name == "overall" else result["languages"][name]
+        assert summary["total_students"] == len(rows), name
+        overall = np.array([r["overall_mark"] if r["overall_mark"] is not None else np.nan for r in rows])
+        assert summary["passing_students"] == int((overall >= pass_mark).sum()), name
+        for column in MARK_COLUMNS:
+            values = np.array([r[column] for r in rows if r[column] is not None], dtype=float)
+            stats = summary["columns"][column]
+            for p in PERCENTILES:
+                assert abs(stats["percentiles"][f"p{p}"] - np.percentile(values, p)) < 1e-9, (name, column, p)
+            expected = np.histogram(np.clip(values, 0, 100), bins=10, range=(0, 100))[0]
+            assert stats["histogram"] == expected.tolist(), (name, column)
+
+
+async def run(args):
+    import pagination
+    from analytics_engine import MARK_COLUMNS
+    from auth_utils import create_access_token
+    from database import set_supabase
+    from fake_supabase import FakeDatabase, seed
+    from main import app
+    from response_cache import set_cache_backend
+    from benchmarks.endpoints import NullCacheBackend
+
+    db = FakeDatabase(latency=args.latency_ms / 1000)
+    org_id = seed(db, organizations=1, languages=LANGUAGES, students_per_cohort=0, tests_per_admin=0)["organizations"][0]
+
+    # Only the students table is read, so rows are appended directly rather
+    # than created user by user
+    rng = random.Random(7)
+    db.tables["students"].extend(
+        {
+            "id": str(uuid.uuid4()), "name": f"Student {i}", "org_id": org_id, "language": LANGUAGES[i % len(LANGUAGES)],
+            "email": f"student{i}@example.com",
+            **{column: None if rng.random() < 0.05 else round(rng.uniform(0, 100), 1) for column in MARK_COLUMNS},
+        }
+        for i in range(args.students)
+    )
+    set_supabase(db.client())
+    set_cache_backend(NullCacheBackend())
+
+    import analytics_endpoints
+    analytics_endpoints.DISTRIBUTION_PAGE_SIZE = args.page_size
+
+    # Time the fetch on its own by wrapping pagination.fetch_all
+    fetch_times = []
+    fetch_all = pagination.fetch_all
+
+    async def timed_fetch_all(*a, **kw):
+        t = time.perf_counter()
+        rows = await fetch_all(*a, **kw)
+        fetch_times.append(time.perf_counter() - t)
+        return rows
+
+    analytics_endpoints.fetch_all = timed_fetch_all
+
+    token = create_access_token({"user_id": "bench", "email": "bench@example.com", "role": "admin", "org_id": org_id})
+    headers = {"Authorization": f"Bearer {token}"}
+    totals = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+        for _ in range(args.repeat):
+            t = time.perf_counter()
+            response = await client.get("/analytics/distribution", params={"org_id": org_id}, headers=headers)
+            totals.append(time.perf_counter() - t)
+            response.raise_for_status()
+
+    check(response.json(), db.rows("students"))
+    total_ms = statistics.median(totals) * 1000
+    fetch_ms = statistics.median(fetch_times) * 1000
+    print(f"students={args.students} latency={args.latency_ms}ms page_size={args.page_size} "
+          f"db_calls/request={response.headers.get('x-db-round-trips')}")
+    print(f"end-to-end median={total_ms:.0f} ms  (fetch {fetch_ms:.0f} ms, compute+encode {total_ms - fetch_ms:.0f} ms)")
+    print("results match the direct NumPy computation")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=100000)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+# benchmarks/endpoints.py
+#
+# Load test for every router, fully offline: the app runs in-process against
+# the seeded in-memory Supabase stand-in (fake_supabase.py) with a fixed
+# artificial latency per database round-trip. Each scenario is driven at the
+# given concurrency and reports throughput and p50/p95/p99 latency.
+#
+# Save a baseline before a change and compare after it; --compare exits with
+# status 1 when a scenario's p95 or throughput regresses beyond --tolerance.
+#
+# Usage: python -m benchmarks.endpoints [--requests 200] [--concurrency 20] [--latency-ms 5]
+#                                       [--students 200] [--only student_list,tests_list]
+#                                       [--no-cache] [--save baseline.json]
+#                                       [--compare baseline.json] [--tolerance 0.25]
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+import time
+from typing import Callable, Dict, List, NamedTuple
+
+import httpx
+
+# Password hashing and access logs are not what this suite measures
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+PASSWORD = "password"
+
+
+class Scenario(NamedTuple):
+    name: str
+    method: str
+    # (request index, context) -> (path, keyword arguments for httpx)
+    build: Callable[[int, dict], tuple]
+    # Context list of ids the scenario pops from; refilled from the database
+    # before it runs, and caps its request count
+    consumes: str = ""
+
+
+def _admin(ctx, **kwargs):
+    return {"headers": ctx["admin_headers"], **kwargs}
+
+
+def _cohort(ctx):
+    return {"org_id": ctx["org_id"], "language": "english"}
+
+
+BULK_ROWS = 20
+
+
+def _new_student(i, ctx, n=0):
+    return {
+        "name": f"Bench {i}.{n}", "org_id": ctx["org_id"], "language": "english",
+        "email": f"bench{i}.{n}.{ctx['run']}@example.com", "password": PASSWORD, "overall_mark": 75.0,
+    }
+
+
+def _new_admin(i, ctx, n=0):
+    return {
+        "name": f"Bench Admin {i}.{n}", "org_id": ctx["org_id"], "role": "teacher", "contact": "555-0000",
+        "language": "english", "email": f"bench.admin{i}.{n}.{ctx['run']}@example.com", "password": PASSWORD,
+    }
+
+
+SCENARIOS: List[Scenario] = [
+    Scenario("login", "POST", lambda i, ctx: ("/auth/login", {"json": {"email": ctx["student_emails"][i % len(ctx["student_emails"])], "password": PASSWORD}})),
+    Scenario("organization_list", "GET", lambda i, ctx: ("/organization/list", {})),
+    Scenario("admin_list", "GET", lambda i, ctx: ("/admin/list", _admin(ctx, params={"org_id": ctx["org_id"]}))),
+    Scenario("admin_get", "GET", lambda i, ctx: (f"/admin/{ctx['admins'][i % len(ctx['admins'])]}", _admin(ctx))),
+    Scenario("admin_export", "GET", lambda i, ctx: ("/admin/export", _admin(ctx, params={"org_id": ctx["org_id"]}))),
+    Scenario("admin_add", "POST", lambda i, ctx: ("/admin/add", _admin(ctx, json=_new_admin(i, ctx)))),
+    Scenario("admin_bulk", "POST", lambda i, ctx: ("/admin/bulk", _admin(ctx, json=[_new_admin(i, ctx, n + 1) for n in range(BULK_ROWS)]))),
+    Scenario("admin_update", "PUT", lambda i, ctx: (f"/admin/{ctx['admins'][i % len(ctx['admins'])]}", _admin(ctx, json={"contact": f"555-{i:04d}"})), "admins"),
+    Scenario("admin_delete", "DELETE", lambda i, ctx: (f"/admin/{ctx['admins'].pop()}", _admin(ctx)), "admins"),
+    Scenario("student_list", "GET", lambda i, ctx: ("/student/list", _admin(ctx, params={**_cohort(ctx), "limit": 100}))),
+    Scenario("student_list_fields", "GET", lambda i, ctx: ("/student/list", _admin(ctx, params={**_cohort(ctx), "fields": "name,overall_mark"}))),
+    Scenario("student_get", "GET", lambda i, ctx: (f"/student/{ctx['students'][i % len(ctx['students'])]}", _admin(ctx))),
+    Scenario("student_export", "GET", lambda i, ctx: ("/student/export", _admin(ctx, params=_cohort(ctx)))),
+    Scenario("student_add", "POST", lambda i, ctx: ("/student/add", _admin(ctx, json=_new_student(i, ctx)))),
+    Scenario("student_bulk", "POST", lambda i, ctx: ("/student/bulk", _admin(ctx, json=[_new_student(i, ctx, n + 1) for n in range(BULK_ROWS)]))),
+    Scenario("student_update", "PUT", lambda i, ctx: (f"/student/{ctx['students'][i % len(ctx['students'])]}", _admin(ctx, json={"overall_mark": 40 + i % 60})), "students"),
+    Scenario("student_delete", "DELETE", lambda i, ctx: (f"/student/{ctx['students'].pop()}", _admin(ctx)), "students"),
+    Scenario("analytics_students", "GET", lambda i, ctx: ("/analytics/students", _admin(ctx, params=_cohort(ctx)))),
+    Scenario("analytics_leaderboard", "GET", lambda i, ctx: ("/analytics/leaderboard", _admin(ctx, params=_cohort(ctx)))),
+    Scenario("analytics_distribution", "GET", lambda i, ctx: ("/analytics/distribution", _admin(ctx, params=_cohort(ctx)))),
+    Scenario("analytics_summary", "GET", lambda i, ctx: ("/analytics/summary", _admin(ctx, params=_cohort(ctx)))),
+    Scenario("analytics_language_detail", "GET", lambda i, ctx: ("/analytics/language-detail", _admin(ctx, params=_cohort(ctx)))),
+    Scenario("analytics_trends", "GET", lambda i, ctx: ("/analytics/trends", _admin(ctx, params=_cohort(ctx)))),
+    Scenario("analytics_snapshot_rebuild", "POST", lambda i, ctx: ("/analytics/snapshot/rebuild", _admin(ctx, params=_cohort(ctx)))),
+    Scenario("tests_list", "GET", lambda i, ctx: ("/tests/list", _admin(ctx))),
+    Scenario("tests_add", "POST", lambda i, ctx: ("/tests/add", _admin(ctx, json={
+        "test_name": f"Bench {i}", "org_id": ctx["org_id"], "language": "english",
+        "test_duration": 30, "test_time": "2030-01-01T09:00:00",
+    }))),
+    Scenario("tests_update", "PUT", lambda i, ctx: (f"/tests/{ctx['tests'][i % len(ctx['tests'])]}", _admin(ctx, json={"test_duration": 30 + i % 60})), "tests"),
+    Scenario("tests_delete", "DELETE", lambda i, ctx: (f"/tests/{ctx['tests'].pop()}", _admin(ctx)), "tests"),
+    Scenario("student_tests_upcoming", "GET", lambda i, ctx: ("/student-tests/upcoming", {"headers": ctx["student_headers"]})),
+    Scenario("metrics", "GET", lambda i, ctx: ("/metrics", {})),
+]
+
+
+class NullCacheBackend:
+    """Response cache backend that never stores, so every GET reaches the handler."""
+
+    async def get(self, key):
+        return None
+
+    async def set(self, key, entry, ttl):
+        pass
+
+    async def generations(self, tags):
+        return [0] * len(tags)
+
+    async def bump(self, tags):
+        pass
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, ctx: dict, requests: int, concurrency: int) -> Dict[str, float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(i: int):
+        nonlocal errors
+        path, kwargs = scenario.build(i, ctx)
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.request(scenario.method, path, **kwargs)
+            latencies.append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "errors": errors,
+    }
+
+
+async def run(args) -> Dict[str, Dict[str, float]]:
+    from auth_utils import create_access_token
+    from database import set_supabase
+    from fake_supabase import FakeDatabase, seed
+    from main import app
+    from response_cache import set_cache_backend
+
+    db = FakeDatabase(latency=args.latency_ms / 1000)
+    ids = seed(db, students_per_cohort=args.students)
+    set_supabase(db.client())
+    if args.no_cache:
+        set_cache_backend(NullCacheBackend())
+
+    org_id = ids["organizations"][0]
+    admin = next(p for p in db.rows("auth_profiles") if p["role"] == "admin" and p["org_id"] == org_id and p["language"] == "english")
+    student = next(p for p in db.rows("auth_profiles") if p["role"] == "student" and p["org_id"] == org_id and p["language"] == "english")
+
+    def headers(profile):
+        claims = {k: profile[k] for k in ("email", "role", "org_id", "language", "profile_id")}
+        return {"Authorization": "Bearer " + create_access_token({"user_id": profile["id"], **claims})}
+
+    # Rows the write scenarios may change or delete; the bench admin itself
+    # and the tests of other admins are left alone
+    pools = {
+        "admins": lambda: [a["id"] for a in db.find("admins", org_id=org_id) if a["id"] != admin["profile_id"]],
+        "students": lambda: [s["id"] for s in db.find("students", org_id=org_id, language="english")],
+        "tests": lambda: [t["id"] for t in db.find("tests", user_id=admin["profile_id"])],
+    }
+
+    ctx = {
+        "run": int(time.time()),
+        "org_id": org_id,
+        "admins": [a["id"] for a in db.find("admins", org_id=org_id)],
+        "students": pools["students"](),
+        "student_emails": [s["email"] for s in db.find("students", org_id=org_id, language="english")],
+        "admin_headers": headers(admin),
+        "student_headers": headers(student),
+    }
+
+    selected = [s for s in SCENARIOS if not args.only or s.name in args.only.split(",")]
+    results = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+        for scenario in selected:
+            requests = args.requests
+            if scenario.consumes:
+                ctx[scenario.consumes] = pools[scenario.consumes]()
+                requests = min(requests, len(ctx[scenario.consumes]))
+            results[scenario.name] = await run_scenario(client, scenario, ctx, requests, args.concurrency)
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        if result["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']} -> {result['p95_ms']} ms")
+        if result["rps"] < before["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {before['rps']} -> {result['rps']} req/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--students", type=int, default=200, help="Students per (org, language) cohort")
+    parser.add_argument("--only", help="Comma separated scenario names")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the response cache")
+    parser.add_argument("--save", help="Write results as JSON to this path")
+    parser.add_argument("--compare", help="Baseline JSON from a previous --save")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    print(f"requests={args.requests} concurrency={args.concurrency} latency={args.latency_ms}ms "
+          f"students/cohort={args.students} cache={'off' if args.no_cache else 'on'}")
+    print(f"{'scenario':<28}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for name, r in results.items():
+        print(f"{name:<28}{r['rps']:>10}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['errors']:>8}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions beyond tolerance:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo regressions beyond tolerance.")
+
+
+if __name__ == "__main__":
+    main()
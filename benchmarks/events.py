@@ -0,0 +1,111 @@
+# benchmarks/events.py
+#
+# Idle WebSocket subscribers held by one uvicorn worker (serving the
+# in-memory Supabase stand-in) and the time to fan one test status change out
+# to all of them. Reports the worker's resident memory per subscriber (Linux).
+#
+# Usage: python -m benchmarks.events [--subscribers 2000] [--port 8765] [--events 5]
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+import websockets
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def rss_mb(pid: int):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+
+
+async def wait_ready(base_url: str):
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        for _ in range(100):
+            try:
+                await client.get("/")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+async def run(args, pid: int):
+    from auth_utils import create_access_token
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    await wait_ready(base_url)
+
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        org_id = (await client.get("/organization/list")).json()["organizations"][0]["id"]
+        claims = {"email": "bench@example.com", "org_id": org_id, "language": "english"}
+        student = create_access_token({**claims, "user_id": "bench-student", "role": "student"})
+        admin = {"Authorization": "Bearer " + create_access_token(
+            {**claims, "user_id": "bench-admin", "role": "admin", "profile_id": "bench-admin"}
+        )}
+
+        before = rss_mb(pid)
+        url = f"ws://127.0.0.1:{args.port}/events/tests?token={student}"
+        sockets = []
+        start = time.perf_counter()
+        for batch in range(0, args.subscribers, 200):
+            sockets += await asyncio.gather(*(
+                websockets.connect(url, ping_interval=None) for _ in range(min(200, args.subscribers - batch))
+            ))
+        connect_s = time.perf_counter() - start
+        await asyncio.sleep(0.5)
+        after = rss_mb(pid)
+
+        fanout = []
+        for i in range(args.events):
+            start = time.perf_counter()
+            response = await client.post("/tests/add", headers=admin, json={
+                "test_name": f"Bench {i}", "org_id": org_id, "language": "english",
+                "test_duration": 30, "test_time": "2030-01-01T09:00:00",
+            })
+            response.raise_for_status()
+            await asyncio.gather(*(ws.recv() for ws in sockets))
+            fanout.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(ws.close() for ws in sockets))
+
+    print(f"subscribers={args.subscribers} connected in {connect_s:.2f}s")
+    if before is not None and after is not None:
+        per_kb = (after - before) * 1024 / args.subscribers
+        print(f"worker RSS {before:.1f} MB -> {after:.1f} MB ({per_kb:.1f} KB per idle subscriber)")
+    fanout.sort()
+    print(f"write -> all subscribers received: median={fanout[len(fanout) // 2] * 1000:.1f} ms max={fanout[-1] * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subscribers", type=int, default=2000)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--events", type=int, default=5)
+    args = parser.parse_args()
+
+    env = {**os.environ, "SUPABASE_BACKEND": "fake", "LOG_LEVEL": "WARNING", "PYTHONWARNINGS": "ignore"}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning",
+         "--backlog", str(max(2048, args.subscribers))],
+        cwd=ROOT, env=env,
+    )
+    try:
+        asyncio.run(run(args, server.pid))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# benchmarks/login.py
+#
+# Login latency under concurrency with bcrypt verification run inline on the
+# event loop versus on the password hashing pool. PostgREST is simulated with
+# a mock transport that adds a fixed latency per round-trip. Also reports the
+# worst event-loop stall seen by a heartbeat task while logins are running.
+#
+# Usage: python -m benchmarks.login [--requests 200] [--concurrency 8] [--latency-ms 5]
+#                                   [--rounds 10] [--budget-ms 1500]
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+import httpx
+
+BASE_URL = "http://postgrest.local/rest/v1"
+PASSWORD = "correct horse battery staple"
+
+
+def make_client(latency: float, password_hash: str, users: int):
+    from postgrest import AsyncPostgrestClient
+
+    profiles = {
+        f"user{i}@example.com": {
+            "id": str(i),
+            "email": f"user{i}@example.com",
+            "username": f"User {i}",
+            "password": password_hash,
+            "role": "student",
+            "org_id": "org-1",
+            "language": "english",
+        }
+        for i in range(users)
+    }
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency)
+        if request.url.path.endswith("/auth_profiles"):
+            email = request.url.params.get("email", "").removeprefix("eq.")
+            row = profiles.get(email)
+            return httpx.Response(200, content=json.dumps([row] if row else []))
+        return httpx.Response(200, content="[]")
+
+    client = AsyncPostgrestClient(BASE_URL)
+    client.session = httpx.AsyncClient(base_url=BASE_URL, transport=httpx.MockTransport(handler))
+    return client
+
+
+async def heartbeat(stop: asyncio.Event, interval: float = 0.01) -> float:
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def run(app, requests: int, concurrency: int, users: int):
+    from response_cache import MemoryCacheBackend, set_cache_backend
+
+    # Start every run without cached profiles
+    set_cache_backend(MemoryCacheBackend())
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+        async def login(i: int):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post("/auth/login", json={"email": f"user{i % users}@example.com", "password": PASSWORD})
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code == 200, response.text
+
+        stop = asyncio.Event()
+        stall = asyncio.create_task(heartbeat(stop))
+        start = time.perf_counter()
+        await asyncio.gather(*(login(i) for i in range(requests)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+
+    latencies.sort()
+    return {
+        "rps": requests / elapsed,
+        "p50": statistics.median(latencies),
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        "stall": await stall,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=1500.0)
+    args = parser.parse_args()
+
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    import auth_utils
+    from database import get_supabase
+    from main import app
+
+    app.dependency_overrides[get_supabase] = lambda: client
+    client = make_client(args.latency_ms / 1000, auth_utils.pwd_context.hash(PASSWORD), args.users)
+
+    pooled_run = auth_utils._run
+
+    async def inline_run(fn, *args):
+        return fn(*args)
+
+    print(f"requests={args.requests} concurrency={args.concurrency} rounds={args.rounds} "
+          f"workers={auth_utils.PASSWORD_HASH_WORKERS} latency={args.latency_ms}ms")
+    results = {}
+    for mode, runner in (("inline", inline_run), ("pool", pooled_run)):
+        auth_utils._run = runner
+        results[mode] = r = asyncio.run(run(app, args.requests, args.concurrency, args.users))
+        print(f"{mode:>6}: {r['rps']:7.1f} req/s  p50 {r['p50'] * 1000:8.1f} ms  "
+              f"p99 {r['p99'] * 1000:8.1f} ms  worst loop stall {r['stall'] * 1000:7.1f} ms")
+    auth_utils._run = pooled_run
+
+    p99 = results["pool"]["p99"] * 1000
+    verdict = "within" if p99 <= args.budget_ms else "OVER"
+    print(f"pool p99 {p99:.1f} ms is {verdict} the {args.budget_ms:.0f} ms budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# benchmarks/startup.py
+#
+# Cold start of one API worker, measured in a fresh interpreter per run:
+# importing `main` (module load plus create_app), running the lifespan
+# startup (client creation, connection warm-up, scheduler) and serving the
+# first request. The database is the in-memory stand-in with a fixed
+# per-call latency, so the run is offline and repeatable.
+#
+# Exits with status 1 when the median import + startup time exceeds
+# --budget-ms, for use as a regression check before deploy.
+#
+# Usage: python -m benchmarks.startup [--runs 5] [--latency-ms 20] [--budget-ms 3000]
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import asyncio, json, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+import httpx
+from database import set_supabase
+from fake_supabase import FakeDatabase
+
+async def probe():
+    set_supabase(FakeDatabase(latency={latency}).client())
+    app = main.app
+    begin = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        started = time.perf_counter()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            response = await client.get("/organization/list")
+        first = time.perf_counter()
+    assert response.status_code == 200, response.text
+    return {{
+        "import_ms": (imported - start) * 1000,
+        "startup_ms": (started - begin) * 1000,
+        "first_request_ms": (first - started) * 1000,
+    }}
+
+print(json.dumps(asyncio.run(probe())))
+"""
+
+
+def run_once(latency_ms: float) -> dict:
+    env = {**os.environ, "LOG_LEVEL": "WARNING", "PYTHONWARNINGS": "ignore"}
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(latency=latency_ms / 1000)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--budget-ms", type=float, default=3000.0)
+    args = parser.parse_args()
+
+    runs = [run_once(args.latency_ms) for _ in range(args.runs)]
+
+    print(f"runs={args.runs} latency={args.latency_ms}ms")
+    for key in ("import_ms", "startup_ms", "first_request_ms"):
+        values = [r[key] for r in runs]
+        print(f"{key:<18} median={statistics.median(values):8.1f}  max={max(values):8.1f}")
+
+    cold = statistics.median(r["import_ms"] + r["startup_ms"] for r in runs)
+    print(f"{'cold start':<18} median={cold:8.1f}  budget={args.budget_ms:.0f}")
+    if cold > args.budget_ms:
+        print("Cold start over budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+# bulk_import.py
+import asyncio
+import codecs
+import csv
+import json
+import time
+from typing import AsyncIterator, Callable, Dict, List, Optional, Type
+
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, ValidationError
+from supabase import AsyncClient
+
+from auth_utils import hash_password
+
+DEFAULT_CHUNK_SIZE = 500
+MAX_CHUNK_SIZE = 1000
+
+
+class MalformedRecord:
+    """Stands in for a record that could not be parsed; reported as invalid."""
+
+    def __init__(self, error: str):
+        self.error = error
+
+
+async def _stream_lines(request: Request) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    async for chunk in request.stream():
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer
+
+
+async def _csv_rows(request: Request) -> AsyncIterator[list]:
+    # A quoted field may span lines (and contain blank ones), so lines are
+    # gathered until their quotes balance and parsed together as one record
+    lines: List[str] = []
+    quotes = 0
+    async for line in _stream_lines(request):
+        if not lines and not line.strip():
+            continue
+        # The reader needs line endings to keep newlines inside quoted fields
+        lines.append(line + "\n")
+        quotes += line.count('"')
+        if quotes % 2 == 0:
+            yield next(csv.reader(lines))
+            lines, quotes = [], 0
+    if lines:
+        yield next(csv.reader(lines))
+
+
+async def read_records(request: Request) -> AsyncIterator[dict]:
+    """
+    Yield raw records from a CSV (text/csv, header row required), NDJSON
+    (application/x-ndjson) or JSON array (application/json) request body.
+    CSV and NDJSON are parsed as the body streams in; an NDJSON line that is
+    not valid JSON is yielded as a MalformedRecord.
+    """
+    content_type = request.headers.get("content-type", "")
+
+    if "csv" in content_type:
+        header = None
+        async for values in _csv_rows(request):
+            if header is None:
+                header = [h.strip() for h in values]
+                continue
+            # Empty CSV cells mean "not provided"
+            yield {k: (v.strip() or None) for k, v in zip(header, values)}
+    elif "ndjson" in content_type:
+        async for line in _stream_lines(request):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                yield MalformedRecord(f"Invalid JSON: {e}")
+    else:
+        try:
+            records = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array, NDJSON or CSV")
+        if not isinstance(records, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array, NDJSON or CSV")
+        for record in records:
+            yield record
+
+
+async def _import_chunk(
+    supabase: AsyncClient,
+    chunk: List[tuple],
+    profile_table: str,
+    role: str,
+    to_profile: Callable[[BaseModel], dict],
+    results: List[dict]
+) -> List[dict]:
+    # One `in` query finds every email in the chunk that is already registered
+    emails = [user.email for _, user in chunk]
+    existing_response = await supabase.table("auth").select("email").in_("email", emails).execute()
+    existing = {row["email"] for row in existing_response.data or []}
+
+    pending = []
+    for index, user in chunk:
+        if user.email in existing:
+            results.append({"row": index, "email": user.email, "status": "duplicate", "error": "Email already registered"})
+        else:
+            pending.append((index, user))
+    if not pending:
+        return []
+
+    try:
+        profile_response = await supabase.table(profile_table).insert([to_profile(user) for _, user in pending]).execute()
+        profiles = profile_response.data or []
+        if len(profiles) != len(pending):
+            raise Exception(f"Failed to create {profile_table} records")
+    except Exception as e:
+        for index, user in pending:
+            results.append({"row": index, "email": user.email, "status": "failed", "error": str(e)})
+        return []
+
+    try:
+        hashes = await asyncio.gather(*(hash_password(user.password) for _, user in pending))
+        auth_response = await supabase.table("auth").insert([
+            {"username": user.name, "email": user.email, "password": password_hash, "role": role}
+            for (_, user), password_hash in zip(pending, hashes)
+        ]).execute()
+        if len(auth_response.data or []) != len(pending):
+            raise Exception("Failed to create auth records")
+    except Exception as e:
+        # Remove the profile rows so the chunk leaves no users without logins
+        await supabase.table(profile_table).delete().in_("id", [p["id"] for p in profiles]).execute()
+        for index, user in pending:
+            results.append({"row": index, "email": user.email, "status": "failed", "error": str(e)})
+        return []
+
+    for (index, user), profile in zip(pending, profiles):
+        results.append({"row": index, "email": user.email, "status": "created", "id": profile["id"]})
+    return profiles
+
+
+async def import_users(
+    supabase: AsyncClient,
+    records: AsyncIterator[dict],
+    model: Type[BaseModel],
+    profile_table: str,
+    role: str,
+    to_profile: Callable[[BaseModel], dict],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    on_created: Optional[Callable] = None,
+    org_id: Optional[str] = None
+) -> Dict:
+    """
+    Validate and insert users chunk by chunk: per chunk one duplicate check,
+    one multi-row insert into `profile_table` and one into auth. Returns a
+    per-row report in input order plus throughput. With `org_id`, rows for
+    any other organization are rejected.
+    """
+    start = time.perf_counter()
+    results: List[dict] = []
+    seen = set()
+    chunk: List[tuple] = []
+
+    async def flush():
+        created = await _import_chunk(supabase, chunk, profile_table, role, to_profile, results)
+        if created and on_created:
+            await on_created(created)
+        chunk.clear()
+
+    index = -1
+    async for index, record in _enumerate(records):
+        if isinstance(record, MalformedRecord):
+            results.append({"row": index, "email": None, "status": "invalid", "error": record.error})
+            continue
+
+        try:
+            user = model(**record)
+        except (ValidationError, TypeError) as e:
+            results.append({"row": index, "email": record.get("email") if isinstance(record, dict) else None, "status": "invalid", "error": str(e)})
+            continue
+
+        if org_id is not None and user.org_id != org_id:
+            results.append({"row": index, "email": user.email, "status": "forbidden", "error": "Not authorized for this organization"})
+            continue
+
+        if user.email in seen:
+            results.append({"row": index, "email": user.email, "status": "duplicate", "error": "Email repeated in upload"})
+            continue
+        seen.add(user.email)
+
+        chunk.append((index, user))
+        if len(chunk) >= chunk_size:
+            await flush()
+
+    if chunk:
+        await flush()
+
+    elapsed = time.perf_counter() - start
+    total = index + 1
+    results.sort(key=lambda r: r["row"])
+    created = sum(1 for r in results if r["status"] == "created")
+
+    return {
+        "total": total,
+        "created": created,
+        "skipped": total - created,
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(total / elapsed, 1) if elapsed > 0 else None,
+        "results": results
+    }
+
+
+async def _enumerate(records: AsyncIterator[dict]):
+    index = 0
+    async for record in records:
+        yield index, record
+        index += 1
@@ -0,0 +1,59 @@
+# completion_scheduler.py
+import logging
+import os
+from datetime import datetime
+from typing import List
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler # type: ignore
+from apscheduler.triggers.interval import IntervalTrigger # type: ignore
+
+from database import get_supabase
+from response_cache import invalidate_tags
+from event_broker import broker
+from upcoming_tests import invalidate_upcoming_tests
+
+logger = logging.getLogger(__name__)
+
+TEST_COMPLETION_INTERVAL = int(os.getenv("TEST_COMPLETION_INTERVAL", "30"))
+
+scheduler = AsyncIOScheduler()
+
+
+async def complete_expired_tests() -> List[dict]:
+    """
+    One scheduler tick: flip every upcoming test whose window has ended to
+    "completed" with a single bulk update, and return the completed rows.
+    """
+    try:
+        supabase = await get_supabase()
+        response = await supabase.rpc("complete_expired_tests", {}).execute()
+        completed = response.data or []
+
+        if completed:
+            await invalidate_tags("tests")
+            await invalidate_upcoming_tests(completed)
+            broker.publish("completed", completed)
+            logger.info("Marked tests as completed", extra={"completed": len(completed)})
+        return completed
+    except Exception as e:
+        logger.exception("Error completing expired tests")
+        return []
+
+
+def start_test_scheduler():
+    # First tick runs immediately so tests that ended while we were down are caught up
+    scheduler.add_job(
+        complete_expired_tests,
+        trigger=IntervalTrigger(seconds=TEST_COMPLETION_INTERVAL),
+        id="complete_expired_tests",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+        next_run_time=datetime.now()
+    )
+    scheduler.start()
+
+
+def stop_test_scheduler():
+    if scheduler.running:
+        scheduler.shutdown(wait=False)
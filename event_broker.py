@@ -0,0 +1,66 @@
+# event_broker.py
+import asyncio
+import json
+import os
+from collections import defaultdict
+from typing import Dict, Iterable, Set, Tuple
+
+from metrics import Counter, Gauge, register
+
+# Events buffered per subscriber; when a client falls this far behind the
+# oldest event is dropped so one slow socket never holds up the fan-out
+TEST_EVENTS_QUEUE_SIZE = int(os.getenv("TEST_EVENTS_QUEUE_SIZE", "64"))
+
+# Fields sent to subscribers, matching /student-tests/upcoming
+EVENT_FIELDS = ("id", "test_name", "test_time", "test_duration", "test_link", "language", "status")
+
+test_event_subscribers = Gauge("test_event_subscribers", "Open test status subscriptions.")
+test_events_published = Counter("test_events_published_total", "Test status events broadcast, by type.", ("type",))
+test_events_dropped = Counter("test_events_dropped_total", "Events dropped for subscribers that fell behind.")
+register(test_event_subscribers, test_events_published, test_events_dropped)
+
+
+class EventBroker:
+    """
+    In-process fan-out of test status changes to subscribers of an
+    (org_id, language) cohort. Each subscriber is a bounded queue of
+    pre-encoded messages; publishing never awaits.
+    """
+
+    def __init__(self, queue_size: int = TEST_EVENTS_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Dict[Tuple[str, str], Set[asyncio.Queue]] = defaultdict(set)
+
+    def subscribe(self, org_id: str, language: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[(org_id, language)].add(queue)
+        test_event_subscribers.inc()
+        return queue
+
+    def unsubscribe(self, org_id: str, language: str, queue: asyncio.Queue):
+        cohort = self._subscribers.get((org_id, language))
+        if cohort is None or queue not in cohort:
+            return
+        cohort.discard(queue)
+        if not cohort:
+            del self._subscribers[(org_id, language)]
+        test_event_subscribers.dec()
+
+    def publish(self, event_type: str, tests: Iterable[dict]):
+        """Broadcast one event per test row to the row's cohort."""
+        for test in tests:
+            cohort = self._subscribers.get((test["org_id"], test["language"]))
+            test_events_published.inc((event_type,))
+            if not cohort:
+                continue
+
+            # Encoded once, shared by every subscriber in the cohort
+            message = json.dumps({"type": event_type, "test": {k: test.get(k) for k in EVENT_FIELDS}})
+            for queue in cohort:
+                if queue.full():
+                    queue.get_nowait()
+                    test_events_dropped.inc()
+                queue.put_nowait(message)
+
+
+broker = EventBroker()
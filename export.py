@@ -0,0 +1,64 @@
+# export.py
+import csv
+import io
+import json
+import logging
+import os
+from typing import Callable, List, Sequence
+
+from fastapi.responses import StreamingResponse
+
+from pagination import MAX_PAGE_SIZE, fetch_page
+
+logger = logging.getLogger(__name__)
+
+EXPORT_PAGE_SIZE = min(int(os.getenv("EXPORT_PAGE_SIZE", "1000")), MAX_PAGE_SIZE)
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _encode(rows: List[dict], columns: Sequence[str], fmt: str) -> bytes:
+    if fmt == "ndjson":
+        return "".join(json.dumps(row, default=str) + "\n" for row in rows).encode()
+    buffer = io.StringIO()
+    csv.DictWriter(buffer, columns, extrasaction="ignore").writerows(rows)
+    return buffer.getvalue().encode()
+
+
+def _csv_header(columns: Sequence[str]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(columns)
+    return buffer.getvalue().encode()
+
+
+async def export_rows(build_query: Callable, columns: Sequence[str], fmt: str, filename: str) -> StreamingResponse:
+    """
+    Stream every row matched by `build_query()` (a fresh query builder per
+    page) as NDJSON or CSV, one keyset page at a time. Only one page is held
+    in memory, and the next page is fetched only after the previous chunk
+    has been sent, so a slow client slows the export rather than buffering it.
+    """
+    # The first page is fetched up front so query errors still return a
+    # proper error status; everything after it is streamed
+    rows, cursor = await fetch_page(build_query(), None, EXPORT_PAGE_SIZE)
+
+    async def body():
+        nonlocal rows, cursor
+        if fmt == "csv":
+            yield _csv_header(columns)
+        yield _encode(rows, columns, fmt)
+        try:
+            while cursor:
+                rows, cursor = await fetch_page(build_query(), cursor, EXPORT_PAGE_SIZE)
+                yield _encode(rows, columns, fmt)
+        except Exception:
+            # Headers are already sent; the client sees a truncated download
+            logger.exception("Export aborted", extra={"export": filename})
+            raise
+
+    return StreamingResponse(
+        body(),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
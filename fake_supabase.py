@@ -0,0 +1,567 @@
+# fake_supabase.py
+"""
+In-memory stand-in for Supabase/PostgREST, for running the API and the
+benchmarks offline. Routers talk to it through the real postgrest query
+builders; only the HTTP transport is replaced, so filters, ordering,
+pagination, counts and embedded joins go through the same code paths as in
+production. The repo's SQL functions (sql/*.sql) are mirrored in Python.
+
+Supported: select (columns, *, many-to-one and one-to-many embeds),
+eq/neq/gt/gte/lt/lte/like/ilike/in/is and not.*, order, limit/offset,
+Prefer: count=exact, single(), insert (single and multi-row), upsert,
+update, delete and rpc (rolled back as a whole when it fails). Anything else
+answers 400 so gaps are visible.
+"""
+import asyncio
+import csv
+import json
+import random
+import re
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+from postgrest import AsyncPostgrestClient
+
+from analytics_engine import MARK_COLUMNS, PASS_MARK
+from analytics_snapshot import SUM_COLUMNS, compute_snapshot, contribution
+from database import session_transport
+
+BASE_URL = "http://fake-supabase.local/rest/v1"
+
+_RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+
+class FakeDatabaseError(Exception):
+    def __init__(self, code: str, message: str, status: int = 400):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.status = status
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _split_top_level(spec: str) -> List[str]:
+    parts, depth, current = [], 0, ""
+    for char in spec:
+        if char == "," and depth == 0:
+            parts.append(current)
+            current = ""
+            continue
+        depth += char == "("
+        depth -= char == ")"
+        current += char
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _coerce(operand: str, sample):
+    if isinstance(sample, bool):
+        return operand == "true"
+    if isinstance(sample, (int, float)):
+        try:
+            return float(operand)
+        except ValueError:
+            return operand
+    return operand
+
+
+def _comparable(value, operand: str):
+    target = _coerce(operand, value)
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and isinstance(target, str):
+        return str(value), target
+    return value, target
+
+
+def _like(value, pattern: str, flags=0) -> bool:
+    regex = "".join(".*" if c in "*%" else re.escape(c) for c in pattern)
+    return re.fullmatch(regex, str(value), flags) is not None
+
+
+def _match(row: dict, column: str, expression: str) -> bool:
+    negate = expression.startswith("not.")
+    if negate:
+        expression = expression[4:]
+    op, _, operand = expression.partition(".")
+    value = row.get(column)
+
+    if op == "is":
+        expected = {"null": None, "true": True, "false": False}.get(operand)
+        result = value is expected
+    elif value is None:
+        return False
+    elif op == "in":
+        options = next(csv.reader([operand[1:-1]])) if len(operand) > 2 else []
+        result = any(a == b for a, b in (_comparable(value, o) for o in options))
+    elif op in ("like", "ilike"):
+        result = _like(value, operand, re.IGNORECASE if op == "ilike" else 0)
+    else:
+        left, right = _comparable(value, operand)
+        try:
+            result = {
+                "eq": lambda: left == right,
+                "neq": lambda: left != right,
+                "gt": lambda: left > right,
+                "gte": lambda: left >= right,
+                "lt": lambda: left < right,
+                "lte": lambda: left <= right,
+            }[op]()
+        except KeyError:
+            raise FakeDatabaseError("PGRST100", f"Unsupported operator: {op}")
+    return result != negate
+
+
+def _sort(rows: List[dict], spec: str) -> List[dict]:
+    for part in reversed(spec.split(",")):
+        column, *modifiers = part.split(".")
+        desc = "desc" in modifiers
+        nulls_first = "nullsfirst" in modifiers or (desc and "nullslast" not in modifiers)
+        present = sorted((r for r in rows if r.get(column) is not None), key=lambda r: r[column], reverse=desc)
+        missing = [r for r in rows if r.get(column) is None]
+        rows = missing + present if nulls_first else present + missing
+    return rows
+
+
+class FakeDatabase:
+    """
+    Tables are lists of row dicts. `latency` (seconds, plus up to `jitter`)
+    is added to every request to approximate a network round-trip.
+    """
+
+    # Many-to-one embeds: (table, embedded table) -> local foreign key column
+    RELATIONS = {
+        ("students", "organizations"): "org_id",
+        ("admins", "organizations"): "org_id",
+        ("tests", "organizations"): "org_id",
+        ("tests", "admins"): "user_id",
+    }
+    UNIQUE = {"auth": ("email",), "students": ("email",), "admins": ("email",)}
+    PRIMARY_KEYS = {"analytics_snapshots": ("org_id", "language")}
+    DEFAULTS: Dict[str, Callable[[], dict]] = {
+        "tests": lambda: {"status": "upcoming", "created_at": _now().isoformat()},
+    }
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.tables: Dict[str, List[dict]] = defaultdict(list)
+        self.views: Dict[str, Callable[["FakeDatabase"], List[dict]]] = {"auth_profiles": _auth_profiles}
+        self.functions: Dict[str, Callable[["FakeDatabase", dict], object]] = dict(FUNCTIONS)
+
+    # Row helpers used by the RPC mirrors and seeding
+
+    def rows(self, name: str) -> List[dict]:
+        if name in self.views:
+            return self.views[name](self)
+        return self.tables[name]
+
+    def find(self, table: str, **where) -> List[dict]:
+        return [r for r in self.tables[table] if all(r.get(k) == v for k, v in where.items())]
+
+    def insert(self, table: str, row: dict) -> dict:
+        row = {**self.DEFAULTS.get(table, dict)(), **row}
+        if "id" not in row and table not in self.PRIMARY_KEYS:
+            row["id"] = str(uuid.uuid4())
+        for column in self.UNIQUE.get(table, ()):
+            if row.get(column) is not None and self.find(table, **{column: row[column]}):
+                raise FakeDatabaseError("23505", f'duplicate key value violates unique constraint "{table}_{column}_key"', 409)
+        self.tables[table].append(row)
+        return row
+
+    def _key(self, table: str, row: dict, on_conflict: Optional[str]) -> Optional[tuple]:
+        columns = on_conflict.split(",") if on_conflict else self.PRIMARY_KEYS.get(table, ("id",))
+        return tuple(row.get(c) for c in columns) if all(row.get(c) is not None for c in columns) else None
+
+    def upsert(self, table: str, row: dict, on_conflict: Optional[str] = None) -> dict:
+        key = self._key(table, row, on_conflict)
+        if key is not None:
+            for existing in self.tables[table]:
+                if self._key(table, existing, on_conflict) == key:
+                    existing.update(row)
+                    return existing
+        return self.insert(table, row)
+
+    # PostgREST emulation
+
+    def _project(self, table: str, row: dict, spec: str) -> dict:
+        out = {}
+        for item in _split_top_level(spec):
+            if item == "*":
+                out.update(row)
+            elif "(" in item:
+                name, inner = item[:-1].split("(", 1)
+                alias, _, name = name.rpartition(":")
+                name = name.split("!")[0]
+                out[alias or name] = self._embed(table, row, name, inner)
+            else:
+                alias, _, column = item.rpartition(":")
+                out[alias or column] = row.get(column)
+        return out
+
+    def _embed(self, table: str, row: dict, target: str, spec: str):
+        foreign_key = self.RELATIONS.get((table, target))
+        if foreign_key:
+            match = next((r for r in self.rows(target) if r.get("id") == row.get(foreign_key)), None)
+            return self._project(target, match, spec) if match else None
+        back_key = next((fk for (t, embedded), fk in self.RELATIONS.items() if t == target and embedded == table), None)
+        if back_key is None:
+            raise FakeDatabaseError("PGRST200", f"Could not find a relationship between '{table}' and '{target}'")
+        return [self._project(target, r, spec) for r in self.rows(target) if r.get(back_key) == row.get("id")]
+
+    def _filtered(self, table: str, params: httpx.QueryParams) -> List[dict]:
+        rows = self.rows(table)
+        for column, expression in params.multi_items():
+            if column in _RESERVED_PARAMS:
+                continue
+            if "." in column or column in ("or", "and"):
+                raise FakeDatabaseError("PGRST100", f"Unsupported filter: {column}")
+            rows = [r for r in rows if _match(r, column, expression)]
+        return rows
+
+    def _respond(self, request: httpx.Request, table: str, rows: List[dict], status: int = 200, total: Optional[int] = None) -> httpx.Response:
+        params = request.url.params
+        spec = params.get("select", "*")
+        body = [self._project(table, r, spec) for r in rows]
+        headers = {"content-type": "application/json"}
+        if total is not None:
+            headers["content-range"] = f"0-{max(len(body) - 1, 0)}/{total}" if body else f"*/{total}"
+        if "vnd.pgrst.object" in request.headers.get("accept", ""):
+            if len(body) != 1:
+                raise FakeDatabaseError("PGRST116", "JSON object requested, multiple (or no) rows returned", 406)
+            body = body[0]
+        content = b"" if request.method == "HEAD" else json.dumps(body, default=str).encode()
+        return httpx.Response(status, content=content, headers=headers)
+
+    def _read(self, request: httpx.Request, table: str) -> httpx.Response:
+        params = request.url.params
+        rows = self._filtered(table, params)
+        total = len(rows) if "count=" in request.headers.get("prefer", "") else None
+        if "order" in params:
+            rows = _sort(rows, params["order"])
+        offset = int(params.get("offset", 0))
+        limit = params.get("limit")
+        rows = rows[offset:offset + int(limit)] if limit is not None else rows[offset:]
+        return self._respond(request, table, rows, total=total)
+
+    def _write(self, request: httpx.Request, table: str) -> httpx.Response:
+        if table in self.views:
+            raise FakeDatabaseError("42809", f"cannot change view {table}")
+        params = request.url.params
+        body = json.loads(request.content) if request.content else {}
+
+        if request.method == "POST":
+            payload = body if isinstance(body, list) else [body]
+            if "merge-duplicates" in request.headers.get("prefer", ""):
+                rows = [self.upsert(table, dict(r), params.get("on_conflict")) for r in payload]
+            else:
+                snapshot = list(self.tables[table])
+                try:
+                    rows = [self.insert(table, dict(r)) for r in payload]
+                except FakeDatabaseError:
+                    # Multi-row inserts are all-or-nothing, as in one statement
+                    self.tables[table] = snapshot
+                    raise
+            return self._respond(request, table, rows, status=201)
+
+        rows = self._filtered(table, params)
+        if request.method == "PATCH":
+            for row in rows:
+                row.update(body)
+        elif request.method == "DELETE":
+            doomed = {id(r) for r in rows}
+            self.tables[table] = [r for r in self.tables[table] if id(r) not in doomed]
+        return self._respond(request, table, rows)
+
+    async def _rpc(self, request: httpx.Request, name: str) -> httpx.Response:
+        function = self.functions.get(name)
+        if function is None:
+            raise FakeDatabaseError("PGRST202", f"Could not find the function public.{name}", 404)
+        params = json.loads(request.content) if request.content else {}
+        # Each SQL function runs in one transaction: a failure part-way
+        # through undoes its inserts, deletes and in-place updates
+        saved = {name: (rows, list(rows), [dict(r) for r in rows]) for name, rows in self.tables.items()}
+        try:
+            result = function(self, params)
+            if asyncio.iscoroutine(result):
+                result = await result
+        except Exception:
+            self._rollback(saved)
+            raise
+        return httpx.Response(200, content=json.dumps(result, default=str).encode(), headers={"content-type": "application/json"})
+
+    def _rollback(self, saved: Dict[str, tuple]):
+        for name in list(self.tables):
+            if name not in saved:
+                del self.tables[name]
+        for name, (table, rows, contents) in saved.items():
+            for row, content in zip(rows, contents):
+                row.clear()
+                row.update(content)
+            table[:] = rows
+            self.tables[name] = table
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        if self.latency or self.jitter:
+            await asyncio.sleep(self.latency + random.random() * self.jitter)
+        path = request.url.path.split("/rest/v1/", 1)[-1].strip("/")
+        try:
+            if path.startswith("rpc/"):
+                return await self._rpc(request, path[4:])
+            if request.method in ("GET", "HEAD"):
+                return self._read(request, path)
+            return self._write(request, path)
+        except FakeDatabaseError as e:
+            error = {"code": e.code, "message": e.message, "details": None, "hint": None}
+            return httpx.Response(e.status, content=json.dumps(error).encode(), headers={"content-type": "application/json"})
+
+    def client(self) -> "FakeSupabaseClient":
+        return FakeSupabaseClient(self)
+
+
+class FakeSupabaseClient:
+    """The subset of supabase.AsyncClient the API uses: table(), from_(), rpc() and postgrest."""
+
+    def __init__(self, database: FakeDatabase):
+        self.database = database
+        self.postgrest = AsyncPostgrestClient(BASE_URL)
+        self.postgrest.session = httpx.AsyncClient(
+            base_url=BASE_URL,
+            transport=session_transport(httpx.MockTransport(database.handle)),
+        )
+
+    def table(self, name: str):
+        return self.postgrest.from_(name)
+
+    from_ = table
+
+    def rpc(self, fn: str, params: Optional[dict] = None):
+        return self.postgrest.rpc(fn, params or {})
+
+
+# Views
+
+def _auth_profiles(db: FakeDatabase) -> List[dict]:
+    profiles = {
+        "admin": {r["email"]: r for r in db.tables["admins"]},
+        "student": {r["email"]: r for r in db.tables["students"]},
+        "org": {r.get("email"): r for r in db.tables["organizations"]},
+    }
+    rows = []
+    for auth in db.tables["auth"]:
+        profile = profiles.get(auth["role"], {}).get(auth["email"]) or {}
+        rows.append({
+            **{k: auth.get(k) for k in ("id", "email", "username", "password", "role")},
+            "org_id": profile.get("id") if auth["role"] == "org" else profile.get("org_id"),
+            "language": profile.get("language") if auth["role"] in ("admin", "student") else None,
+            "profile_id": profile.get("id"),
+        })
+    return rows
+
+
+# Mirrors of the SQL functions in sql/
+
+def _apply_analytics_delta(db: FakeDatabase, p: dict):
+    row = db.upsert("analytics_snapshots", {"org_id": p["p_org_id"], "language": p["p_language"]})
+    for key in ("student_count", "pass_count", *SUM_COLUMNS):
+        row[key] = row.get(key, 0) + p.get(f"p_{key}", 0)
+    row["updated_at"] = _now().isoformat()
+    return None
+
+
+def _snapshot_delta(db: FakeDatabase, row: dict, sign: int):
+    if row.get("org_id") and row.get("language"):
+        delta = contribution(row, sign)
+        _apply_analytics_delta(db, {"p_org_id": row["org_id"], "p_language": row["language"], **{f"p_{k}": v for k, v in delta.items()}})
+
+
+def _rebuild_analytics_snapshot(db: FakeDatabase, p: dict):
+    students = db.find("students", org_id=p["p_org_id"], language=p["p_language"])
+    pass_mark = p.get("p_pass_mark", PASS_MARK)
+    snapshot = compute_snapshot(students)
+    snapshot["pass_count"] = sum(1 for s in students if s.get("overall_mark") is not None and s["overall_mark"] >= pass_mark)
+    row = db.upsert("analytics_snapshots", {"org_id": p["p_org_id"], "language": p["p_language"], **snapshot, "updated_at": _now().isoformat()})
+    return [dict(row)]
+
+
+def _bucket_starts(at: datetime) -> Dict[str, str]:
+    day = at.date()
+    return {"day": day.isoformat(), "week": (day - timedelta(days=day.weekday())).isoformat()}
+
+
+def _record_mark_changes(db: FakeDatabase, p: dict):
+    now = _now()
+    overall = [c for c in p["p_changes"] if c["mark"] == "overall_mark" and c["old"] is not None and c["new"] is not None]
+    for change in p["p_changes"]:
+        db.insert("marks_history", {
+            "student_id": p["p_student_id"], "org_id": p["p_org_id"], "language": p["p_language"],
+            "mark": change["mark"], "old_value": change["old"], "new_value": change["new"], "recorded_at": now.isoformat(),
+        })
+    for period, bucket_start in _bucket_starts(now).items():
+        key = {"org_id": p["p_org_id"], "language": p["p_language"], "period": period, "bucket_start": bucket_start}
+        new_student = not db.find("marks_activity", student_id=p["p_student_id"], **key)
+        if new_student:
+            db.insert("marks_activity", {**key, "student_id": p["p_student_id"]})
+        existing = db.find("marks_rollups", **key)
+        rollup = existing[0] if existing else db.insert("marks_rollups", {
+            **key, "update_count": 0, "overall_delta_sum": 0.0, "overall_delta_count": 0, "active_students": 0,
+        })
+        rollup["update_count"] += 1
+        rollup["overall_delta_sum"] += sum(c["new"] - c["old"] for c in overall)
+        rollup["overall_delta_count"] += len(overall)
+        rollup["active_students"] += int(new_student)
+    return None
+
+
+def _analytics_trends(db: FakeDatabase, p: dict):
+    week = _bucket_starts(_now())["week"]
+    rollup = next(iter(db.find("marks_rollups", org_id=p["p_org_id"], language=p["p_language"], period="week", bucket_start=week)), None)
+    return [{
+        "weekly_improvement": rollup["overall_delta_sum"] / rollup["overall_delta_count"] if rollup and rollup["overall_delta_count"] else 0.0,
+        "active_students": rollup["active_students"] if rollup else 0,
+        "tests_conducted": len(db.find("tests", org_id=p["p_org_id"], language=p["p_language"], status="completed")),
+    }]
+
+
+def _complete_expired_tests(db: FakeDatabase, p: dict):
+    now = _now()
+    completed = []
+    for test in db.find("tests", status="upcoming"):
+        ends = datetime.fromisoformat(test["test_time"]) + timedelta(minutes=test["test_duration"])
+        if (ends if ends.tzinfo else ends.replace(tzinfo=timezone.utc)) <= now:
+            test["status"] = "completed"
+            completed.append(dict(test))
+    return completed
+
+
+def _create_user(db: FakeDatabase, table: str, role: str, values: dict, password: str) -> dict:
+    if db.find("auth", email=values.get("email")):
+        raise FakeDatabaseError("23505", "Email already registered", 409)
+    row = db.insert(table, dict(values))
+    db.insert("auth", {"username": row["name"], "email": row["email"], "password": password, "role": role})
+    return row
+
+
+def _update_user(db: FakeDatabase, table: str, label: str, p: dict) -> Tuple[dict, dict]:
+    existing = db.find(table, id=p["p_id"])
+    if not existing:
+        raise FakeDatabaseError("P0002", f"{label} not found")
+    row = existing[0]
+    old = dict(row)
+    row.update(p["p_changes"])
+    if row.get("name") != old.get("name") or row.get("email") != old.get("email") or p.get("p_password") is not None:
+        for auth in db.find("auth", email=old["email"]):
+            auth.update({"username": row["name"], "email": row["email"]})
+            if p.get("p_password") is not None:
+                auth["password"] = p["p_password"]
+    return old, dict(row)
+
+
+def _delete_user(db: FakeDatabase, table: str, label: str, p: dict) -> dict:
+    existing = db.find(table, id=p["p_id"])
+    if not existing:
+        raise FakeDatabaseError("P0002", f"{label} not found")
+    row = existing[0]
+    db.tables[table] = [r for r in db.tables[table] if r is not row]
+    db.tables["auth"] = [a for a in db.tables["auth"] if a["email"] != row["email"]]
+    return row
+
+
+def _create_student(db: FakeDatabase, p: dict):
+    row = _create_user(db, "students", "student", p["p_student"], p["p_password"])
+    _snapshot_delta(db, row, 1)
+    return row
+
+
+def _update_student(db: FakeDatabase, p: dict):
+    old, new = _update_user(db, "students", "Student", p)
+    _snapshot_delta(db, old, -1)
+    _snapshot_delta(db, new, 1)
+    changes = [{"mark": c, "old": old.get(c), "new": new.get(c)} for c in MARK_COLUMNS if old.get(c) != new.get(c)]
+    if changes:
+        _record_mark_changes(db, {"p_student_id": new["id"], "p_org_id": new["org_id"], "p_language": new["language"], "p_changes": changes})
+    return {"old": old, "new": new}
+
+
+def _delete_student(db: FakeDatabase, p: dict):
+    row = _delete_user(db, "students", "Student", p)
+    _snapshot_delta(db, row, -1)
+    return row
+
+
+def _update_admin(db: FakeDatabase, p: dict):
+    old, new = _update_user(db, "admins", "Admin", p)
+    return {"old": old, "new": new}
+
+
+FUNCTIONS: Dict[str, Callable[[FakeDatabase, dict], object]] = {
+    "apply_analytics_delta": _apply_analytics_delta,
+    "rebuild_analytics_snapshot": _rebuild_analytics_snapshot,
+    "record_mark_changes": _record_mark_changes,
+    "analytics_trends": _analytics_trends,
+    "complete_expired_tests": _complete_expired_tests,
+    "create_student": _create_student,
+    "update_student": _update_student,
+    "delete_student": _delete_student,
+    "create_admin": lambda db, p: _create_user(db, "admins", "admin", p["p_admin"], p["p_password"]),
+    "update_admin": _update_admin,
+    "delete_admin": lambda db, p: _delete_user(db, "admins", "Admin", p),
+}
+
+
+def seed(
+    db: FakeDatabase,
+    organizations: int = 2,
+    languages: Tuple[str, ...] = ("english", "spanish"),
+    students_per_cohort: int = 200,
+    admins_per_org: int = 2,
+    tests_per_admin: int = 5,
+    password: str = "password",
+    random_seed: int = 7,
+) -> Dict[str, list]:
+    """
+    Fill `db` with a deterministic data set. Every user's password is
+    `password` (stored as plain text, like legacy rows; login upgrades it).
+    Returns the ids of what was created, keyed by table.
+    """
+    rng = random.Random(random_seed)
+    created: Dict[str, list] = defaultdict(list)
+
+    def mark():
+        return None if rng.random() < 0.05 else round(rng.uniform(30, 100), 1)
+
+    for o in range(organizations):
+        org = db.insert("organizations", {"name": f"Organization {o}", "email": f"org{o}@example.com"})
+        db.insert("auth", {"username": org["name"], "email": org["email"], "password": password, "role": "org"})
+        created["organizations"].append(org["id"])
+
+        for a in range(admins_per_org):
+            language = languages[a % len(languages)]
+            admin = _create_user(db, "admins", "admin", {
+                "name": f"Admin {o}-{a}", "org_id": org["id"], "role": "teacher", "contact": f"555-{o:02d}{a:02d}",
+                "language": language, "email": f"admin{a}@org{o}.example.com",
+            }, password)
+            created["admins"].append(admin["id"])
+            for t in range(tests_per_admin):
+                test = db.insert("tests", {
+                    "test_name": f"Test {t}", "org_id": org["id"], "user_id": admin["id"], "language": language,
+                    "test_duration": 30, "test_time": (_now() + timedelta(days=t + 1)).isoformat(),
+                    "test_link": f"https://example.com/tests/{o}-{a}-{t}",
+                })
+                created["tests"].append(test["id"])
+
+        for language in languages:
+            for s in range(students_per_cohort):
+                student = _create_student(db, {"p_student": {
+                    "name": f"Student {o}-{language}-{s}", "org_id": org["id"], "language": language,
+                    "email": f"student{s}.{language}@org{o}.example.com",
+                    **{column: mark() for column in MARK_COLUMNS},
+                }, "p_password": password})
+                created["students"].append(student["id"])
+
+    return created
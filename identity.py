@@ -0,0 +1,59 @@
+# identity.py
+import json
+import os
+from typing import Optional
+
+from supabase import AsyncClient
+
+from response_cache import MemoryCacheBackend, get_cache_backend
+
+# Repeat logins within this window are served without touching the database.
+# Profiles carry the password hash, so they are only cached in a shared
+# (Redis) backend, where a password change or delete on any worker bumps the
+# user's generation for all of them. The default memory backend keeps
+# generations per worker and would let other workers accept an old password,
+# so with it every login reads the profile.
+LOGIN_PROFILE_TTL = float(os.getenv("LOGIN_PROFILE_TTL", "60"))
+
+
+def _tag(email: str) -> str:
+    return f"login:{email}"
+
+
+def _shared(backend) -> bool:
+    return not isinstance(backend, MemoryCacheBackend)
+
+
+async def fetch_login_profile(supabase: AsyncClient, email: str) -> Optional[dict]:
+    """
+    Resolve an auth user together with their role, org_id and language
+    in one round-trip through the auth_profiles view.
+    """
+    backend = get_cache_backend()
+    cached = _shared(backend)
+    if cached:
+        generation, = await backend.generations((_tag(email),))
+        key = f"{_tag(email)}:{generation}"
+        entry = await backend.get(key)
+        if entry is not None:
+            return json.loads(entry["body"])
+
+    response = await supabase.table("auth_profiles").select("*").eq("email", email).limit(1).execute()
+    if not response.data:
+        return None
+
+    profile = response.data[0]
+    if cached:
+        await backend.set(key, {"body": json.dumps(profile).encode()}, LOGIN_PROFILE_TTL)
+    return profile
+
+
+async def invalidate_login_profile(*emails: Optional[str]):
+    tags = tuple(_tag(email) for email in emails if email)
+    if tags:
+        await get_cache_backend().bump(tags)
+
+
+async def invalidate_user(*emails: Optional[str]):
+    """Drop every cached view of these users after a profile or auth write."""
+    await invalidate_login_profile(*emails)
@@ -0,0 +1,87 @@
+# leaderboard.py
+import json
+import os
+from typing import Iterable, Optional, Tuple
+
+from supabase import AsyncClient
+
+from analytics_engine import MARK_COLUMNS
+from response_cache import MemoryCacheBackend, get_cache_backend
+
+# Rankings are cached per (org, language) cohort in the response cache
+# backend and only rebuilt after a write changes a mark, a name or the
+# cohort's membership; the TTL only bounds writes made outside the API.
+# That needs a shared (Redis) backend: the default memory backend keeps
+# generations per worker, so a write handled by one worker reaches the
+# others only when their entries expire, and LEADERBOARD_LOCAL_TTL caps it.
+LEADERBOARD_TTL = float(os.getenv("LEADERBOARD_TTL", "3600"))
+LEADERBOARD_LOCAL_TTL = float(os.getenv("LEADERBOARD_LOCAL_TTL", "30"))
+MAX_LEADERBOARD_SIZE = 100
+
+# Changes to anything else on a student row leave rankings untouched
+RANKED_FIELDS = ("name", "org_id", "language") + MARK_COLUMNS
+
+
+def _tag(org_id: str, language: str) -> str:
+    return f"leaderboard:{org_id}:{language}"
+
+
+def _ttl(backend) -> float:
+    if isinstance(backend, MemoryCacheBackend):
+        return min(LEADERBOARD_TTL, LEADERBOARD_LOCAL_TTL)
+    return LEADERBOARD_TTL
+
+
+def rank(rows: list, mark: str) -> list:
+    """Standard competition ranking (1, 2, 2, 4) of rows already sorted by `mark` descending."""
+    ranked = []
+    previous = None
+    for position, row in enumerate(rows, start=1):
+        if previous is None or row[mark] != previous[mark]:
+            current_rank = position
+        ranked.append({"rank": current_rank, "id": row["id"], "name": row["name"], "mark": row[mark]})
+        previous = row
+    return ranked
+
+
+async def fetch_leaderboard(supabase: AsyncClient, org_id: str, language: str, mark: str, limit: int) -> bytes:
+    """The cohort's top `limit` students by `mark` as a JSON array, from the cache when possible."""
+    backend = get_cache_backend()
+    tag = _tag(org_id, language)
+    generation, = await backend.generations((tag,))
+    key = f"{tag}:{mark}:{limit}:{generation}"
+
+    entry = await backend.get(key)
+    if entry is not None:
+        return entry["body"]
+
+    response = await (
+        supabase.table("students")
+        .select(f"id,name,{mark}")
+        .eq("org_id", org_id)
+        .eq("language", language)
+        .not_.is_(mark, "null")
+        .order(mark, desc=True)
+        .order("id")
+        .limit(limit)
+        .execute()
+    )
+    body = json.dumps(rank(response.data or [], mark)).encode()
+    await backend.set(key, {"body": body}, _ttl(backend))
+    return body
+
+
+async def invalidate_leaderboards(changes: Iterable[Tuple[Optional[dict], Optional[dict]]]):
+    """
+    Drop cached rankings for (old, new) student row pairs, as passed to
+    analytics_snapshot.apply_student_changes; None marks an insert or delete.
+    """
+    tags = set()
+    for old, new in changes:
+        if old and new and all(old.get(f) == new.get(f) for f in RANKED_FIELDS):
+            continue
+        for row in (old, new):
+            if row:
+                tags.add(_tag(row["org_id"], row["language"]))
+    if tags:
+        await get_cache_backend().bump(tuple(tags))
@@ -0,0 +1,35 @@
+# marks_history.py
+from typing import List
+
+from supabase import AsyncClient
+
+
+async def get_trends(supabase: AsyncClient, org_id: str, language: str) -> dict:
+    """Current-week improvement, active students and completed tests for one cohort."""
+    response = await supabase.rpc("analytics_trends", {
+        "p_org_id": org_id,
+        "p_language": language
+    }).execute()
+
+    if not response.data:
+        return {"weekly_improvement": 0.0, "active_students": 0, "tests_conducted": 0}
+    return response.data[0]
+
+
+async def get_rollups(
+    supabase: AsyncClient,
+    org_id: str,
+    language: str,
+    period: str = "week",
+    buckets: int = 8
+) -> List[dict]:
+    """Most recent `buckets` precomputed rollups, newest first."""
+    response = await supabase.table("marks_rollups") \
+        .select("bucket_start, update_count, overall_delta_sum, overall_delta_count, active_students") \
+        .eq("org_id", org_id) \
+        .eq("language", language) \
+        .eq("period", period) \
+        .order("bucket_start", desc=True) \
+        .limit(buckets) \
+        .execute()
+    return response.data or []
@@ -0,0 +1,198 @@
+# metrics.py
+import contextvars
+import os
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from fastapi import Request
+from starlette.middleware.base import BaseHTTPMiddleware
+
+# Adds X-DB-Round-Trips and Server-Timing headers to every response
+METRICS_DEBUG_HEADERS = os.getenv("METRICS_DEBUG_HEADERS", "1") == "1"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge", f"{self.name} {self.value}"]
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {series[-1]}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+http_requests = Counter("http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+http_request_duration = Histogram("http_request_duration_seconds", "End-to-end request latency.", ("method", "route"))
+http_request_db_duration = Histogram("http_request_db_seconds", "Time per request spent waiting on the database.", ("method", "route"))
+http_request_db_round_trips = Histogram(
+    "http_request_db_round_trips", "Database round-trips per request.", ("method", "route"),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50)
+)
+db_queries = Counter("db_queries_total", "PostgREST calls by table and operation.", ("table", "operation", "status"))
+db_query_duration = Histogram("db_query_duration_seconds", "PostgREST call latency.", ("table", "operation"))
+
+REGISTRY = [http_requests, http_request_duration, http_request_db_duration, http_request_db_round_trips, db_queries, db_query_duration]
+
+
+def register(*metrics):
+    """Add metrics defined in other modules to /metrics."""
+    REGISTRY.extend(metrics)
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class RequestStats:
+    __slots__ = ("db_round_trips", "db_seconds")
+
+    def __init__(self):
+        self.db_round_trips = 0
+        self.db_seconds = 0.0
+
+
+_request_stats: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("request_stats", default=None)
+
+_OPERATIONS = {"GET": "select", "HEAD": "count", "POST": "insert", "PATCH": "update", "PUT": "upsert", "DELETE": "delete"}
+
+
+def table_and_operation(request: httpx.Request) -> Tuple[str, str]:
+    # /rest/v1/<table> or /rest/v1/rpc/<function>
+    parts = request.url.path.rstrip("/").split("/")
+    if len(parts) >= 2 and parts[-2] == "rpc":
+        return parts[-1], "rpc"
+    return parts[-1] or "unknown", _OPERATIONS.get(request.method, request.method.lower())
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """
+    Wraps the PostgREST session's transport to count and time every call by
+    table and operation, and to charge it to the current request.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        table, operation = table_and_operation(request)
+        status = "error"
+        start = time.perf_counter()
+        try:
+            response = await self._transport.handle_async_request(request)
+            status = str(response.status_code)
+            return response
+        finally:
+            elapsed = time.perf_counter() - start
+            db_queries.inc((table, operation, status))
+            db_query_duration.observe((table, operation), elapsed)
+            stats = _request_stats.get()
+            if stats is not None:
+                stats.db_round_trips += 1
+                stats.db_seconds += elapsed
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+class MetricsMiddleware(BaseHTTPMiddleware):
+    """
+    Records per-route latency, database time and round-trips. With
+    METRICS_DEBUG_HEADERS the counts are also returned as X-DB-Round-Trips
+    and Server-Timing (db vs app time) so N+1 patterns are visible per call.
+    """
+
+    async def dispatch(self, request: Request, call_next):
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+        finally:
+            elapsed = time.perf_counter() - start
+            route = getattr(request.scope.get("route"), "path", "unmatched")
+            labels = (request.method, route)
+            http_requests.inc((request.method, route, str(status)))
+            http_request_duration.observe(labels, elapsed)
+            http_request_db_duration.observe(labels, stats.db_seconds)
+            http_request_db_round_trips.observe(labels, stats.db_round_trips)
+            _request_stats.reset(token)
+
+        if METRICS_DEBUG_HEADERS:
+            response.headers["X-DB-Round-Trips"] = str(stats.db_round_trips)
+            response.headers["Server-Timing"] = (
+                f"db;dur={stats.db_seconds * 1000:.1f}, app;dur={(elapsed - stats.db_seconds) * 1000:.1f}"
+            )
+        return response
@@ -0,0 +1,101 @@
+# org_directory.py
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+
+from supabase import AsyncClient
+
+from database import get_supabase
+
+logger = logging.getLogger(__name__)
+
+# The organizations table is small and rarely written, so every worker keeps
+# all of it in memory and reloads it on this interval
+ORG_DIRECTORY_REFRESH = float(os.getenv("ORG_DIRECTORY_REFRESH", "300"))
+# An unknown id triggers a reload (a new org), at most this often
+ORG_DIRECTORY_MISS_RELOAD = float(os.getenv("ORG_DIRECTORY_MISS_RELOAD", "10"))
+
+
+class OrgDirectory:
+    """Every organization row, indexed by id."""
+
+    def __init__(self):
+        self._by_id: Dict[str, dict] = {}
+        self._rows: List[dict] = []
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    async def load(self, supabase: AsyncClient):
+        response = await supabase.table("organizations").select("*").execute()
+        rows = response.data or []
+        # Swapped in whole, so readers never see a half-built index
+        self._rows = rows
+        self._by_id = {row["id"]: row for row in rows}
+        self._loaded_at = time.monotonic()
+
+    async def ensure_loaded(self, supabase: AsyncClient, stale_after: Optional[float] = None):
+        """Load on first use, or reload when older than `stale_after` seconds; one caller does the work."""
+        if self.loaded and (stale_after is None or time.monotonic() - self._loaded_at < stale_after):
+            return
+        async with self._lock:
+            if self.loaded and (stale_after is None or time.monotonic() - self._loaded_at < stale_after):
+                return
+            await self.load(supabase)
+
+    def all(self) -> List[dict]:
+        return self._rows
+
+    def by_id(self, org_id: str) -> Optional[dict]:
+        return self._by_id.get(org_id)
+
+    async def get(self, supabase: AsyncClient, org_id: str) -> Optional[dict]:
+        await self.ensure_loaded(supabase)
+        org = self.by_id(org_id)
+        if org is None:
+            await self.ensure_loaded(supabase, stale_after=ORG_DIRECTORY_MISS_RELOAD)
+            org = self.by_id(org_id)
+        return org
+
+    async def name(self, supabase: AsyncClient, org_id: Optional[str]) -> Optional[str]:
+        if not org_id:
+            return None
+        org = await self.get(supabase, org_id)
+        return org.get("name") if org else None
+
+
+org_directory = OrgDirectory()
+
+_refresh_task: Optional[asyncio.Task] = None
+
+
+async def _refresh_forever():
+    while True:
+        await asyncio.sleep(ORG_DIRECTORY_REFRESH)
+        try:
+            await org_directory.load(await get_supabase())
+        except Exception:
+            logger.warning("Organization directory refresh failed", exc_info=True)
+
+
+async def start_org_directory():
+    """Load the directory and keep it fresh in the background."""
+    global _refresh_task
+    try:
+        await org_directory.ensure_loaded(await get_supabase())
+    except Exception:
+        # Requests load it lazily instead
+        logger.warning("Organization directory load failed", exc_info=True)
+    _refresh_task = asyncio.create_task(_refresh_forever())
+
+
+def stop_org_directory():
+    global _refresh_task
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+        _refresh_task = None
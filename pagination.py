@@ -0,0 +1,70 @@
+# pagination.py
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def select_columns(fields: Optional[str], allowed: Iterable[str], embed: str = "") -> str:
+    """
+    Build a PostgREST select list from a comma separated `fields` parameter.
+    `id` is always included because it is the pagination key.
+    """
+    if not fields:
+        columns = ["*"]
+    else:
+        allowed = set(allowed)
+        columns = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in columns if f not in allowed]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        if "id" not in columns:
+            columns.insert(0, "id")
+
+    if embed:
+        columns.append(embed)
+    return ", ".join(columns)
+
+
+async def fetch_page(query, cursor: Optional[str], limit: int) -> Tuple[List[dict], Optional[str]]:
+    """
+    Keyset pagination on `id`: return up to `limit` rows after `cursor`
+    and the cursor for the next page (None on the last page).
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    if cursor:
+        query = query.gt("id", cursor)
+
+    response = await query.order("id").limit(limit + 1).execute()
+    rows = response.data or []
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1]["id"]
+    return rows, next_cursor
+
+
+async def fetch_all(build_query: Callable, page_size: int = MAX_PAGE_SIZE) -> List[dict]:
+    """
+    Every row matched by `build_query()` (a fresh query builder selecting
+    `id` per call), for reads that need the whole set at once. Pages are
+    keyset on `id` like fetch_page, so each one is an index range scan
+    rather than an OFFSET the database has to skip through again; the first
+    page also returns the exact count, which says when to stop.
+    """
+    first = await build_query(count="exact").order("id").limit(page_size).execute()
+    rows = list(first.data or [])
+    total = first.count or 0
+
+    # The server may cap pages below page_size (PostgREST max-rows), so a
+    # short page does not mean the last one
+    while rows and len(rows) < total:
+        response = await build_query().gt("id", rows[-1]["id"]).order("id").limit(page_size).execute()
+        if not response.data:
+            break
+        rows.extend(response.data)
+    return rows
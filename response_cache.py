@@ -0,0 +1,208 @@
+# response_cache.py
+import base64
+import hashlib
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fastapi import Request
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import Response
+from starlette.routing import Match
+
+from cache import TTLCache
+
+# Set to a redis:// URL to share cached responses and invalidations across workers
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL", "")
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "2048"))
+
+
+class CachePolicy:
+    def __init__(self, ttl: float, tags: Tuple[str, ...]):
+        self.ttl = ttl
+        self.tags = tags
+
+
+def cache_response(ttl: float, tags: Iterable[str] = ()):
+    """
+    Mark a GET endpoint as cacheable for `ttl` seconds. Entries are dropped
+    when any endpoint declared with @invalidates for one of `tags` succeeds.
+    Place below the @router.get decorator.
+    """
+    def decorator(endpoint):
+        endpoint.__cache_policy__ = CachePolicy(ttl, tuple(tags))
+        return endpoint
+    return decorator
+
+
+def invalidates(*tags: str):
+    """Mark a write endpoint as invalidating cached responses tagged with `tags`."""
+    def decorator(endpoint):
+        endpoint.__cache_invalidates__ = tuple(tags)
+        return endpoint
+    return decorator
+
+
+class MemoryCacheBackend:
+    """Per-process LRU backend; the default."""
+
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE):
+        self._entries = TTLCache(maxsize=maxsize)
+        self._generations: Dict[str, int] = {}
+
+    async def get(self, key: str) -> Optional[dict]:
+        return self._entries.get(key)
+
+    async def set(self, key: str, entry: dict, ttl: float):
+        self._entries.set(key, entry, ttl)
+
+    async def generations(self, tags: Tuple[str, ...]) -> List[int]:
+        return [self._generations.get(tag, 0) for tag in tags]
+
+    async def bump(self, tags: Tuple[str, ...]):
+        for tag in tags:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+
+
+class RedisCacheBackend:
+    """
+    Shared backend on a redis.asyncio client (or any object with the same
+    get/set/mget/incr coroutines, e.g. a local fake in tests).
+    """
+
+    def __init__(self, client, prefix: str = "respcache:"):
+        self.client = client
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[dict]:
+        raw = await self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        entry = json.loads(raw)
+        entry["body"] = base64.b64decode(entry["body"])
+        return entry
+
+    async def set(self, key: str, entry: dict, ttl: float):
+        raw = json.dumps({**entry, "body": base64.b64encode(entry["body"]).decode()})
+        await self.client.set(self.prefix + key, raw, px=int(ttl * 1000))
+
+    async def generations(self, tags: Tuple[str, ...]) -> List[int]:
+        if not tags:
+            return []
+        values = await self.client.mget([f"{self.prefix}gen:{tag}" for tag in tags])
+        return [int(v or 0) for v in values]
+
+    async def bump(self, tags: Tuple[str, ...]):
+        for tag in tags:
+            await self.client.incr(f"{self.prefix}gen:{tag}")
+
+
+def _default_backend():
+    if RESPONSE_CACHE_URL.startswith("redis"):
+        try:
+            import redis.asyncio as redis  # type: ignore
+        except ImportError:
+            raise RuntimeError("RESPONSE_CACHE_URL points at Redis but the redis package is not installed")
+        return RedisCacheBackend(redis.from_url(RESPONSE_CACHE_URL))
+    return MemoryCacheBackend()
+
+
+_backend = None
+
+
+def get_cache_backend():
+    global _backend
+    if _backend is None:
+        _backend = _default_backend()
+    return _backend
+
+
+def set_cache_backend(backend):
+    global _backend
+    _backend = backend
+
+
+async def invalidate_tags(*tags: str):
+    """Invalidate cached responses for writes that happen outside a request (e.g. scheduled jobs)."""
+    await get_cache_backend().bump(tags)
+
+
+def _etag(body: bytes) -> str:
+    return '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    candidates = [c.strip() for c in header.split(",")]
+    return "*" in candidates or any(c.removeprefix("W/") == etag for c in candidates)
+
+
+class ResponseCacheMiddleware(BaseHTTPMiddleware):
+    """
+    Serves GET routes marked with @cache_response from the cache backend,
+    adds ETags and answers If-None-Match with 304. Successful requests to
+    routes marked with @invalidates bump their tags.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        self._routes = None
+
+    def _route_for(self, request: Request):
+        if self._routes is None:
+            self._routes = [
+                route for route in request.app.routes
+                if hasattr(getattr(route, "endpoint", None), "__cache_policy__")
+                or hasattr(getattr(route, "endpoint", None), "__cache_invalidates__")
+            ]
+        for route in self._routes:
+            match, _ = route.matches(request.scope)
+            if match == Match.FULL:
+                return route
+        return None
+
+    async def dispatch(self, request: Request, call_next):
+        route = self._route_for(request)
+        if route is None:
+            return await call_next(request)
+        # Lets outer middleware label cache hits with the route template
+        request.scope["route"] = route
+
+        invalidated = getattr(route.endpoint, "__cache_invalidates__", None)
+        if invalidated is not None:
+            response = await call_next(request)
+            if 200 <= response.status_code < 300:
+                await invalidate_tags(*invalidated)
+            return response
+
+        policy: CachePolicy = route.endpoint.__cache_policy__
+        backend = get_cache_backend()
+
+        # Callers see different data, so the credentials are part of the key
+        generations = await backend.generations(policy.tags)
+        raw_key = "|".join([
+            request.url.path,
+            str(sorted(request.query_params.multi_items())),
+            request.headers.get("authorization", ""),
+            str(generations),
+        ])
+        key = hashlib.blake2b(raw_key.encode(), digest_size=20).hexdigest()
+
+        entry = await backend.get(key)
+        if entry is None:
+            response = await call_next(request)
+            if response.status_code != 200:
+                return response
+
+            body = b"".join([chunk async for chunk in response.body_iterator])
+            entry = {"body": body, "etag": _etag(body), "media_type": response.headers.get("content-type")}
+            await backend.set(key, entry, policy.ttl)
+            cache_status = "MISS"
+        else:
+            cache_status = "HIT"
+
+        headers = {"ETag": entry["etag"], "Cache-Control": "no-cache", "X-Cache": cache_status}
+        if _etag_matches(request.headers.get("if-none-match"), entry["etag"]):
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry["body"], media_type=entry["media_type"], headers=headers)
@@ -1,10 +1,33 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from pydantic import BaseModel, EmailStr
 from typing import Optional
+import logging
 
-from main import supabase
+from postgrest import APIError
+from supabase import AsyncClient
 
-router = APIRouter(prefix="/admin", tags=["admins"])
+from auth_utils import TokenClaims, check_org, get_current_user, hash_password, require_role
+from bulk_import import DEFAULT_CHUNK_SIZE, MAX_CHUNK_SIZE, import_users, read_records
+from database import NO_DATA_FOUND, UNIQUE_VIOLATION, get_supabase
+from export import export_rows
+from identity import invalidate_user
+from org_directory import org_directory
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, fetch_page, select_columns
+from response_cache import cache_response, invalidates
+
+router = APIRouter(prefix="/admin", tags=["admins"], dependencies=[Depends(get_current_user)])
+logger = logging.getLogger(__name__)
+
+# Columns clients may request through `fields=` on /admin/list
+ADMIN_COLUMNS = (
+    "id",
+    "name",
+    "org_id",
+    "role",
+    "contact",
+    "language",
+    "email",
+)
 
 class AdminCreate(BaseModel):
     name: str
@@ -16,106 +39,175 @@ class AdminCreate(BaseModel):
     password: str
 
 @router.post("/add")
-async def add_admin(admin: AdminCreate):
+@invalidates("admins")
+async def add_admin(
+    admin: AdminCreate,
+    claims: TokenClaims = Depends(require_role("admin", "org")),
+    supabase: AsyncClient = Depends(get_supabase)
+):
     try:
-        print(f"Attempting to add admin: {admin.email}")
+        check_org(claims, admin.org_id)
         
-        # Check if email already exists in auth table
-        auth_check = supabase.table("auth").select("*").eq("email", admin.email).execute()
-        if auth_check.data and len(auth_check.data) > 0:
-            print(f"Email {admin.email} already exists")
-            raise HTTPException(status_code=400, detail="Email already registered")
+        logger.info("Adding admin", extra={"email": admin.email})
         
-        # Add to admins table
-        admin_response = supabase.table("admins").insert({
-            "name": admin.name,
-            "org_id": admin.org_id,
-            "role": admin.role,
-            "contact": admin.contact,
-            "language": admin.language,
-            "email": admin.email
+        # Admins row and auth row are written in one transaction
+        admin_response = await supabase.rpc("create_admin", {
+            "p_admin": admin.model_dump(exclude={"password"}),
+            "p_password": await hash_password(admin.password)
         }).execute()
         
         if not admin_response.data:
-            print("Failed to insert into admins table")
+            logger.error("Failed to create admin", extra={"email": admin.email})
             raise HTTPException(status_code=500, detail="Failed to create admin record")
         
-        # Add to auth table
-        auth_response = supabase.table("auth").insert({
-            "username": admin.name,
-            "email": admin.email,
-            "password": admin.password,  # Not hashed for now
-            "role": "admin"
-        }).execute()
-        
-        if not auth_response.data:
-            print("Failed to insert into auth table")
-            # Rollback admins insert if possible
-            raise HTTPException(status_code=500, detail="Failed to create auth record")
-        
-        print(f"Admin successfully added: {admin.email}")
-        return {"success": True, "admin_id": admin_response.data[0]["id"]}
+        logger.info("Admin added", extra={"email": admin.email})
+        return {"success": True, "admin_id": admin_response.data["id"]}
     
+    except HTTPException:
+        raise
+    except APIError as e:
+        if e.code == UNIQUE_VIOLATION:
+            logger.info("Email already registered", extra={"email": admin.email})
+            raise HTTPException(status_code=400, detail="Email already registered")
+        logger.error("Error adding admin: %s", e.message)
+        raise HTTPException(status_code=500, detail=f"Internal server error: {e.message}")
+    except Exception as e:
+        logger.exception("Error adding admin")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@router.post("/bulk")
+@invalidates("admins")
+async def bulk_add_admins(
+    request: Request,
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=1, le=MAX_CHUNK_SIZE),
+    claims: TokenClaims = Depends(require_role("admin", "org")),
+    supabase: AsyncClient = Depends(get_supabase)
+):
+    """
+    Import admins from a CSV, NDJSON or JSON array body in chunked batches.
+    Returns a per-row report; rows for other organizations are rejected.
+    """
+    try:
+        report = await import_users(
+            supabase,
+            read_records(request),
+            AdminCreate,
+            profile_table="admins",
+            role="admin",
+            to_profile=lambda admin: admin.model_dump(exclude={"password"}),
+            chunk_size=chunk_size,
+            org_id=claims.org_id
+        )
+        logger.info("Bulk admin import", extra={
+            "rows_total": report["total"],
+            "rows_created": report["created"],
+            "rows_per_second": report["rows_per_second"]
+        })
+        return report
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error adding admin: {str(e)}")
+        logger.exception("Error importing admins")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.get("/list")
-async def list_admins(org_id: str = None):
+@cache_response(ttl=30, tags=["admins", "organizations"])
+async def list_admins(
+    org_id: str = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = Query(None, description="Comma separated columns to return"),
+    claims: TokenClaims = Depends(get_current_user),
+    supabase: AsyncClient = Depends(get_supabase)
+):
+    # Callers only see their own organization
+    org_id = org_id or claims.org_id
+    check_org(claims, org_id)
     try:
-        print(f"Received request for admins with org_id: {org_id}")
+        # Get admins one page at a time
+        query = supabase.table("admins").select(select_columns(fields, ADMIN_COLUMNS))
         
-        # Get organization name separately
-        org_name = None
         if org_id:
-            org_response = supabase.table("organizations").select("name").eq("id", org_id).execute()
-            print(f"Organization response: {org_response.data}")
-            
-            if org_response.data and len(org_response.data) > 0:
-                org_name = org_response.data[0].get("name")
+            query = query.eq("org_id", org_id)
         
-        # Get admins with organization relationship
-        query = supabase.table("admins").select("*, organizations(name)")
+        rows, next_cursor = await fetch_page(query, cursor, limit)
         
-        if org_id:
-            query = query.eq("org_id", org_id)
-            
-        response = query.execute()
-        print(f"Admins response: {response.data}")
+        # Organization names come from the in-memory directory instead of a join
+        await org_directory.ensure_loaded(supabase)
+        org_name = await org_directory.name(supabase, org_id or (rows[0].get("org_id") if rows else None))
+        for row in rows:
+            org = org_directory.by_id(row.get("org_id", org_id))
+            row["organizations"] = {"name": org["name"]} if org else None
         
         return {
-            "admins": response.data or [],
-            "org_name": org_name
+            "admins": rows,
+            "org_name": org_name,
+            "next_cursor": next_cursor
         }
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error fetching admins: {str(e)}")
+        logger.exception("Error fetching admins")
         raise HTTPException(status_code=500, detail="Failed to fetch admins")
 
+@router.get("/export")
+async def export_admins(
+    org_id: str = Query(..., description="Organization ID"),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    fields: Optional[str] = Query(None, description="Comma separated columns to export"),
+    claims: TokenClaims = Depends(require_role("admin", "org")),
+    supabase: AsyncClient = Depends(get_supabase)
+):
+    """Full admin roster as NDJSON or CSV, streamed page by page."""
+    check_org(claims, org_id)
+    select = select_columns(fields or ",".join(ADMIN_COLUMNS), ADMIN_COLUMNS)
+
+    def build_query():
+        return supabase.table("admins").select(select).eq("org_id", org_id)
+
+    try:
+        return await export_rows(build_query, select.split(", "), format, f"admins.{format}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error exporting admins")
+        raise HTTPException(status_code=500, detail="Failed to export admins")
+
 @router.get("/{admin_id}")
-async def get_admin(admin_id: str):
+async def get_admin(
+    admin_id: str,
+    claims: TokenClaims = Depends(get_current_user),
+    supabase: AsyncClient = Depends(get_supabase)
+):
     try:
-        response = supabase.table("admins").select("*").eq("id", admin_id).execute()
+        response = await supabase.table("admins").select("*").eq("id", admin_id).execute()
         
         if not response.data:
             raise HTTPException(status_code=404, detail="Admin not found")
+        check_org(claims, response.data[0]["org_id"])
             
         return {"admin": response.data[0]}
     except HTTPException as e:
         raise e
     except Exception as e:
-        print(f"Error fetching admin: {str(e)}")
+        logger.exception("Error fetching admin")
         raise HTTPException(status_code=500, detail="Failed to fetch admin details")
 
 @router.put("/{admin_id}")
-async def update_admin(admin_id: str, admin_data: dict):
+@invalidates("admins")
+async def update_admin(
+    admin_id: str,
+    admin_data: dict,
+    claims: TokenClaims = Depends(require_role("admin", "org")),
+    supabase: AsyncClient = Depends(get_supabase)
+):
     try:
-        # Validate that the admin exists
-        check_response = supabase.table("admins").select("*").eq("id", admin_id).execute()
-        if not check_response.data:
+        # Only the admin's own organization may change it
+        existing = await supabase.table("admins").select("org_id").eq("id", admin_id).execute()
+        if not existing.data:
             raise HTTPException(status_code=404, detail="Admin not found")
-            
+        check_org(claims, existing.data[0]["org_id"])
+        
         # Create update data for admin table
         update_data = {
             "name": admin_data.get("name"),
@@ -131,60 +223,59 @@ async def update_admin(admin_id: str, admin_data: dict):
         # Remove None values
         update_data = {k: v for k, v in update_data.items() if v is not None}
         
-        # Update admin in admins table
-        admin_response = supabase.table("admins").update(update_data).eq("id", admin_id).execute()
+        # Only a non-blank password replaces the stored one
+        password = admin_data.get("password")
+        password = await hash_password(password) if password and password.strip() else None
         
-        # Update auth table if needed
-        admin_email = check_response.data[0].get("email")
-        auth_update = {}
+        # Admins row and auth row are updated in one transaction
+        response = await supabase.rpc("update_admin", {
+            "p_id": admin_id,
+            "p_changes": update_data,
+            "p_password": password
+        }).execute()
         
-        # If name changed, update username in auth table
-        if "name" in update_data:
-            auth_update["username"] = update_data["name"]
-            
-        # If email changed, update email in auth table
-        if "email" in update_data:
-            new_email = update_data["email"]
-            auth_update["email"] = new_email
-            # Update admin_email for password update if needed
-            admin_email = new_email
-            
-        # If password provided, update password in auth table
-        if admin_data.get("password") and admin_data.get("password").strip():
-            auth_update["password"] = admin_data.get("password")
-            
-        # Perform update if there are changes to auth table
-        if auth_update and admin_email:
-            auth_response = supabase.table("auth").update(auth_update).eq("email", admin_email).execute()
+        # Drop cached identities for the old and new email
+        await invalidate_user(response.data["old"].get("email"), response.data["new"].get("email"))
         
-        return {"success": True, "admin": admin_response.data[0]}
+        return {"success": True, "admin": response.data["new"]}
     except HTTPException as e:
         raise e
+    except APIError as e:
+        if e.code == NO_DATA_FOUND:
+            raise HTTPException(status_code=404, detail="Admin not found")
+        logger.error("Error updating admin: %s", e.message)
+        raise HTTPException(status_code=500, detail="Failed to update admin")
     except Exception as e:
-        print(f"Error updating admin: {str(e)}")
+        logger.exception("Error updating admin")
         raise HTTPException(status_code=500, detail="Failed to update admin")
 
 @router.delete("/{admin_id}")
-async def delete_admin(admin_id: str):
+@invalidates("admins")
+async def delete_admin(
+    admin_id: str,
+    claims: TokenClaims = Depends(require_role("admin", "org")),
+    supabase: AsyncClient = Depends(get_supabase)
+):
     try:
-        # Get admin details including email
-        admin_response = supabase.table("admins").select("email").eq("id", admin_id).execute()
-        
-        if not admin_response.data:
+        # Only the admin's own organization may delete it
+        existing = await supabase.table("admins").select("org_id").eq("id", admin_id).execute()
+        if not existing.data:
             raise HTTPException(status_code=404, detail="Admin not found")
-            
-        admin_email = admin_response.data[0].get("email")
+        check_org(claims, existing.data[0]["org_id"])
         
-        # Delete admin from admins table
-        admin_delete = supabase.table("admins").delete().eq("id", admin_id).execute()
+        # Admins row and auth row are removed in one transaction
+        response = await supabase.rpc("delete_admin", {"p_id": admin_id}).execute()
         
-        # Delete admin from auth table if email is available
-        if admin_email:
-            auth_delete = supabase.table("auth").delete().eq("email", admin_email).execute()
+        await invalidate_user(response.data.get("email"))
         
         return {"success": True, "message": "Admin deleted successfully"}
     except HTTPException as e:
         raise e
+    except APIError as e:
+        if e.code == NO_DATA_FOUND:
+            raise HTTPException(status_code=404, detail="Admin not found")
+        logger.error("Error deleting admin: %s", e.message)
+        raise HTTPException(status_code=500, detail="Failed to delete admin")
     except Exception as e:
-        print(f"Error deleting admin: {str(e)}")
+        logger.exception("Error deleting admin")
         raise HTTPException(status_code=500, detail="Failed to delete admin")
\ No newline at end of file
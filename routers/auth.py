@@ -1,13 +1,15 @@
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
+import logging
 from typing import Optional
-from datetime import datetime, timedelta
-import jwt
+from supabase import AsyncClient
 
-# JWT Secret import
-from main import JWT_SECRET, supabase
+from auth_utils import check_password, create_access_token
+from database import get_supabase
+from identity import fetch_login_profile, invalidate_login_profile
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
+logger = logging.getLogger(__name__)
 
 # Request model
 class LoginRequest(BaseModel):
@@ -15,77 +17,50 @@ class LoginRequest(BaseModel):
     password: str
     org_id: Optional[str] = None
 
-# Login route with debugging
+# Login route
 @router.post("/login")
-async def login_user(payload: LoginRequest, request: Request):
-    print(f"\nLogin attempt from IP: {request.client.host}")
-    print(f"Email received: {payload.email}")
-    print(f"Password received: {payload.password}")
-    
+async def login_user(payload: LoginRequest, request: Request, supabase: AsyncClient = Depends(get_supabase)):
     try:
-        # Fetch user from Supabase auth table
-        response = supabase.table("auth").select("*").eq("email", payload.email).execute()
+        # Fetch user with role, org_id and language resolved in one query
+        user = await fetch_login_profile(supabase, payload.email)
         
-        if response.data is None or len(response.data) == 0:
-            print("⚠️ No user found with this email.")
+        if user is None:
+            logger.info("Login failed: unknown email", extra={"email": payload.email})
             raise HTTPException(status_code=401, detail="Invalid credentials")
         
-        user = response.data[0]
-        
-        print(f"🔎 User found in DB: {user}")
-        print(f"🔐 Password in DB: {user['password']}")
-        
-        # Direct password comparison (plain text)
-        if payload.password != user["password"]:
-            print("❌ Password mismatch.")
+        # bcrypt runs on the hashing pool so the event loop stays free
+        matched, new_hash = await check_password(payload.password, user["password"])
+        if not matched:
+            logger.info("Login failed: password mismatch", extra={"email": payload.email})
             raise HTTPException(status_code=401, detail="Invalid credentials")
         
-        print("✅ Password matched.")
+        # Replace plain-text or outdated hashes now that we know the password
+        if new_hash:
+            await supabase.table("auth").update({"password": new_hash}).eq("id", user["id"]).execute()
+            await invalidate_login_profile(user["email"])
+            logger.info("Password hash upgraded", extra={"email": user["email"]})
         
-        # Get organization ID based on user role
-        org_id = None
-        if user["role"] == "admin":
-            # Get admin's organization ID
-            admin_resp = supabase.table("admins").select("org_id").eq("email", user["email"]).execute()
-            if admin_resp.data and len(admin_resp.data) > 0:
-                org_id = admin_resp.data[0].get("org_id")
-        elif user["role"] == "student":
-            # Get student's organization ID
-            student_resp = supabase.table("students").select("org_id").eq("email", user["email"]).execute()
-            if student_resp.data and len(student_resp.data) > 0:
-                org_id = student_resp.data[0].get("org_id")
-        elif user["role"] == "org":
-            # Get organization's ID directly from organizations table
-            org_resp = supabase.table("organizations").select("id").eq("email", user["email"]).execute()
-            if org_resp.data and len(org_resp.data) > 0:
-                org_id = org_resp.data[0].get("id")
-                print(f"Found org_id for organization: {org_id}")
-            else:
-                print("⚠️ Could not find organization ID for this org user")
+        org_id = user.get("org_id")
+        if user["role"] == "org" and org_id is None:
+            logger.warning("No organization found for org user", extra={"email": user["email"]})
         
         # Generate JWT
         language = user.get("language")
-        if not language and user["role"] == "admin":
-            admin_lang_resp = supabase.table("admins").select("language").eq("email", user["email"]).execute()
-            if admin_lang_resp.data and len(admin_lang_resp.data) > 0:
-                language = admin_lang_resp.data[0].get("language")
-        elif not language and user["role"] == "student":
-            student_lang_resp = supabase.table("students").select("language").eq("email", user["email"]).execute()
-            if student_lang_resp.data and len(student_lang_resp.data) > 0:
-                language = student_lang_resp.data[0].get("language")
+        # Everything handlers need about the caller travels in the token
         token_data = {
             "user_id": user["id"],
             "email": user["email"],
             "role": user["role"],
+            "org_id": org_id,
             "language": language,
-            "exp": datetime.utcnow() + timedelta(hours=24)
+            "profile_id": user.get("profile_id")
         }
-        token = jwt.encode(token_data, JWT_SECRET, algorithm="HS256")
+        token = create_access_token(token_data)
         
         # Determine redirect based on role
         redirect_path = "/individual" if user["role"] == "individual" else "/organization"
         
-        print("🎟️ JWT Token generated.")
+        logger.info("Login succeeded", extra={"email": user["email"], "role": user["role"]})
         return {
             "access_token": token,
             "role": user["role"],
@@ -96,6 +71,8 @@ async def login_user(payload: LoginRequest, request: Request):
             "redirect": redirect_path
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
-        print("🔥 Exception during login:", str(e))
+        logger.exception("Exception during login")
         raise HTTPException(status_code=500, detail="Internal server error")
\ No newline at end of file
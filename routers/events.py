@@ -0,0 +1,47 @@
+import asyncio
+from typing import Optional
+
+import jwt
+from fastapi import APIRouter, WebSocket, status
+
+from auth_utils import decode_access_token
+from event_broker import broker
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+
+async def _forward(websocket: WebSocket, queue: asyncio.Queue):
+    while True:
+        await websocket.send_text(await queue.get())
+
+
+@router.websocket("/tests")
+async def test_status_events(websocket: WebSocket, token: str, language: Optional[str] = None):
+    """
+    Push test created/updated/completed/deleted events for the caller's
+    (org, language) cohort, replacing polling of /student-tests/upcoming
+    and /tests/list. Browsers cannot set headers on a WebSocket, so the
+    bearer token is passed as ?token=.
+    """
+    try:
+        claims = decode_access_token(token)
+    except (jwt.InvalidTokenError, ValueError):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    org_id = claims.org_id
+    language = language or claims.language
+    if not org_id or not language:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    queue = broker.subscribe(org_id, language)
+    sender = asyncio.create_task(_forward(websocket, queue))
+    try:
+        # Clients send nothing; this only waits for the disconnect
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    finally:
+        sender.cancel()
+        broker.unsubscribe(org_id, language, queue)
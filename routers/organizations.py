@@ -1,15 +1,21 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, EmailStr
 from typing import Optional
 import uuid
 
-from main import supabase
+from supabase import AsyncClient
+
+from database import get_supabase
+from org_directory import org_directory
+from response_cache import cache_response
 
 router = APIRouter(prefix="/organization", tags=["organizations"])
 
 @router.get("/list")
-def list_organizations():
-    response = supabase.table("organizations").select("*").execute()
-    return {"organizations": response.data}
+@cache_response(ttl=300, tags=["organizations"])
+async def list_organizations(supabase: AsyncClient = Depends(get_supabase)):
+    # Served from the in-memory directory
+    await org_directory.ensure_loaded(supabase)
+    return {"organizations": org_directory.all()}
 
 # Additional organization-related endpoints can be added here
@@ -1,9 +1,13 @@
-from fastapi import APIRouter, HTTPException, Request
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Response
+from typing import List, Optional
 from pydantic import BaseModel
-from main import supabase
+from supabase import AsyncClient
 
-router = APIRouter(prefix="/student-tests", tags=["student-tests"])
+from auth_utils import TokenClaims, get_current_user, require_role
+from database import get_supabase
+from upcoming_tests import fetch_upcoming_tests
+
+router = APIRouter(prefix="/student-tests", tags=["student-tests"], dependencies=[Depends(get_current_user)])
 
 # Response model
 class StudentTest(BaseModel):
@@ -11,43 +15,26 @@ class StudentTest(BaseModel):
     test_name: str
     test_time: str
     test_duration: int
-    test_link: str
+    test_link: Optional[str]
     language: str
     status: str
 
 @router.get("/upcoming", response_model=List[StudentTest])
-async def get_student_tests(user_id: str, language: str):
+async def get_student_tests(
+    language: Optional[str] = None,
+    claims: TokenClaims = Depends(require_role("student")),
+    supabase: AsyncClient = Depends(get_supabase)
+):
     try:
-        if not user_id or not language:
-            raise HTTPException(status_code=401, detail="Missing authentication info")
-
-        # Fetch auth entry to get the email
-        auth_response = supabase.table("auth").select("*").eq("id", user_id).execute()
-        if not auth_response.data:
-            raise HTTPException(status_code=404, detail="User not found")
-
-        email = auth_response.data[0]["email"]
-
-        # Fetch student by email
-        student_response = supabase.table("students").select("*").eq("email", email).execute()
-        if not student_response.data:
-            raise HTTPException(status_code=404, detail="Student not found")
-
-        student = student_response.data[0]
-        org_id = student["org_id"]
-
-        # Get tests for the student's org and language
-        tests_response = (
-            supabase.table("tests")
-            .select("*")
-            .eq("org_id", org_id)
-            .eq("language", language)
-            .eq("status", "upcoming")
-            .order("test_time", desc=False)
-            .execute()
-        )
-
-        return tests_response.data
+        # Student's org (and default language) come from the token
+        org_id = claims.org_id
+        language = language or claims.language
+        if not org_id or not language:
+            raise HTTPException(status_code=404, detail="Student profile not found")
+
+        # Shared by the whole cohort; no database round-trip once cached
+        body = await fetch_upcoming_tests(supabase, org_id, language)
+        return Response(content=body, media_type="application/json")
 
     except HTTPException as he:
         raise he
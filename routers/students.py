@@ -1,10 +1,40 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from pydantic import BaseModel, EmailStr
 from typing import Optional
+import logging
 
-from main import supabase
+from postgrest import APIError
+from supabase import AsyncClient
 
-router = APIRouter(prefix="/student", tags=["students"])
+from analytics_snapshot import apply_student_changes
+from auth_utils import TokenClaims, check_org, get_current_user, hash_password, require_role
+from bulk_import import DEFAULT_CHUNK_SIZE, MAX_CHUNK_SIZE, import_users, read_records
+from database import NO_DATA_FOUND, UNIQUE_VIOLATION, get_supabase
+from export import export_rows
+from identity import invalidate_user
+from leaderboard import invalidate_leaderboards
+from org_directory import org_directory
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, fetch_page, select_columns
+from response_cache import cache_response, invalidates
+
+router = APIRouter(prefix="/student", tags=["students"], dependencies=[Depends(get_current_user)])
+logger = logging.getLogger(__name__)
+
+# Columns clients may request through `fields=` on /student/list
+STUDENT_COLUMNS = (
+    "id",
+    "name",
+    "org_id",
+    "email",
+    "language",
+    "overall_mark",
+    "average_mark",
+    "recent_test_mark",
+    "fluency_mark",
+    "vocab_mark",
+    "sentence_mastery",
+    "pronunciation",
+)
 
 class StudentCreate(BaseModel):
     name: str
@@ -21,87 +51,107 @@ class StudentCreate(BaseModel):
     pronunciation: Optional[float] = None
 
 @router.post("/add")
-async def add_student(student: StudentCreate):
+@invalidates("students")
+async def add_student(
+    student: StudentCreate,
+    claims: TokenClaims = Depends(require_role("admin", "org")),
+    supabase: AsyncClient = Depends(get_supabase)
+):
     try:
-        print(f"Attempting to add student: {student.email}")
+        check_org(claims, student.org_id)
         
-        # Check if email already exists in auth table
-        auth_check = supabase.table("auth").select("*").eq("email", student.email).execute()
-        if auth_check.data and len(auth_check.data) > 0:
-            print(f"Email {student.email} already exists")
-            raise HTTPException(status_code=400, detail="Email already registered")
+        logger.info("Adding student", extra={"email": student.email})
         
-        # Create student marks data dictionary
-        student_data = {
-            "name": student.name,
-            "org_id": student.org_id,
-            "email": student.email,
-            "language": student.language
-        }
-        print(f"adding Student data: {student_data}")
-        
-        # Add optional mark fields if provided
-        if student.overall_mark is not None:
-            student_data["overall_mark"] = student.overall_mark
-        if student.average_mark is not None:
-            student_data["average_mark"] = student.average_mark
-        if student.recent_test_mark is not None:
-            student_data["recent_test_mark"] = student.recent_test_mark
-        if student.fluency_mark is not None:
-            student_data["fluency_mark"] = student.fluency_mark
-        if student.vocab_mark is not None:
-            student_data["vocab_mark"] = student.vocab_mark
-        if student.sentence_mastery is not None:
-            student_data["sentence_mastery"] = student.sentence_mastery
-        if student.pronunciation is not None:
-            student_data["pronunciation"] = student.pronunciation
-        
-        # Add to students table
-        student_response = supabase.table("students").insert(student_data).execute()
+        # Create student marks data dictionary, leaving out marks not provided
+        student_data = student.model_dump(exclude={"password"}, exclude_none=True)
+        
+        # Students row, auth row and analytics snapshot are written in one transaction
+        student_response = await supabase.rpc("create_student", {
+            "p_student": student_data,
+            "p_password": await hash_password(student.password)
+        }).execute()
         
         if not student_response.data:
-            print("Failed to insert into students table")
+            logger.error("Failed to create student", extra={"email": student.email})
             raise HTTPException(status_code=500, detail="Failed to create student record")
         
-        # Add to auth table
-        auth_response = supabase.table("auth").insert({
-            "username": student.name,
-            "email": student.email,
-            "password": student.password,
-            "role": "student"
-        }).execute()
-        
-        if not auth_response.data:
-            print("Failed to insert into auth table")
-            # Rollback students insert if possible
-            raise HTTPException(status_code=500, detail="Failed to create auth record")
+        await invalidate_leaderboards([(None, student_response.data)])
         
-        print(f"Student successfully added: {student.email}")
-        return {"success": True, "student_id": student_response.data[0]["id"]}
+        logger.info("Student added", extra={"email": student.email})
+        return {"success": True, "student_id": student_response.data["id"]}
     
     except HTTPException:
         raise
+    except APIError as e:
+        if e.code == UNIQUE_VIOLATION:
+            logger.info("Email already registered", extra={"email": student.email})
+            raise HTTPException(status_code=400, detail="Email already registered")
+        logger.error("Error adding student: %s", e.message)
+        raise HTTPException(status_code=500, detail=f"Internal server error: {e.message}")
     except Exception as e:
-        print(f"Error adding student: {str(e)}")
+        logger.exception("Error adding student")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@router.post("/bulk")
+@invalidates("students")
+async def bulk_add_students(
+    request: Request,
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=1, le=MAX_CHUNK_SIZE),
+    claims: TokenClaims = Depends(require_role("admin", "org")),
+    supabase: AsyncClient = Depends(get_supabase)
+):
+    """
+    Import students from a CSV, NDJSON or JSON array body in chunked batches.
+    Returns a per-row report; rows for other organizations are rejected.
+    """
+    async def update_snapshots(created):
+        changes = [(None, row) for row in created]
+        await apply_student_changes(supabase, changes)
+        await invalidate_leaderboards(changes)
+    
+    try:
+        report = await import_users(
+            supabase,
+            read_records(request),
+            StudentCreate,
+            profile_table="students",
+            role="student",
+            to_profile=lambda student: student.model_dump(exclude={"password"}),
+            chunk_size=chunk_size,
+            on_created=update_snapshots,
+            org_id=claims.org_id
+        )
+        logger.info("Bulk student import", extra={
+            "rows_total": report["total"],
+            "rows_created": report["created"],
+            "rows_per_second": report["rows_per_second"]
+        })
+        return report
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error importing students")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
 @router.get("/list")
-async def list_students(org_id: str = None, language: str = None):
+@cache_response(ttl=30, tags=["students", "organizations"])
+async def list_students(
+    org_id: str = None,
+    language: str = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = Query(None, description="Comma separated columns to return"),
+    claims: TokenClaims = Depends(get_current_user),
+    supabase: AsyncClient = Depends(get_supabase)
+):
+    # Callers only see their own organization
+    org_id = org_id or claims.org_id
+    check_org(claims, org_id)
     try:
-        print(f"Received request for students with org_id: {org_id} and language: {language}")
-        
-        # Get organization name separately
-        org_name = None
-        if org_id:
-            org_response = supabase.table("organizations").select("name").eq("id", org_id).execute()
-            print(f"Organization response: {org_response.data}")
-            
-            if org_response.data and len(org_response.data) > 0:
-                org_name = org_response.data[0].get("name")
-        
-        # Get students with organization relationship
-        query = supabase.table("students").select("*, organizations(name)")
+        # Get students one page at a time
+        query = supabase.table("students").select(select_columns(fields, STUDENT_COLUMNS))
         
         if org_id:
             query = query.eq("org_id", org_id)
@@ -109,15 +159,24 @@ async def list_students(org_id: str = None, language: str = None):
         if language:
             query = query.eq("language", language)
             
-        response = query.execute()
-        print(f"Students response: {response.data}")
+        rows, next_cursor = await fetch_page(query, cursor, limit)
+        
+        # Organization names come from the in-memory directory instead of a join
+        await org_directory.ensure_loaded(supabase)
+        org_name = await org_directory.name(supabase, org_id or (rows[0].get("org_id") if rows else None))
+        for row in rows:
+            org = org_directory.by_id(row.get("org_id", org_id))
+            row["organizations"] = {"name": org["name"]} if org else None
         
         return {
-            "students": response.data or [],
-            "org_name": org_name
+            "students": rows,
+            "org_name": org_name,
+            "next_cursor": next_cursor
         }
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error fetching students: {str(e)}")
+        logger.exception("Error fetching students")
         raise HTTPException(status_code=500, detail="Failed to fetch students")
     # try:
     #     print(f"Received request for students with org_id: {org_id}")
@@ -148,29 +207,71 @@ async def list_students(org_id: str = None, language: str = None):
     #     print(f"Error fetching students: {str(e)}")
     #     raise HTTPException(status_code=500, detail="Failed to fetch students")
 
+@router.get("/export")
+async def export_students(
+    org_id: str = Query(..., description="Organization ID"),
+    language: str = None,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    fields: Optional[str] = Query(None, description="Comma separated columns to export"),
+    claims: TokenClaims = Depends(require_role("admin", "org")),
+    supabase: AsyncClient = Depends(get_supabase)
+):
+    """
+    Full roster with marks as NDJSON or CSV, streamed page by page so memory
+    use is independent of the roster size.
+    """
+    check_org(claims, org_id)
+    select = select_columns(fields or ",".join(STUDENT_COLUMNS), STUDENT_COLUMNS)
+
+    def build_query():
+        query = supabase.table("students").select(select).eq("org_id", org_id)
+        if language:
+            query = query.eq("language", language)
+        return query
+
+    try:
+        return await export_rows(build_query, select.split(", "), format, f"students.{format}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error exporting students")
+        raise HTTPException(status_code=500, detail="Failed to export students")
+
 @router.get("/{student_id}")
-async def get_student(student_id: str):
+async def get_student(
+    student_id: str,
+    claims: TokenClaims = Depends(get_current_user),
+    supabase: AsyncClient = Depends(get_supabase)
+):
     try:
-        response = supabase.table("students").select("*").eq("id", student_id).execute()
+        response = await supabase.table("students").select("*").eq("id", student_id).execute()
         
         if not response.data:
             raise HTTPException(status_code=404, detail="Student not found")
+        check_org(claims, response.data[0]["org_id"])
             
         return {"student": response.data[0]}
     except HTTPException as e:
         raise e
     except Exception as e:
-        print(f"Error fetching student: {str(e)}")
+        logger.exception("Error fetching student")
         raise HTTPException(status_code=500, detail="Failed to fetch student details")
 
 @router.put("/{student_id}")
-async def update_student(student_id: str, student_data: dict):
+@invalidates("students")
+async def update_student(
+    student_id: str,
+    student_data: dict,
+    claims: TokenClaims = Depends(require_role("admin", "org")),
+    supabase: AsyncClient = Depends(get_supabase)
+):
     try:
-        # Validate that the student exists
-        check_response = supabase.table("students").select("*").eq("id", student_id).execute()
-        if not check_response.data:
+        # Only the student's own organization may change it
+        existing = await supabase.table("students").select("org_id").eq("id", student_id).execute()
+        if not existing.data:
             raise HTTPException(status_code=404, detail="Student not found")
-            
+        check_org(claims, existing.data[0]["org_id"])
+        
         # Create update data for student table
         update_data = {
             "name": student_data.get("name"),
@@ -191,60 +292,62 @@ async def update_student(student_id: str, student_data: dict):
         # Remove None values
         update_data = {k: v for k, v in update_data.items() if v is not None}
         
-        # Update student in students table
-        student_response = supabase.table("students").update(update_data).eq("id", student_id).execute()
+        # Only a non-blank password replaces the stored one
+        password = student_data.get("password")
+        password = await hash_password(password) if password and password.strip() else None
         
-        # Update auth table if needed
-        student_email = check_response.data[0].get("email")
-        auth_update = {}
+        # Students row, auth row, analytics snapshot and marks history are
+        # updated in one transaction
+        response = await supabase.rpc("update_student", {
+            "p_id": student_id,
+            "p_changes": update_data,
+            "p_password": password
+        }).execute()
         
-        # If name changed, update username in auth table
-        if "name" in update_data:
-            auth_update["username"] = update_data["name"]
-            
-        # If email changed, update email in auth table
-        if "email" in update_data:
-            new_email = update_data["email"]
-            auth_update["email"] = new_email
-            # Update student_email for password update if needed
-            student_email = new_email
-            
-        # If password provided, update password in auth table
-        if student_data.get("password") and student_data.get("password").strip():
-            auth_update["password"] = student_data.get("password")
-            
-        # Perform update if there are changes to auth table
-        if auth_update and student_email:
-            auth_response = supabase.table("auth").update(auth_update).eq("email", student_email).execute()
+        # Drop cached identities for the old and new email
+        await invalidate_user(response.data["old"].get("email"), response.data["new"].get("email"))
+        await invalidate_leaderboards([(response.data["old"], response.data["new"])])
         
-        return {"success": True, "student": student_response.data[0]}
+        return {"success": True, "student": response.data["new"]}
     except HTTPException as e:
         raise e
+    except APIError as e:
+        if e.code == NO_DATA_FOUND:
+            raise HTTPException(status_code=404, detail="Student not found")
+        logger.error("Error updating student: %s", e.message)
+        raise HTTPException(status_code=500, detail="Failed to update student")
     except Exception as e:
-        print(f"Error updating student: {str(e)}")
+        logger.exception("Error updating student")
         raise HTTPException(status_code=500, detail="Failed to update student")
 
 @router.delete("/{student_id}")
-async def delete_student(student_id: str):
+@invalidates("students")
+async def delete_student(
+    student_id: str,
+    claims: TokenClaims = Depends(require_role("admin", "org")),
+    supabase: AsyncClient = Depends(get_supabase)
+):
     try:
-        # Get student details including email
-        student_response = supabase.table("students").select("email").eq("id", student_id).execute()
-        
-        if not student_response.data:
+        # Only the student's own organization may delete it
+        existing = await supabase.table("students").select("org_id").eq("id", student_id).execute()
+        if not existing.data:
             raise HTTPException(status_code=404, detail="Student not found")
-            
-        student_email = student_response.data[0].get("email")
+        check_org(claims, existing.data[0]["org_id"])
         
-        # Delete student from students table
-        student_delete = supabase.table("students").delete().eq("id", student_id).execute()
+        # Students row, auth row and analytics snapshot are removed in one transaction
+        response = await supabase.rpc("delete_student", {"p_id": student_id}).execute()
         
-        # Delete student from auth table if email is available
-        if student_email:
-            auth_delete = supabase.table("auth").delete().eq("email", student_email).execute()
+        await invalidate_user(response.data.get("email"))
+        await invalidate_leaderboards([(response.data, None)])
         
         return {"success": True, "message": "Student deleted successfully"}
     except HTTPException as e:
         raise e
+    except APIError as e:
+        if e.code == NO_DATA_FOUND:
+            raise HTTPException(status_code=404, detail="Student not found")
+        logger.error("Error deleting student: %s", e.message)
+        raise HTTPException(status_code=500, detail="Failed to delete student")
     except Exception as e:
-        print(f"Error deleting student: {str(e)}")
+        logger.exception("Error deleting student")
         raise HTTPException(status_code=500, detail="Failed to delete student")
\ No newline at end of file
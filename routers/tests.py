@@ -1,19 +1,22 @@
 # routers/tests.py
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from typing import Optional, List
-from datetime import datetime,timedelta
-import asyncio
-from apscheduler.schedulers.asyncio import AsyncIOScheduler # type: ignore
-from apscheduler.triggers.date import DateTrigger # type: ignore
-from main import supabase
+from datetime import datetime
+from supabase import AsyncClient
 
-router = APIRouter(prefix="/tests", tags=["tests"])
+from auth_utils import TokenClaims, check_org, get_current_user, require_role
+from database import get_supabase
+from response_cache import cache_response, invalidates
+from event_broker import broker
+from upcoming_tests import invalidate_upcoming_tests
+
+router = APIRouter(prefix="/tests", tags=["tests"], dependencies=[Depends(get_current_user)])
 
 class TestCreate(BaseModel):
     test_name: str
-    auth_id: str  # ID from auth tablex
+    auth_id: Optional[str] = None  # Unused; the creator comes from the bearer token
     org_id: str
     language: str
     test_duration: int
@@ -40,52 +43,29 @@ class TestUpdate(BaseModel):
     test_link: Optional[str] = None
     status: Optional[str] = None
 
-scheduler = AsyncIOScheduler()
-async def update_test_status_to_completed(test_id: str):
-    try:
-        # Update the test status to completed
-        response = supabase.table("tests").update({
-            "status": "completed"
-        }).eq("id", test_id).execute()
-        
-        print(f"Test {test_id} status updated to completed")
-    except Exception as e:
-        print(f"Error updating test status: {e}")
-
-# Add this function to schedule status updates
-async def schedule_test_completion(test_id: str, test_time: datetime, duration_minutes: int):
-    # Calculate when the test should be completed
-    completion_time = test_time + timedelta(minutes=duration_minutes)
-    
-    # Schedule the status update
-    scheduler.add_job(
-        update_test_status_to_completed,
-        trigger=DateTrigger(run_date=completion_time),
-        args=[test_id],
-        id=f"complete_test_{test_id}",
-        replace_existing=True
-    )
-    
-    print(f"Scheduled test {test_id} to complete at {completion_time}")
-
 @router.post("/add")
-async def add_test(test: TestCreate):
+@invalidates("tests")
+async def add_test(
+    test: TestCreate,
+    claims: TokenClaims = Depends(get_current_user),
+    supabase: AsyncClient = Depends(get_supabase)
+):
     try:
-        # Verify the auth user exists and is an admin
-        auth_user = supabase.table("auth").select("*").eq("id", test.auth_id).execute()
-        if not auth_user.data:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        auth_data = auth_user.data[0]
-        if auth_data["role"] != "admin":
+        # Only admins can create tests; their admin row id is in the token
+        if claims.role != "admin":
             raise HTTPException(status_code=403, detail="Only admins can create tests")
 
-        # Get the admin details from admins table
-        admin = supabase.table("admins").select("*").eq("email", auth_data["email"]).execute()
-        if not admin.data:
+        if claims.profile_id is None:
             raise HTTPException(status_code=404, detail="Admin profile not found")
 
-        admin_data = admin.data[0]
+        check_org(claims, test.org_id)
+
+        admin_data = {
+            "id": claims.profile_id,
+            "email": claims.email,
+            "org_id": claims.org_id,
+            "language": claims.language
+        }
 
         # Prepare test data
         test_data = {
@@ -100,11 +80,14 @@ async def add_test(test: TestCreate):
         }
 
         # Insert into tests table
-        response = supabase.table("tests").insert(test_data).execute()
+        response = await supabase.table("tests").insert(test_data).execute()
 
         if not response.data:
             raise HTTPException(status_code=500, detail="Failed to create test")
 
+        await invalidate_upcoming_tests(response.data)
+        broker.publish("created", response.data)
+
         return {
             "status": "success",
             "test": response.data[0],
@@ -117,27 +100,17 @@ async def add_test(test: TestCreate):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/list", response_model=List[TestResponse])
+@cache_response(ttl=30, tags=["tests", "admins"])
 async def list_tests(
-    auth_id: str,
     status: Optional[str] = None,
-    language: Optional[str] = None
+    language: Optional[str] = None,
+    claims: TokenClaims = Depends(require_role("admin")),
+    supabase: AsyncClient = Depends(get_supabase)
 ):
     try:
-        # 1. Get admin info from auth_id
-        auth_user = supabase.table("auth").select("*").eq("id", auth_id).execute()
-        if not auth_user.data:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        auth_data = auth_user.data[0]
-        
-        # 2. Get admin details to find the admin's language if not specified
-        admin = supabase.table("admins").select("*").eq("email", auth_data["email"]).execute()
-        if not admin.data:
-            raise HTTPException(status_code=404, detail="Admin profile not found")
-        
-        admin_data = admin.data[0]
-        admin_language = language or admin_data["language"]
-        admin_id = admin_data["id"]
+        # 1-2. Admin details (from the token) give the default language
+        admin_language = language or claims.language
+        admin_id = claims.profile_id
 
         # 3. Build query
         query = supabase.table("tests").select("*").eq("user_id", admin_id)
@@ -148,7 +121,7 @@ async def list_tests(
             query = query.eq("language", admin_language)
 
         # 4. Execute query
-        response = query.order("test_time", desc=True).execute()
+        response = await query.order("test_time", desc=True).execute()
         
         return response.data
 
@@ -158,35 +131,32 @@ async def list_tests(
 
 
 @router.delete("/{test_id}")
-async def delete_test(test_id: str, auth_id: str = None):
+@invalidates("tests")
+async def delete_test(
+    test_id: str,
+    claims: TokenClaims = Depends(require_role("admin")),
+    supabase: AsyncClient = Depends(get_supabase)
+):
     try:
         # First, verify the test exists and belongs to the user
-        test_response = supabase.table("tests").select("*").eq("id", test_id).execute()
+        test_response = await supabase.table("tests").select("*").eq("id", test_id).execute()
         if not test_response.data:
             raise HTTPException(status_code=404, detail="Test not found")
         
         test_data = test_response.data[0]
         
-        # Optional: Verify ownership if auth_id is provided
-        if auth_id:
-            auth_user = supabase.table("auth").select("*").eq("id", auth_id).execute()
-            if not auth_user.data:
-                raise HTTPException(status_code=404, detail="User not found")
-            
-            auth_data = auth_user.data[0]
-            admin = supabase.table("admins").select("*").eq("email", auth_data["email"]).execute()
-            if not admin.data:
-                raise HTTPException(status_code=404, detail="Admin profile not found")
-            
-            admin_data = admin.data[0]
-            if test_data["user_id"] != admin_data["id"]:
-                raise HTTPException(status_code=403, detail="Not authorized to delete this test")
+        # Verify ownership
+        if test_data["user_id"] != claims.profile_id:
+            raise HTTPException(status_code=403, detail="Not authorized to delete this test")
         
         # Delete the test
-        delete_response = supabase.table("tests").delete().eq("id", test_id).execute()
+        delete_response = await supabase.table("tests").delete().eq("id", test_id).execute()
         
         if not delete_response.data:
             raise HTTPException(status_code=500, detail="Failed to delete test")
+
+        await invalidate_upcoming_tests([test_data])
+        broker.publish("deleted", [test_data])
         
         return {"status": "success", "message": "Test deleted successfully"}
     
@@ -196,13 +166,23 @@ async def delete_test(test_id: str, auth_id: str = None):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.put("/{test_id}")
-async def update_test(test_id: str, test_update: TestUpdate):
+@invalidates("tests")
+async def update_test(
+    test_id: str,
+    test_update: TestUpdate,
+    claims: TokenClaims = Depends(require_role("admin")),
+    supabase: AsyncClient = Depends(get_supabase)
+):
     try:
-        # First, verify the test exists
-        test_response = supabase.table("tests").select("*").eq("id", test_id).execute()
+        # First, verify the test exists and belongs to the user
+        test_response = await supabase.table("tests").select("*").eq("id", test_id).execute()
         if not test_response.data:
             raise HTTPException(status_code=404, detail="Test not found")
         
+        # Verify ownership
+        if test_response.data[0]["user_id"] != claims.profile_id:
+            raise HTTPException(status_code=403, detail="Not authorized to update this test")
+        
         # Prepare update data (only include fields that are provided)
         update_data = {}
         if test_update.test_name is not None:
@@ -217,10 +197,13 @@ async def update_test(test_id: str, test_update: TestUpdate):
             update_data["status"] = test_update.status
         
         # Update the test
-        response = supabase.table("tests").update(update_data).eq("id", test_id).execute()
+        response = await supabase.table("tests").update(update_data).eq("id", test_id).execute()
         
         if not response.data:
             raise HTTPException(status_code=500, detail="Failed to update test")
+
+        await invalidate_upcoming_tests(response.data)
+        broker.publish("updated", response.data)
         
         return {
             "status": "success", 
@@ -0,0 +1,119 @@
+# single_flight.py
+import asyncio
+import os
+from collections import defaultdict
+from typing import Dict, Iterable, Optional
+
+import httpx
+
+from metrics import Counter, table_and_operation, register
+
+# Read-only (stable) SQL functions whose POST /rpc calls may be shared
+DB_COALESCE_RPCS = frozenset(
+    name.strip() for name in os.getenv("DB_COALESCE_RPCS", "analytics_trends").split(",") if name.strip()
+)
+
+db_reads = Counter("db_coalescible_reads_total", "Reads eligible for coalescing, by table.", ("table",))
+db_reads_coalesced = Counter(
+    "db_coalesced_reads_total", "Reads served by another caller's in-flight identical query, by table.", ("table",)
+)
+register(db_reads, db_reads_coalesced)
+
+
+class CoalescingTransport(httpx.AsyncBaseTransport):
+    """
+    Single-flight for PostgREST reads: while a GET or HEAD (or a call to one
+    of `rpcs`) is in flight, identical requests - same URL, so same table,
+    filters, order and range, same headers and body - wait for it and get a
+    copy of its response instead of issuing their own. Nothing is cached
+    once the call completes.
+
+    A read only joins a call started since the last completed write it could
+    depend on, so a read issued after a write never sees pre-write data.
+    Writes to a table move that table's epoch; other RPCs may write to any
+    table, so they move every epoch.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, rpcs: Iterable[str] = DB_COALESCE_RPCS):
+        self._transport = transport
+        self._rpcs = frozenset(rpcs)
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        # Completed writes per table, by RPCs, and in total
+        self._table_writes: Dict[str, int] = defaultdict(int)
+        self._rpc_writes = 0
+        self._writes = 0
+
+    def _epoch(self, table: str, operation: str) -> tuple:
+        if operation == "rpc":
+            # Which tables a read-only function reads is unknown
+            return (self._writes,)
+        return self._table_writes[table], self._rpc_writes
+
+    def _record_write(self, table: str, operation: str):
+        if operation == "rpc":
+            self._rpc_writes += 1
+        else:
+            self._table_writes[table] += 1
+        self._writes += 1
+
+    async def _key(self, request: httpx.Request, table: str, operation: str) -> Optional[tuple]:
+        if request.method in ("GET", "HEAD"):
+            body = b""
+        elif operation == "rpc" and request.method == "POST" and table in self._rpcs:
+            body = await request.aread()
+        else:
+            return None
+        return (
+            request.method, str(request.url), tuple(sorted(request.headers.multi_items())), body,
+            self._epoch(table, operation),
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        table, operation = table_and_operation(request)
+        key = await self._key(request, table, operation)
+        if key is None:
+            try:
+                return await self._transport.handle_async_request(request)
+            finally:
+                # Counted once the write is done (or failed, possibly after
+                # committing), so reads issued from now on start fresh calls
+                self._record_write(table, operation)
+
+        db_reads.inc((table,))
+        future = self._inflight.get(key)
+        if future is not None:
+            db_reads_coalesced.inc((table,))
+            try:
+                status, headers, content = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The leader's caller went away; issue our own call
+                return await self._transport.handle_async_request(request)
+            return httpx.Response(status, headers=headers, content=content, request=request)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            response = await self._transport.handle_async_request(request)
+            try:
+                # Raw bytes so Content-Encoding is still applied once per copy
+                content = b"".join([chunk async for chunk in response.stream])
+            finally:
+                await response.aclose()
+            result = (response.status_code, response.headers.multi_items(), content)
+            future.set_result(result)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Marks the exception retrieved when nobody else was waiting
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+        return httpx.Response(result[0], headers=result[1], content=result[2], request=request)
+
+    async def aclose(self):
+        await self._transport.aclose()
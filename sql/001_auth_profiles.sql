@@ -0,0 +1,24 @@
+-- 001_auth_profiles.sql
+-- One row per auth user with the org_id and language resolved from the
+-- matching admins / students / organizations row, so login is a single query.
+
+create or replace view auth_profiles as
+select
+    a.id,
+    a.email,
+    a.username,
+    a.password,
+    a.role,
+    case a.role
+        when 'admin' then ad.org_id
+        when 'student' then s.org_id
+        when 'org' then o.id
+    end as org_id,
+    case a.role
+        when 'admin' then ad.language
+        when 'student' then s.language
+    end as language
+from auth a
+left join admins ad on a.role = 'admin' and ad.email = a.email
+left join students s on a.role = 'student' and s.email = a.email
+left join organizations o on a.role = 'org' and o.email = a.email;
@@ -0,0 +1,30 @@
+-- 002_analytics_summary.sql
+-- Per-org/per-language mark averages computed in the database, called from
+-- /analytics/summary over RPC. Missing marks count as 0, matching the
+-- previous Python implementation.
+
+create index if not exists students_org_language_idx on students (org_id, language);
+
+create or replace function analytics_summary(p_org_id uuid, p_language text)
+returns table (
+    total_students bigint,
+    avg_overall double precision,
+    avg_fluency double precision,
+    avg_vocab double precision,
+    avg_sentence_mastery double precision,
+    avg_pronunciation double precision
+)
+language sql
+stable
+as $$
+    select
+        count(*),
+        coalesce(avg(coalesce(overall_mark, 0)), 0)::double precision,
+        coalesce(avg(coalesce(fluency_mark, 0)), 0)::double precision,
+        coalesce(avg(coalesce(vocab_mark, 0)), 0)::double precision,
+        coalesce(avg(coalesce(sentence_mastery, 0)), 0)::double precision,
+        coalesce(avg(coalesce(pronunciation, 0)), 0)::double precision
+    from students
+    where org_id = p_org_id
+      and language = p_language;
+$$;
@@ -0,0 +1,85 @@
+-- 003_analytics_snapshots.sql
+-- Running totals per (org_id, language) so dashboard reads are a single
+-- primary-key lookup. The API applies deltas from the student write paths
+-- through apply_analytics_delta; rebuild_analytics_snapshot recomputes one
+-- cohort from the students table.
+
+create table if not exists analytics_snapshots (
+    org_id uuid not null,
+    language text not null,
+    student_count bigint not null default 0,
+    sum_overall double precision not null default 0,
+    sum_fluency double precision not null default 0,
+    sum_vocab double precision not null default 0,
+    sum_sentence_mastery double precision not null default 0,
+    sum_pronunciation double precision not null default 0,
+    pass_count bigint not null default 0,
+    updated_at timestamptz not null default now(),
+    primary key (org_id, language)
+);
+
+create or replace function apply_analytics_delta(
+    p_org_id uuid,
+    p_language text,
+    p_student_count bigint,
+    p_sum_overall double precision,
+    p_sum_fluency double precision,
+    p_sum_vocab double precision,
+    p_sum_sentence_mastery double precision,
+    p_sum_pronunciation double precision,
+    p_pass_count bigint
+)
+returns void
+language sql
+as $$
+    insert into analytics_snapshots as s (
+        org_id, language, student_count, sum_overall, sum_fluency, sum_vocab,
+        sum_sentence_mastery, sum_pronunciation, pass_count
+    )
+    values (
+        p_org_id, p_language, p_student_count, p_sum_overall, p_sum_fluency, p_sum_vocab,
+        p_sum_sentence_mastery, p_sum_pronunciation, p_pass_count
+    )
+    on conflict (org_id, language) do update set
+        student_count = s.student_count + excluded.student_count,
+        sum_overall = s.sum_overall + excluded.sum_overall,
+        sum_fluency = s.sum_fluency + excluded.sum_fluency,
+        sum_vocab = s.sum_vocab + excluded.sum_vocab,
+        sum_sentence_mastery = s.sum_sentence_mastery + excluded.sum_sentence_mastery,
+        sum_pronunciation = s.sum_pronunciation + excluded.sum_pronunciation,
+        pass_count = s.pass_count + excluded.pass_count,
+        updated_at = now();
+$$;
+
+create or replace function rebuild_analytics_snapshot(p_org_id uuid, p_language text, p_pass_mark double precision default 70)
+returns setof analytics_snapshots
+language sql
+as $$
+    insert into analytics_snapshots as s (
+        org_id, language, student_count, sum_overall, sum_fluency, sum_vocab,
+        sum_sentence_mastery, sum_pronunciation, pass_count
+    )
+    select
+        p_org_id,
+        p_language,
+        count(*),
+        coalesce(sum(overall_mark), 0),
+        coalesce(sum(fluency_mark), 0),
+        coalesce(sum(vocab_mark), 0),
+        coalesce(sum(sentence_mastery), 0),
+        coalesce(sum(pronunciation), 0),
+        count(*) filter (where overall_mark >= p_pass_mark)
+    from students
+    where org_id = p_org_id
+      and language = p_language
+    on conflict (org_id, language) do update set
+        student_count = excluded.student_count,
+        sum_overall = excluded.sum_overall,
+        sum_fluency = excluded.sum_fluency,
+        sum_vocab = excluded.sum_vocab,
+        sum_sentence_mastery = excluded.sum_sentence_mastery,
+        sum_pronunciation = excluded.sum_pronunciation,
+        pass_count = excluded.pass_count,
+        updated_at = now()
+    returning *;
+$$;
@@ -0,0 +1,121 @@
+-- 004_marks_history.sql
+-- Append-only log of mark changes plus daily/weekly rollups maintained on
+-- write, so trend reads are single-row lookups.
+
+create table if not exists marks_history (
+    id bigint generated always as identity primary key,
+    student_id uuid not null,
+    org_id uuid not null,
+    language text not null,
+    mark text not null,
+    old_value double precision,
+    new_value double precision,
+    recorded_at timestamptz not null default now()
+);
+
+create index if not exists marks_history_cohort_idx on marks_history (org_id, language, recorded_at);
+
+-- Students seen per bucket, used to count distinct active students
+create table if not exists marks_activity (
+    org_id uuid not null,
+    language text not null,
+    period text not null check (period in ('day', 'week')),
+    bucket_start date not null,
+    student_id uuid not null,
+    primary key (org_id, language, period, bucket_start, student_id)
+);
+
+create table if not exists marks_rollups (
+    org_id uuid not null,
+    language text not null,
+    period text not null check (period in ('day', 'week')),
+    bucket_start date not null,
+    update_count bigint not null default 0,
+    overall_delta_sum double precision not null default 0,
+    overall_delta_count bigint not null default 0,
+    active_students bigint not null default 0,
+    primary key (org_id, language, period, bucket_start)
+);
+
+create index if not exists tests_org_language_status_idx on tests (org_id, language, status);
+
+-- p_changes: [{"mark": "overall_mark", "old": 60, "new": 65}, ...]
+create or replace function record_mark_changes(p_student_id uuid, p_org_id uuid, p_language text, p_changes jsonb)
+returns void
+language plpgsql
+as $$
+declare
+    v_delta double precision;
+    v_period text;
+    v_bucket date;
+    v_new_student int;
+begin
+    insert into marks_history (student_id, org_id, language, mark, old_value, new_value)
+    select p_student_id, p_org_id, p_language, c->>'mark', (c->>'old')::double precision, (c->>'new')::double precision
+    from jsonb_array_elements(p_changes) c;
+
+    select (c->>'new')::double precision - (c->>'old')::double precision
+    into v_delta
+    from jsonb_array_elements(p_changes) c
+    where c->>'mark' = 'overall_mark';
+
+    foreach v_period in array array['day', 'week'] loop
+        v_bucket := date_trunc(v_period, now())::date;
+
+        insert into marks_activity (org_id, language, period, bucket_start, student_id)
+        values (p_org_id, p_language, v_period, v_bucket, p_student_id)
+        on conflict do nothing;
+        get diagnostics v_new_student = row_count;
+
+        insert into marks_rollups as r (
+            org_id, language, period, bucket_start,
+            update_count, overall_delta_sum, overall_delta_count, active_students
+        )
+        values (
+            p_org_id, p_language, v_period, v_bucket,
+            1, coalesce(v_delta, 0), (v_delta is not null)::int, v_new_student
+        )
+        on conflict (org_id, language, period, bucket_start) do update set
+            update_count = r.update_count + 1,
+            overall_delta_sum = r.overall_delta_sum + excluded.overall_delta_sum,
+            overall_delta_count = r.overall_delta_count + excluded.overall_delta_count,
+            active_students = r.active_students + excluded.active_students;
+    end loop;
+end;
+$$;
+
+-- Current-week trend figures for one cohort
+create or replace function analytics_trends(p_org_id uuid, p_language text)
+returns table (
+    weekly_improvement double precision,
+    active_students bigint,
+    tests_conducted bigint
+)
+language sql
+stable
+as $$
+    select
+        coalesce((
+            select r.overall_delta_sum / nullif(r.overall_delta_count, 0)
+            from marks_rollups r
+            where r.org_id = p_org_id
+              and r.language = p_language
+              and r.period = 'week'
+              and r.bucket_start = date_trunc('week', now())::date
+        ), 0),
+        coalesce((
+            select r.active_students
+            from marks_rollups r
+            where r.org_id = p_org_id
+              and r.language = p_language
+              and r.period = 'week'
+              and r.bucket_start = date_trunc('week', now())::date
+        ), 0),
+        (
+            select count(*)
+            from tests t
+            where t.org_id = p_org_id
+              and t.language = p_language
+              and t.status = 'completed'
+        );
+$$;
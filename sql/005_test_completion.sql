@@ -0,0 +1,25 @@
+-- 005_test_completion.sql
+-- Bulk completion of tests whose window has ended. The tests table is the
+-- job store: every upcoming test is a pending job, so nothing is lost on
+-- restart. The advisory lock lets only one worker run a tick at a time,
+-- and the status predicate makes a repeated tick a no-op.
+
+create index if not exists tests_upcoming_time_idx on tests (test_time) where status = 'upcoming';
+
+create or replace function complete_expired_tests()
+returns setof tests
+language plpgsql
+as $$
+begin
+    if not pg_try_advisory_xact_lock(hashtext('complete_expired_tests')) then
+        return;
+    end if;
+
+    return query
+    update tests t
+    set status = 'completed'
+    where t.status = 'upcoming'
+      and t.test_time + make_interval(mins => t.test_duration) <= now()
+    returning t.*;
+end;
+$$;
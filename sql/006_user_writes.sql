@@ -0,0 +1,217 @@
+-- 006_user_writes.sql
+-- Student/admin create, update and delete as single transactions. Each
+-- function writes the profile table and auth together (and, for students,
+-- the analytics snapshot and marks history), so a failure anywhere rolls
+-- the whole operation back.
+--
+-- Errors: 'unique_violation' (23505) when the email is already registered,
+-- 'no_data_found' (P0002) when the row does not exist.
+
+create or replace function apply_student_snapshot_delta(p_row students, p_sign int)
+returns void
+language sql
+as $$
+    select apply_analytics_delta(
+        p_row.org_id,
+        p_row.language,
+        p_sign,
+        p_sign * coalesce(p_row.overall_mark, 0),
+        p_sign * coalesce(p_row.fluency_mark, 0),
+        p_sign * coalesce(p_row.vocab_mark, 0),
+        p_sign * coalesce(p_row.sentence_mastery, 0),
+        p_sign * coalesce(p_row.pronunciation, 0),
+        p_sign * coalesce(p_row.overall_mark >= 70, false)::int
+    );
+$$;
+
+create or replace function create_student(p_student jsonb, p_password text)
+returns students
+language plpgsql
+as $$
+declare
+    v_row students;
+begin
+    if exists (select 1 from auth where email = p_student->>'email') then
+        raise exception 'Email already registered' using errcode = 'unique_violation';
+    end if;
+
+    insert into students (
+        name, org_id, email, language, overall_mark, average_mark, recent_test_mark,
+        fluency_mark, vocab_mark, sentence_mastery, pronunciation
+    )
+    select
+        name, org_id, email, language, overall_mark, average_mark, recent_test_mark,
+        fluency_mark, vocab_mark, sentence_mastery, pronunciation
+    from jsonb_populate_record(null::students, p_student)
+    returning * into v_row;
+
+    insert into auth (username, email, password, role)
+    values (v_row.name, v_row.email, p_password, 'student');
+
+    perform apply_student_snapshot_delta(v_row, 1);
+    return v_row;
+end;
+$$;
+
+-- p_changes holds only the fields to change; returns {"old": row, "new": row}
+create or replace function update_student(p_id uuid, p_changes jsonb, p_password text default null)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_old students;
+    v_new students;
+    v_mark_changes jsonb;
+begin
+    select * into v_old from students where id = p_id for update;
+    if not found then
+        raise exception 'Student not found' using errcode = 'no_data_found';
+    end if;
+
+    v_new := jsonb_populate_record(v_old, p_changes);
+
+    update students set
+        name = v_new.name,
+        language = v_new.language,
+        email = v_new.email,
+        overall_mark = v_new.overall_mark,
+        average_mark = v_new.average_mark,
+        recent_test_mark = v_new.recent_test_mark,
+        fluency_mark = v_new.fluency_mark,
+        vocab_mark = v_new.vocab_mark,
+        sentence_mastery = v_new.sentence_mastery,
+        pronunciation = v_new.pronunciation
+    where id = p_id
+    returning * into v_new;
+
+    if v_new.name is distinct from v_old.name
+        or v_new.email is distinct from v_old.email
+        or p_password is not null then
+        update auth set
+            username = v_new.name,
+            email = v_new.email,
+            password = coalesce(p_password, password)
+        where email = v_old.email;
+    end if;
+
+    if row(v_old.language, v_old.overall_mark, v_old.fluency_mark, v_old.vocab_mark, v_old.sentence_mastery, v_old.pronunciation)
+        is distinct from
+       row(v_new.language, v_new.overall_mark, v_new.fluency_mark, v_new.vocab_mark, v_new.sentence_mastery, v_new.pronunciation) then
+        perform apply_student_snapshot_delta(v_old, -1);
+        perform apply_student_snapshot_delta(v_new, 1);
+    end if;
+
+    select jsonb_agg(jsonb_build_object('mark', o.key, 'old', o.value, 'new', n.value))
+    into v_mark_changes
+    from jsonb_each(to_jsonb(v_old)) o
+    join jsonb_each(to_jsonb(v_new)) n using (key)
+    where o.key in (
+        'overall_mark', 'average_mark', 'recent_test_mark', 'fluency_mark',
+        'vocab_mark', 'sentence_mastery', 'pronunciation'
+    )
+      and o.value is distinct from n.value;
+
+    if v_mark_changes is not null then
+        perform record_mark_changes(v_new.id, v_new.org_id, v_new.language, v_mark_changes);
+    end if;
+
+    return jsonb_build_object('old', to_jsonb(v_old), 'new', to_jsonb(v_new));
+end;
+$$;
+
+create or replace function delete_student(p_id uuid)
+returns students
+language plpgsql
+as $$
+declare
+    v_old students;
+begin
+    delete from students where id = p_id returning * into v_old;
+    if not found then
+        raise exception 'Student not found' using errcode = 'no_data_found';
+    end if;
+
+    delete from auth where email = v_old.email;
+
+    perform apply_student_snapshot_delta(v_old, -1);
+    return v_old;
+end;
+$$;
+
+create or replace function create_admin(p_admin jsonb, p_password text)
+returns admins
+language plpgsql
+as $$
+declare
+    v_row admins;
+begin
+    if exists (select 1 from auth where email = p_admin->>'email') then
+        raise exception 'Email already registered' using errcode = 'unique_violation';
+    end if;
+
+    insert into admins (name, org_id, role, contact, language, email)
+    select name, org_id, role, contact, language, email
+    from jsonb_populate_record(null::admins, p_admin)
+    returning * into v_row;
+
+    insert into auth (username, email, password, role)
+    values (v_row.name, v_row.email, p_password, 'admin');
+
+    return v_row;
+end;
+$$;
+
+create or replace function update_admin(p_id uuid, p_changes jsonb, p_password text default null)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_old admins;
+    v_new admins;
+begin
+    select * into v_old from admins where id = p_id for update;
+    if not found then
+        raise exception 'Admin not found' using errcode = 'no_data_found';
+    end if;
+
+    v_new := jsonb_populate_record(v_old, p_changes);
+
+    update admins set
+        name = v_new.name,
+        role = v_new.role,
+        contact = v_new.contact,
+        language = v_new.language,
+        email = v_new.email
+    where id = p_id
+    returning * into v_new;
+
+    if v_new.name is distinct from v_old.name
+        or v_new.email is distinct from v_old.email
+        or p_password is not null then
+        update auth set
+            username = v_new.name,
+            email = v_new.email,
+            password = coalesce(p_password, password)
+        where email = v_old.email;
+    end if;
+
+    return jsonb_build_object('old', to_jsonb(v_old), 'new', to_jsonb(v_new));
+end;
+$$;
+
+create or replace function delete_admin(p_id uuid)
+returns admins
+language plpgsql
+as $$
+declare
+    v_old admins;
+begin
+    delete from admins where id = p_id returning * into v_old;
+    if not found then
+        raise exception 'Admin not found' using errcode = 'no_data_found';
+    end if;
+
+    delete from auth where email = v_old.email;
+    return v_old;
+end;
+$$;
@@ -0,0 +1,29 @@
+-- 007_auth_profiles_profile_id.sql
+-- Expose the admins / students / organizations row id on auth_profiles so
+-- login can put it in the JWT and handlers need no identity lookup.
+
+create or replace view auth_profiles as
+select
+    a.id,
+    a.email,
+    a.username,
+    a.password,
+    a.role,
+    case a.role
+        when 'admin' then ad.org_id
+        when 'student' then s.org_id
+        when 'org' then o.id
+    end as org_id,
+    case a.role
+        when 'admin' then ad.language
+        when 'student' then s.language
+    end as language,
+    case a.role
+        when 'admin' then ad.id
+        when 'student' then s.id
+        when 'org' then o.id
+    end as profile_id
+from auth a
+left join admins ad on a.role = 'admin' and ad.email = a.email
+left join students s on a.role = 'student' and s.email = a.email
+left join organizations o on a.role = 'org' and o.email = a.email;
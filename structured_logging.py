@@ -0,0 +1,191 @@
+# structured_logging.py
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from fastapi import Request
+from starlette.middleware.base import BaseHTTPMiddleware
+
+
+def _parse_rates(spec: str) -> Dict[str, float]:
+    rates = {}
+    for item in spec.split(","):
+        if "=" in item:
+            route, rate = item.rsplit("=", 1)
+            rates[route.strip()] = float(rate)
+    return rates
+
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Fraction of request log lines kept, overall and per route template, e.g.
+# LOG_SAMPLE_RATES="/student/list=0.05,/admin/list=0.05". Server errors and
+# slow requests are always logged.
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+LOG_SAMPLE_RATES = _parse_rates(os.getenv("LOG_SAMPLE_RATES", ""))
+LOG_SLOW_REQUEST_MS = float(os.getenv("LOG_SLOW_REQUEST_MS", "1000"))
+
+# Per-call HTTP client logs would double every database round-trip
+QUIET_LOGGERS = ("httpx", "httpcore", "hpack", "apscheduler.executors.default")
+
+# Values of these keys never reach the log; PII keys are masked
+SECRET_KEYS = frozenset({"password", "p_password", "access_token", "token", "authorization", "secret", "api_key", "supabase_key"})
+PII_KEYS = frozenset({"email", "username", "name", "contact"})
+
+_EMAIL_RE = re.compile(r"([A-Za-z0-9._+-])[A-Za-z0-9._%+-]*(@|%40)([A-Za-z0-9.-]+)")
+_JWT_RE = re.compile(r"eyJ[\w-]+\.[\w-]+\.[\w-]+")
+
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+access_logger = logging.getLogger("access")
+
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id", "taskName"}
+
+
+def _scrub_text(text: str) -> str:
+    return _EMAIL_RE.sub(r"\1***\2\3", _JWT_RE.sub("[REDACTED]", text))
+
+
+def redact(value, key: Optional[str] = None):
+    """Copy of `value` with secrets removed and PII masked, by key and by pattern."""
+    if key is not None:
+        lowered = key.lower()
+        if lowered in SECRET_KEYS:
+            return "[REDACTED]"
+        if lowered in PII_KEYS and value is not None:
+            return _scrub_text(str(value)) if "@" in str(value) else "[PII]"
+    if isinstance(value, dict):
+        return {k: redact(v, str(k)) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(v) for v in value]
+    if isinstance(value, str):
+        return _scrub_text(value)
+    return value
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": _scrub_text(record.getMessage()),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = redact(value, key)
+        if record.exc_text:
+            entry["exc"] = _scrub_text(record.exc_text)
+        return json.dumps(entry, default=str)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to a background thread for formatting and writing. When
+    the queue is full records are dropped (and counted) rather than blocking
+    the event loop.
+    """
+
+    dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only the cheap parts run on the caller's thread; JSON encoding and
+        # redaction happen in the listener
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        record.request_id = request_id_var.get()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            NonBlockingQueueHandler.dropped += 1
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_previous_handlers: list = []
+
+
+def setup_logging(level: str = LOG_LEVEL, stream=None):
+    """Route all logging through one queue to a JSON stream handler. Idempotent."""
+    global _listener, _previous_handlers
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter())
+
+    log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    root = logging.getLogger()
+    _previous_handlers = root.handlers
+    root.handlers = [NonBlockingQueueHandler(log_queue)]
+    root.setLevel(level)
+    for name in QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(max(logging.WARNING, root.level))
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Flush queued records, stop the writer thread and put back the previous root handlers."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+        # Nothing would drain the queue any more
+        logging.getLogger().handlers = _previous_handlers
+
+
+def _sampled(route: str) -> bool:
+    rate = LOG_SAMPLE_RATES.get(route, LOG_SAMPLE_RATE)
+    return rate >= 1 or random.random() < rate
+
+
+class RequestLoggingMiddleware(BaseHTTPMiddleware):
+    """
+    Tags every request with an ID (taken from X-Request-ID or generated),
+    exposes it to log records through request_id_var and writes one
+    sampled access line with the route, status and duration.
+    """
+
+    async def dispatch(self, request: Request, call_next):
+        request_id = request.headers.get("x-request-id") or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            response.headers["X-Request-ID"] = request_id
+            return response
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            route = getattr(request.scope.get("route"), "path", request.url.path)
+            if status >= 500 or duration_ms >= LOG_SLOW_REQUEST_MS or _sampled(route):
+                access_logger.info("request", extra={
+                    "method": request.method,
+                    "route": route,
+                    "status": status,
+                    "duration_ms": round(duration_ms, 2),
+                })
+            request_id_var.reset(token)
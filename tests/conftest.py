@@ -0,0 +1,83 @@
+# tests/conftest.py
+import os
+
+# Hashing cost is not under test
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from auth_utils import create_access_token
+from database import set_supabase
+from fake_supabase import FakeDatabase, seed
+from main import app
+from response_cache import MemoryCacheBackend, set_cache_backend
+
+
+@pytest.fixture
+def db():
+    """A small seeded in-memory database, used by every request the app makes."""
+    database = FakeDatabase()
+    seed(database, organizations=2, languages=("english", "spanish"), students_per_cohort=5, tests_per_admin=1)
+    set_supabase(database.client())
+    set_cache_backend(MemoryCacheBackend())
+    return database
+
+
+@pytest.fixture
+def client(db):
+    # No lifespan: the scheduler and directory refresh stay off
+    return TestClient(app)
+
+
+@pytest.fixture
+def org_id(db):
+    return db.rows("organizations")[0]["id"]
+
+
+@pytest.fixture
+def make_headers():
+    """Authorization headers for a token carrying `claims`."""
+    def make(role, org_id, **claims):
+        token = create_access_token({"user_id": f"test-{role}", "email": f"{role}@example.com", "role": role, "org_id": org_id, **claims})
+        return {"Authorization": f"Bearer {token}"}
+    return make
+
+
+@pytest.fixture
+def admin_headers(db, org_id, make_headers):
+    admin = db.find("admins", org_id=org_id)[0]
+    return make_headers("admin", org_id, email=admin["email"], language=admin["language"], profile_id=admin["id"])
+
+
+class FakeRedis:
+    """The part of the redis.asyncio client RedisCacheBackend uses, kept in a dict."""
+
+    def __init__(self):
+        self.values = {}
+
+    async def get(self, key):
+        value, expires = self.values.get(key, (None, None))
+        if expires is not None and expires <= time.monotonic():
+            del self.values[key]
+            return None
+        return value
+
+    async def set(self, key, value, px=None):
+        self.values[key] = (value, time.monotonic() + px / 1000 if px is not None else None)
+
+    async def mget(self, keys):
+        return [await self.get(key) for key in keys]
+
+    async def incr(self, key):
+        value = int(await self.get(key) or 0) + 1
+        self.values[key] = (value, None)
+        return value
+
+
+@pytest.fixture
+def redis():
+    """A Redis stand-in shared by every RedisCacheBackend built on it, as workers share a server."""
+    return FakeRedis()
@@ -0,0 +1,86 @@
+# tests/test_access.py
+import json
+
+import pytest
+
+
+@pytest.fixture
+def other_org_id(db, org_id):
+    return next(o["id"] for o in db.rows("organizations") if o["id"] != org_id)
+
+
+@pytest.fixture
+def student_headers(db, org_id, make_headers):
+    student = db.find("students", org_id=org_id)[0]
+    return make_headers("student", org_id, email=student["email"], language=student["language"], profile_id=student["id"])
+
+
+def test_missing_or_invalid_token_is_401(client, org_id):
+    assert client.get("/student/list").status_code == 401
+    assert client.get("/analytics/summary", params={"org_id": org_id, "language": "english"}).status_code == 401
+    response = client.get("/student/list", headers={"Authorization": "Bearer not-a-token"})
+    assert response.status_code == 401
+
+
+def test_student_token_cannot_write(client, db, org_id, student_headers):
+    student = db.find("students", org_id=org_id)[1]
+    test = db.find("tests", org_id=org_id)[0]
+
+    assert client.delete(f"/student/{student['id']}", headers=student_headers).status_code == 403
+    assert client.put(f"/student/{student['id']}", json={"overall_mark": 100.0}, headers=student_headers).status_code == 403
+    assert client.put(f"/tests/{test['id']}", json={"status": "completed"}, headers=student_headers).status_code == 403
+    response = client.post("/student/add", headers=student_headers, json={
+        "name": "Sneaky", "org_id": org_id, "language": "english", "email": "sneaky@example.com", "password": "secret",
+    })
+    assert response.status_code == 403
+    assert db.find("students", id=student["id"]) and db.find("tests", id=test["id"])[0]["status"] == "upcoming"
+
+
+def test_admin_cannot_write_to_another_organization(client, db, other_org_id, admin_headers):
+    student = db.find("students", org_id=other_org_id)[0]
+    admin = db.find("admins", org_id=other_org_id)[0]
+
+    assert client.delete(f"/student/{student['id']}", headers=admin_headers).status_code == 403
+    assert client.put(f"/admin/{admin['id']}", json={"name": "Renamed"}, headers=admin_headers).status_code == 403
+    response = client.post("/tests/add", headers=admin_headers, json={
+        "test_name": "Elsewhere", "org_id": other_org_id, "language": "english",
+        "test_duration": 30, "test_time": "2030-01-01T09:00:00",
+    })
+    assert response.status_code == 403
+    response = client.post("/analytics/snapshot/rebuild", params={"org_id": other_org_id, "language": "english"}, headers=admin_headers)
+    assert response.status_code == 403
+    assert db.find("students", id=student["id"]) and db.find("admins", id=admin["id"])[0]["name"] == admin["name"]
+
+
+def test_admin_cannot_read_another_organization(client, db, other_org_id, admin_headers):
+    student = db.find("students", org_id=other_org_id)[0]
+    admin = db.find("admins", org_id=other_org_id)[0]
+    cohort = {"org_id": other_org_id, "language": "english"}
+
+    assert client.get("/student/list", params={"org_id": other_org_id}, headers=admin_headers).status_code == 403
+    assert client.get(f"/student/{student['id']}", headers=admin_headers).status_code == 403
+    assert client.get("/admin/list", params={"org_id": other_org_id}, headers=admin_headers).status_code == 403
+    assert client.get(f"/admin/{admin['id']}", headers=admin_headers).status_code == 403
+    for path in ("/analytics/students", "/analytics/summary", "/analytics/language-detail",
+                 "/analytics/trends", "/analytics/leaderboard", "/analytics/distribution"):
+        assert client.get(path, params=cohort, headers=admin_headers).status_code == 403, path
+
+
+def test_lists_default_to_the_callers_organization(client, db, org_id, admin_headers):
+    response = client.get("/student/list", params={"limit": 100}, headers=admin_headers)
+    assert response.status_code == 200
+    assert {s["org_id"] for s in response.json()["students"]} == {org_id}
+
+
+def test_exports_are_limited_to_admins_of_the_organization(client, db, org_id, other_org_id, admin_headers, student_headers):
+    assert client.get("/student/export", params={"org_id": org_id, "format": "csv"}, headers=student_headers).status_code == 403
+    assert client.get("/admin/export", params={"org_id": org_id}, headers=student_headers).status_code == 403
+    assert client.get("/student/export", params={"org_id": other_org_id}, headers=admin_headers).status_code == 403
+    assert client.get("/admin/export", params={"org_id": other_org_id}, headers=admin_headers).status_code == 403
+    assert client.get("/student/export", headers=admin_headers).status_code == 422
+
+    response = client.get("/student/export", params={"org_id": org_id, "fields": "id,org_id"}, headers=admin_headers)
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == len(db.find("students", org_id=org_id))
+    assert {row["org_id"] for row in rows} == {org_id}
@@ -0,0 +1,86 @@
+# tests/test_analytics_snapshot.py
+
+LANGUAGES = ("english", "spanish")
+PASS_MARK = 70.0
+
+# Snapshot column -> students column, spelled out here rather than taken
+# from analytics_snapshot so the expected values share no code with it
+SUMS = {
+    "sum_overall": "overall_mark",
+    "sum_fluency": "fluency_mark",
+    "sum_vocab": "vocab_mark",
+    "sum_sentence_mastery": "sentence_mastery",
+    "sum_pronunciation": "pronunciation",
+}
+
+
+def expected_snapshot(db, org_id, language):
+    students = db.find("students", org_id=org_id, language=language)
+    expected = {
+        "student_count": len(students),
+        "pass_count": len([s for s in students if s.get("overall_mark") is not None and s["overall_mark"] >= PASS_MARK]),
+    }
+    for total, column in SUMS.items():
+        expected[total] = sum(s[column] for s in students if s.get(column) is not None)
+    return expected
+
+
+def mismatches(db, org_id):
+    """Stored snapshot fields that differ from the students table, per cohort of the org."""
+    drift = {}
+    for language in LANGUAGES:
+        stored = db.find("analytics_snapshots", org_id=org_id, language=language)[0]
+        fields = {
+            key: (stored.get(key), value)
+            for key, value in expected_snapshot(db, org_id, language).items()
+            if abs(float(stored.get(key) or 0) - value) > 1e-6
+        }
+        if fields:
+            drift[language] = fields
+    return drift
+
+
+def test_snapshot_matches_full_recompute_after_writes(client, db, org_id, admin_headers):
+    assert mismatches(db, org_id) == {}
+    students = db.find("students", org_id=org_id, language="english")
+
+    response = client.post("/student/add", headers=admin_headers, json={
+        "name": "Added", "org_id": org_id, "language": "english", "email": "added@example.com",
+        "password": "secret", "overall_mark": 88.0, "fluency_mark": 71.5,
+    })
+    assert response.status_code == 200
+
+    # Mark changes, marks either side of the pass mark and a move to another
+    # language cohort
+    for student, changes in zip(students, (
+        {"overall_mark": 70.0, "vocab_mark": 40.0},
+        {"overall_mark": 69.9},
+        {"pronunciation": 100.0, "sentence_mastery": 0.0},
+        {"language": "spanish", "overall_mark": 72.0},
+    )):
+        response = client.put(f"/student/{student['id']}", json=changes, headers=admin_headers)
+        assert response.status_code == 200
+
+    response = client.delete(f"/student/{students[4]['id']}", headers=admin_headers)
+    assert response.status_code == 200
+
+    response = client.post("/student/bulk", headers=admin_headers, json=[
+        {"name": f"Bulk {i}", "org_id": org_id, "language": LANGUAGES[i % 2], "email": f"bulk{i}@example.com",
+         "password": "secret", "overall_mark": 50.0 + 10 * i}
+        for i in range(4)
+    ])
+    assert response.json()["created"] == 4
+
+    assert mismatches(db, org_id) == {}
+
+
+def test_rebuild_repairs_a_drifted_snapshot(client, db, org_id, admin_headers):
+    snapshot = db.find("analytics_snapshots", org_id=org_id, language="english")[0]
+    snapshot["student_count"] += 3
+    snapshot["sum_overall"] -= 100.0
+    assert set(mismatches(db, org_id)["english"]) == {"student_count", "sum_overall"}
+
+    response = client.post("/analytics/snapshot/rebuild", params={"org_id": org_id, "language": "english"}, headers=admin_headers)
+
+    assert response.status_code == 200
+    assert mismatches(db, org_id) == {}
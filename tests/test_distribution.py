@@ -0,0 +1,16 @@
+# tests/test_distribution.py
+import analytics_endpoints
+
+
+def test_distribution_reads_every_row_across_pages(client, db, org_id, admin_headers, monkeypatch):
+    monkeypatch.setattr(analytics_endpoints, "DISTRIBUTION_PAGE_SIZE", 3)
+    students = db.find("students", org_id=org_id)
+
+    response = client.get("/analytics/distribution", params={"org_id": org_id}, headers=admin_headers)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["overall"]["total_students"] == len(students)
+    assert body["comparison"]["total_students"] == {
+        language: len([s for s in students if s["language"] == language]) for language in ("english", "spanish")
+    }
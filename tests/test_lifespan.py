@@ -0,0 +1,37 @@
+# tests/test_lifespan.py
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+
+import database
+from main import app
+from structured_logging import NonBlockingQueueHandler
+
+
+@pytest.fixture
+def fake_backend(monkeypatch):
+    # Each lifespan creates (and closes) its own seeded stand-in
+    monkeypatch.setattr(database, "SUPABASE_BACKEND", "fake")
+    database.set_supabase(None)
+    yield
+    database.set_supabase(None)
+
+
+def test_app_serves_logins_across_lifespan_cycles(fake_backend):
+    for _ in range(2):
+        with TestClient(app) as client:
+            response = client.post("/auth/login", json={"email": "admin0@org0.example.com", "password": "password"})
+            assert response.status_code == 200
+
+
+def test_each_lifespan_sets_up_and_tears_down_logging(fake_backend, capsys):
+    # Importing the app configures nothing
+    assert not any(isinstance(h, NonBlockingQueueHandler) for h in logging.getLogger().handlers)
+
+    for cycle in range(2):
+        with TestClient(app):
+            logging.getLogger("tests").warning("lifespan cycle %d", cycle)
+        assert not any(isinstance(h, NonBlockingQueueHandler) for h in logging.getLogger().handlers)
+        # Stopping the listener flushed the record
+        assert f"lifespan cycle {cycle}" in capsys.readouterr().out
@@ -0,0 +1,61 @@
+# tests/test_login.py
+from response_cache import RedisCacheBackend, set_cache_backend
+
+PASSWORD = "password"
+
+
+def login(client, email, password=PASSWORD):
+    return client.post("/auth/login", json={"email": email, "password": password})
+
+
+def test_login_sees_a_password_change_made_on_another_worker(client, db, org_id, admin_headers, redis):
+    student = db.find("students", org_id=org_id)[0]
+    worker, other_worker = RedisCacheBackend(redis), RedisCacheBackend(redis)
+
+    set_cache_backend(worker)
+    assert login(client, student["email"]).status_code == 200
+
+    set_cache_backend(other_worker)
+    response = client.put(f"/student/{student['id']}", json={"password": "changed"}, headers=admin_headers)
+    assert response.status_code == 200
+
+    set_cache_backend(worker)
+    assert login(client, student["email"]).status_code == 401
+    assert login(client, student["email"], "changed").status_code == 200
+
+
+def test_login_sees_a_delete_made_on_another_worker(client, db, org_id, admin_headers, redis):
+    student = db.find("students", org_id=org_id)[0]
+    worker, other_worker = RedisCacheBackend(redis), RedisCacheBackend(redis)
+
+    set_cache_backend(worker)
+    assert login(client, student["email"]).status_code == 200
+
+    set_cache_backend(other_worker)
+    assert client.delete(f"/student/{student['id']}", headers=admin_headers).status_code == 200
+
+    set_cache_backend(worker)
+    assert login(client, student["email"]).status_code == 401
+
+
+def test_repeat_logins_are_served_from_a_shared_backend(client, db, org_id, redis, monkeypatch):
+    student = db.find("students", org_id=org_id)[0]
+    set_cache_backend(RedisCacheBackend(redis))
+    # The first login upgrades the seeded hash and drops the profile again
+    assert login(client, student["email"]).status_code == 200
+    assert login(client, student["email"]).status_code == 200
+
+    # A stale cached profile is what a repeat login would use
+    monkeypatch.setattr(db, "tables", {**db.tables, "auth": []})
+    assert login(client, student["email"]).status_code == 200
+
+
+def test_memory_backend_never_serves_a_stale_password(client, db, org_id):
+    # Another worker's write only reaches this worker through the database
+    student = db.find("students", org_id=org_id)[0]
+    assert login(client, student["email"]).status_code == 200
+
+    db.find("auth", email=student["email"])[0]["password"] = "changed"
+
+    assert login(client, student["email"]).status_code == 401
+    assert login(client, student["email"], "changed").status_code == 200
@@ -0,0 +1,90 @@
+# tests/test_response_cache.py
+import pytest
+
+from response_cache import MemoryCacheBackend, RedisCacheBackend, set_cache_backend
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request, db, redis):
+    backend = MemoryCacheBackend() if request.param == "memory" else RedisCacheBackend(redis)
+    set_cache_backend(backend)
+    return backend
+
+
+def list_students(client, headers, org_id, **extra):
+    return client.get("/student/list", params={"org_id": org_id}, headers={**headers, **extra})
+
+
+def test_second_read_is_a_hit_with_the_same_body(client, backend, org_id, admin_headers):
+    first = list_students(client, admin_headers, org_id)
+    second = list_students(client, admin_headers, org_id)
+
+    assert (first.status_code, second.status_code) == (200, 200)
+    assert (first.headers["X-Cache"], second.headers["X-Cache"]) == ("MISS", "HIT")
+    assert second.content == first.content
+    assert second.headers["ETag"] == first.headers["ETag"]
+
+
+def test_if_none_match_is_answered_with_304(client, backend, org_id, admin_headers):
+    etag = list_students(client, admin_headers, org_id).headers["ETag"]
+
+    response = list_students(client, admin_headers, org_id, **{"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+
+    response = list_students(client, admin_headers, org_id, **{"If-None-Match": '"stale"'})
+    assert response.status_code == 200
+
+
+def test_entries_are_kept_apart_per_caller_and_query(client, backend, db, org_id, admin_headers, make_headers):
+    other_org = db.rows("organizations")[1]["id"]
+    other_admin = db.find("admins", org_id=org_id)[-1]
+    list_students(client, admin_headers, org_id)
+
+    # Another caller in the same organization gets its own entry
+    response = list_students(client, make_headers("admin", org_id, email=other_admin["email"]), org_id)
+    assert response.headers["X-Cache"] == "MISS"
+
+    # And so does another organization, with its own rows
+    response = list_students(client, make_headers("admin", other_org), other_org)
+    assert response.headers["X-Cache"] == "MISS"
+    assert {s["org_id"] for s in response.json()["students"]} == {other_org}
+
+    response = client.get("/student/list", params={"org_id": org_id, "language": "spanish"}, headers=admin_headers)
+    assert response.headers["X-Cache"] == "MISS"
+
+
+def test_successful_write_invalidates_its_tag(client, backend, org_id, admin_headers):
+    before = list_students(client, admin_headers, org_id)
+
+    response = client.post("/student/add", headers=admin_headers, json={
+        "name": "Added", "org_id": org_id, "language": "english", "email": "added@example.com", "password": "secret",
+    })
+    assert response.status_code == 200
+
+    after = list_students(client, admin_headers, org_id)
+    assert after.headers["X-Cache"] == "MISS"
+    assert after.headers["ETag"] != before.headers["ETag"]
+    assert "added@example.com" in {s["email"] for s in after.json()["students"]}
+
+
+def test_failed_write_leaves_cached_entries(client, backend, db, org_id, admin_headers):
+    list_students(client, admin_headers, org_id)
+    existing = db.find("students", org_id=org_id)[0]["email"]
+
+    response = client.post("/student/add", headers=admin_headers, json={
+        "name": "Duplicate", "org_id": org_id, "language": "english", "email": existing, "password": "secret",
+    })
+    assert response.status_code == 400
+
+    assert list_students(client, admin_headers, org_id).headers["X-Cache"] == "HIT"
+
+
+def test_writes_leave_other_tags_cached(client, backend, db, org_id, admin_headers):
+    client.get("/organization/list", headers=admin_headers)
+    student = db.find("students", org_id=org_id)[0]
+
+    assert client.put(f"/student/{student['id']}", json={"name": "Renamed"}, headers=admin_headers).status_code == 200
+
+    assert client.get("/organization/list", headers=admin_headers).headers["X-Cache"] == "HIT"
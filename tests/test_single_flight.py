@@ -0,0 +1,82 @@
+# tests/test_single_flight.py
+import asyncio
+
+import pytest
+
+from fake_supabase import FakeDatabase, seed
+from single_flight import CoalescingTransport
+
+READ_LATENCY = 0.05
+
+
+@pytest.fixture
+def database(monkeypatch):
+    """A seeded database whose GETs are slow enough to overlap, counting the calls that reach it."""
+    db = FakeDatabase()
+    seed(db, organizations=1, students_per_cohort=2)
+    handle = db.handle
+    db.calls = []
+
+    async def slow_reads(request):
+        db.calls.append(request.method)
+        if request.method == "GET":
+            await asyncio.sleep(READ_LATENCY)
+        return await handle(request)
+
+    monkeypatch.setattr(db, "handle", slow_reads)
+    return db
+
+
+@pytest.fixture
+def supabase(database):
+    client = database.client()
+    assert isinstance(client.postgrest.session._transport, CoalescingTransport)
+    return client
+
+
+def organizations(supabase):
+    return supabase.table("organizations").select("id,name").order("name").execute()
+
+
+def test_identical_reads_in_flight_share_one_call(database, supabase):
+    async def run():
+        return await asyncio.gather(organizations(supabase), organizations(supabase))
+
+    first, second = asyncio.run(run())
+
+    assert first.data == second.data
+    assert database.calls == ["GET"]
+
+
+def test_read_issued_after_a_write_does_not_join_an_earlier_read(database, supabase):
+    async def run():
+        before = asyncio.create_task(organizations(supabase))
+        await asyncio.sleep(READ_LATENCY / 5)
+        await supabase.table("organizations").insert({"name": "Added"}).execute()
+        # The first read is still in flight, and against a real database may
+        # already have read the table before the insert
+        assert not before.done()
+        after = await organizations(supabase)
+        return await before, after
+
+    _, after = asyncio.run(run())
+
+    assert "Added" in {row["name"] for row in after.data}
+    assert database.calls == ["GET", "POST", "GET"]
+
+
+def test_count_only_reads_do_not_split_in_flight_reads(database, supabase):
+    def count():
+        return supabase.table("organizations").select("id", count="exact", head=True).execute()
+
+    async def run():
+        before = asyncio.create_task(organizations(supabase))
+        await asyncio.sleep(READ_LATENCY / 5)
+        await count()
+        after = await organizations(supabase)
+        return await before, after
+
+    before, after = asyncio.run(run())
+
+    assert before.data == after.data
+    assert database.calls == ["GET", "HEAD"]
@@ -0,0 +1,116 @@
+# tests/test_user_writes.py
+import json
+
+from fake_supabase import FakeDatabase, FakeDatabaseError
+
+
+def new_student(org_id, email="new.student@example.com", **marks):
+    return {"name": "New Student", "org_id": org_id, "language": "english", "email": email, "password": "secret", **marks}
+
+
+def new_admin(org_id, email="new.admin@example.com"):
+    return {"name": "New Admin", "org_id": org_id, "role": "teacher", "contact": "555-0000", "language": "english", "email": email, "password": "secret"}
+
+
+def raising(code, message):
+    def function(db, params):
+        raise FakeDatabaseError(code, message)
+    return function
+
+
+def table_state(db, *tables):
+    return {table: [dict(row) for row in db.rows(table)] for table in tables}
+
+
+# Error mapping
+
+def test_add_student_with_registered_email_is_400(client, db, org_id, admin_headers):
+    existing = db.find("students", org_id=org_id)[0]["email"]
+    response = client.post("/student/add", json=new_student(org_id, email=existing), headers=admin_headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Email already registered"
+
+
+def test_add_admin_with_registered_email_is_400(client, db, org_id, admin_headers):
+    existing = db.find("admins", org_id=org_id)[0]["email"]
+    response = client.post("/admin/add", json=new_admin(org_id, email=existing), headers=admin_headers)
+    assert response.status_code == 400
+
+
+def test_student_removed_before_the_rpc_runs_is_404(client, db, org_id, admin_headers, monkeypatch):
+    # The row exists when the route checks its organization, and is gone by
+    # the time the function runs
+    student_id = db.find("students", org_id=org_id)[0]["id"]
+    monkeypatch.setitem(db.functions, "update_student", raising("P0002", "Student not found"))
+    monkeypatch.setitem(db.functions, "delete_student", raising("P0002", "Student not found"))
+
+    assert client.put(f"/student/{student_id}", json={"name": "Renamed"}, headers=admin_headers).status_code == 404
+    assert client.delete(f"/student/{student_id}", headers=admin_headers).status_code == 404
+
+
+def test_admin_removed_before_the_rpc_runs_is_404(client, db, org_id, admin_headers, monkeypatch):
+    admin_id = db.find("admins", org_id=org_id)[-1]["id"]
+    monkeypatch.setitem(db.functions, "update_admin", raising("P0002", "Admin not found"))
+    monkeypatch.setitem(db.functions, "delete_admin", raising("P0002", "Admin not found"))
+
+    assert client.put(f"/admin/{admin_id}", json={"name": "Renamed"}, headers=admin_headers).status_code == 404
+    assert client.delete(f"/admin/{admin_id}", headers=admin_headers).status_code == 404
+
+
+# Bulk import compensation
+
+def fail_auth_inserts(monkeypatch, after_rows=0):
+    """Make auth inserts fail once `after_rows` rows have gone in."""
+    insert = FakeDatabase.insert
+    inserted = []
+
+    def failing(self, table, row):
+        if table == "auth":
+            if len(inserted) >= after_rows:
+                raise FakeDatabaseError("XX000", "injected auth failure", 500)
+            inserted.append(row)
+        return insert(self, table, row)
+
+    monkeypatch.setattr(FakeDatabase, "insert", failing)
+
+
+def ndjson(rows):
+    return "\n".join(json.dumps(row) for row in rows)
+
+
+def test_bulk_chunk_whose_auth_insert_fails_leaves_no_orphans(client, db, org_id, admin_headers, monkeypatch):
+    students = [new_student(org_id, email=f"bulk{i}@example.com") for i in range(5)]
+    before = len(db.rows("students"))
+    # The first chunk (2 rows) goes in; the second chunk's auth insert fails
+    fail_auth_inserts(monkeypatch, after_rows=2)
+
+    response = client.post(
+        "/student/bulk",
+        params={"chunk_size": 2},
+        content=ndjson(students),
+        headers={**admin_headers, "content-type": "application/x-ndjson"},
+    )
+
+    assert response.status_code == 200
+    report = response.json()
+    assert [r["status"] for r in report["results"]] == ["created", "created", "failed", "failed", "failed"]
+    assert report["created"] == 2
+
+    created = {r["email"] for r in report["results"] if r["status"] == "created"}
+    emails = {s["email"] for s in db.rows("students")}
+    assert len(db.rows("students")) == before + 2
+    assert {s["email"] for s in students} & emails == created
+    # Every remaining profile has a login
+    auth_emails = {a["email"] for a in db.rows("auth")}
+    assert all(s["email"] in auth_emails for s in db.rows("students"))
+
+
+def test_bulk_admin_chunk_whose_auth_insert_fails_leaves_no_orphans(client, db, org_id, admin_headers, monkeypatch):
+    before = table_state(db, "admins", "auth")
+    fail_auth_inserts(monkeypatch)
+
+    response = client.post("/admin/bulk", json=[new_admin(org_id, email=f"a{i}@example.com") for i in range(3)], headers=admin_headers)
+
+    assert response.status_code == 200
+    assert response.json()["created"] == 0
+    assert table_state(db, "admins", "auth") == before
@@ -0,0 +1,63 @@
+# upcoming_tests.py
+import json
+import os
+from typing import Iterable
+
+from supabase import AsyncClient
+
+from response_cache import MemoryCacheBackend, get_cache_backend
+
+# Every student in an (org, language) cohort sees the same list, so it is
+# cached once per cohort in the response cache backend. Test writes and the
+# completion job invalidate it, but only a shared (Redis) backend carries
+# that to other workers: the default memory backend keeps generations per
+# worker, so there entries live at most UPCOMING_TESTS_LOCAL_TTL.
+UPCOMING_TESTS_TTL = float(os.getenv("UPCOMING_TESTS_TTL", "300"))
+UPCOMING_TESTS_LOCAL_TTL = float(os.getenv("UPCOMING_TESTS_LOCAL_TTL", "30"))
+
+UPCOMING_TEST_COLUMNS = "id,test_name,test_time,test_duration,test_link,language,status"
+
+
+def _ttl(backend) -> float:
+    if isinstance(backend, MemoryCacheBackend):
+        return min(UPCOMING_TESTS_TTL, UPCOMING_TESTS_LOCAL_TTL)
+    return UPCOMING_TESTS_TTL
+
+
+def _tag(org_id: str, language: str) -> str:
+    return f"upcoming-tests:{org_id}:{language}"
+
+
+async def fetch_upcoming_tests(supabase: AsyncClient, org_id: str, language: str) -> bytes:
+    """The cohort's upcoming tests as a JSON array, from the cache when possible."""
+    backend = get_cache_backend()
+    tag = _tag(org_id, language)
+
+    # The key carries the cohort's generation, so a fill that races with an
+    # invalidation lands under a key nobody reads again
+    generation, = await backend.generations((tag,))
+    key = f"{tag}:{generation}"
+
+    entry = await backend.get(key)
+    if entry is not None:
+        return entry["body"]
+
+    response = await (
+        supabase.table("tests")
+        .select(UPCOMING_TEST_COLUMNS)
+        .eq("org_id", org_id)
+        .eq("language", language)
+        .eq("status", "upcoming")
+        .order("test_time", desc=False)
+        .execute()
+    )
+    body = json.dumps(response.data or []).encode()
+    await backend.set(key, {"body": body}, _ttl(backend))
+    return body
+
+
+async def invalidate_upcoming_tests(tests: Iterable[dict]):
+    """Drop the cached lists of every cohort the given test rows belong to."""
+    tags = {_tag(test["org_id"], test["language"]) for test in tests}
+    if tags:
+        await get_cache_backend().bump(tuple(tags))